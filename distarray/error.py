@@ -37,3 +37,13 @@ class InvalidRankError(MPIDistArrayError):
 class DistributionError(DistArrayError):
     """ Exception class when inconsistent distributions are used. """
     pass
+
+
+class GatherError(DistArrayError):
+    """ Exception class when a DistArray is implicitly gathered. """
+    pass
+
+
+class GatherWarning(UserWarning):
+    """ Warning category for implicit gathers of DistArrays. """
+    pass
@@ -0,0 +1,91 @@
+# encoding: utf-8
+# ---------------------------------------------------------------------------
+#  Copyright (C) 2008-2014, IPython Development Team and Enthought, Inc.
+#  Distributed under the terms of the BSD License.  See COPYING.rst.
+# ---------------------------------------------------------------------------
+
+"""
+Handles on checkpoints written in the background by the engines.
+"""
+
+from __future__ import division
+
+
+class Checkpoint(object):
+
+    """A checkpoint started by `Context.checkpoint_async`.
+
+    The engines write it while the client goes on.  Call `wait` before
+    relying on the files, and before closing the context.
+
+    Attributes
+    ----------
+    names : dict
+        Maps the name of each checkpointed array to the name to pass to
+        `Context.load_dnpy` to load it.
+    """
+
+    def __init__(self, context, job_id, targets, names):
+        self.context = context
+        self.job_id = job_id
+        self.targets = targets
+        self.names = names
+        self._result = None
+        self._errors = None
+
+    def done(self):
+        """Return whether every engine has finished writing."""
+        if self._result is not None:
+            return True
+
+        def _local_checkpoint_done(job_id):
+            from distarray.localapi import checkpoint
+            return checkpoint.done(job_id)
+
+        return all(self.context.apply(_local_checkpoint_done, (self.job_id,),
+                                      targets=self.targets))
+
+    def wait(self):
+        """Wait for the checkpoint to be written, and return self.
+
+        Raises
+        ------
+        IOError
+            If any engine failed to write its files.
+        """
+        if self._result is None:
+
+            def _local_checkpoint_wait(job_id):
+                from distarray.localapi import checkpoint
+                return checkpoint.wait(job_id)
+
+            results = self.context.apply(_local_checkpoint_wait,
+                                         (self.job_id,), targets=self.targets)
+            self._result = (sum(nbytes for (nbytes, _, _) in results),
+                            max(seconds for (_, seconds, _) in results))
+            self._errors = ["engine %s: %s" % (target, error)
+                            for (target, (_, _, error)) in
+                            zip(self.targets, results) if error is not None]
+        if self._errors:
+            raise IOError("Checkpoint failed on %s" %
+                          "; ".join(self._errors))
+        return self
+
+    @property
+    def nbytes(self):
+        """Total size of the files written.  Waits for the checkpoint."""
+        self.wait()
+        return self._result[0]
+
+    @property
+    def seconds(self):
+        """Time taken by the slowest engine, from the snapshot to the last
+        write.  Waits for the checkpoint.
+        """
+        self.wait()
+        return self._result[1]
+
+    @property
+    def throughput(self):
+        """Bytes written per second.  Waits for the checkpoint."""
+        return self.nbytes / self.seconds if self.seconds else float('inf')
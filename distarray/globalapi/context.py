@@ -13,7 +13,11 @@ from __future__ import absolute_import
 
 import atexit
 import collections
+import numbers
+import threading
+import traceback
 import types
+import warnings
 from abc import ABCMeta, abstractmethod
 
 from functools import wraps
@@ -22,12 +26,15 @@ import numpy
 
 from distarray.externals import six
 from distarray import DISTARRAY_BASE_NAME
+from distarray.error import GatherError, GatherWarning
 from distarray.globalapi import ipython_cleanup
 from distarray.globalapi.distarray import DistArray
 from distarray.globalapi.maps import Distribution, asdistribution
+from distarray.globalapi.checkpoint import Checkpoint
 
 from distarray.globalapi.ipython_utils import IPythonClient
 from distarray.utils import uid, nonce, has_exactly_one
+from distarray.metadata_utils import chunk_aligned_bounds
 from distarray.localapi.proxyize import Proxy
 
 # mpi context
@@ -37,6 +44,10 @@ from distarray.mpionly_utils import (make_targets_comm,
                                      mpi, push_function)
 
 
+GatherRecord = collections.namedtuple('GatherRecord',
+                                      ['key', 'shape', 'nbytes', 'stack'])
+
+
 @six.add_metaclass(ABCMeta)
 class BaseContext(object):
 
@@ -53,6 +64,19 @@ class BaseContext(object):
 
     _CLEANUP = None
 
+    # Held for each request to the engines, so that a background thread
+    # (see `DistArray.iter_blocks`) can use a context along with the main
+    # thread.
+    _lock = threading.RLock()
+
+    # What to do when a DistArray is implicitly gathered to the client
+    # (through `__array_interface__`); see `set_gather_policy`.
+    gather_policy = 'allow'
+    gather_threshold = 0
+
+    # Number of implicit gathers kept in `gather_log`.
+    gather_log_size = 100
+
     @abstractmethod
     def __init__(self):
         raise TypeError("The base context class is not meant to be "
@@ -71,7 +95,8 @@ class BaseContext(object):
         pass
 
     @abstractmethod
-    def apply(self, func, args=None, kwargs=None, targets=None, autoproxyize=False):
+    def apply(self, func, args=None, kwargs=None, targets=None,
+              autoproxyize=False, per_target_args=None):
         pass
 
     @abstractmethod
@@ -100,6 +125,118 @@ class BaseContext(object):
         key = "%s_%s" % (self.context_key, uid())
         return key
 
+    def set_gather_policy(self, policy, threshold=0):
+        """Set what happens when a DistArray is implicitly gathered.
+
+        Implicit gathers happen when NumPy coerces a DistArray to an ndarray
+        through `__array_interface__`, e.g. with `numpy.asarray`.  Explicit
+        calls to `DistArray.tondarray` are not affected.
+
+        Parameters
+        ----------
+        policy : {'allow', 'warn', 'raise'}
+            'allow' lets the gather happen, 'warn' issues a `GatherWarning`
+            and 'raise' raises a `GatherError`.
+        threshold : int, optional
+            Gathers of at most `threshold` bytes are always allowed.
+        """
+        if policy not in ('allow', 'warn', 'raise'):
+            msg = "policy must be 'allow', 'warn' or 'raise', not %r"
+            raise ValueError(msg % (policy,))
+        self.gather_policy = policy
+        self.gather_threshold = threshold
+
+    def reset_gather_log(self):
+        """Reset `gather_count` and `gather_log`.
+
+        `gather_count` counts the implicit gathers of DistArrays from this
+        context, and `gather_log` holds a `GatherRecord`, with the stack
+        trace of the caller, for each of the last `gather_log_size` ones.
+        """
+        self.gather_count = 0
+        self.gather_log = collections.deque(maxlen=self.gather_log_size)
+
+    def set_backend(self, name, nthreads=None, chunk_bytes=None):
+        """Choose how the engines execute the local part of elementwise
+        operations and reductions for this context.
+
+        Parameters
+        ----------
+        name : {'numpy', 'threaded'}
+            'numpy' (the default) runs plain NumPy.  'threaded' runs chunks
+            of each operation on a pool of threads in every engine, which
+            pays off when there are fewer engines than cores.
+        nthreads : int, optional
+            Threads per engine for 'threaded'.  Default: the number of CPUs.
+        chunk_bytes : int, optional
+            Approximate size of a chunk of output for 'threaded'.  Default:
+            `distarray.localapi.backends.DEFAULT_CHUNK_BYTES`.
+        """
+        if name not in ('numpy', 'threaded'):
+            msg = "backend must be 'numpy' or 'threaded', not %r"
+            raise ValueError(msg % (name,))
+        options = {}
+        if name == 'threaded':
+            for key, value in (('nthreads', nthreads),
+                               ('chunk_bytes', chunk_bytes)):
+                if value is None:
+                    continue
+                if not isinstance(value, numbers.Integral) or value < 1:
+                    raise ValueError("%s must be a positive integer." % key)
+                options[key] = value
+
+        def _local_set_backend(name, options):
+            from distarray.localapi import backends
+            backends.set_backend(context_key, name, **options)  # noqa
+
+        self.apply(_local_set_backend, (name, options), targets=self.targets)
+        self.backend = name
+
+    def node_ids(self, targets=None):
+        """Return the node of each target, as the lowest target on it.
+
+        Targets are on the same node when MPI lets them share memory
+        (`MPI.COMM_TYPE_SHARED`).  The result is computed once and cached.
+
+        Parameters
+        ----------
+        targets : sequence of int, optional
+            Default: all of this context's targets.
+
+        Returns
+        -------
+        list of int
+        """
+        if self._node_ids is None:
+            def _local_node_leader(comm):
+                from distarray.localapi.mpiutils import MPI
+                node_comm = comm.Split_type(MPI.COMM_TYPE_SHARED)
+                leader = node_comm.allreduce(comm.Get_rank(), op=MPI.MIN)
+                node_comm.Free()
+                return leader
+
+            leaders = self.apply(_local_node_leader, (self.comm,),
+                                 targets=self.targets)
+            self._node_ids = {t: self.targets[leader]
+                              for (t, leader) in zip(self.targets, leaders)}
+        targets = self.targets if targets is None else targets
+        return [self._node_ids[t] for t in targets]
+
+    def _check_gather(self, da):
+        """Apply the gather policy to an implicit gather of `da`."""
+        stack = traceback.format_stack()[:-2]
+        self.gather_count += 1
+        self.gather_log.append(GatherRecord(da.key, da.shape, da.nbytes,
+                                            stack))
+        if self.gather_policy == 'allow' or da.nbytes <= self.gather_threshold:
+            return
+        msg = ("Implicit gather of a DistArray with shape %r (%d bytes) to "
+               "the client.  Use `tondarray` to gather explicitly.")
+        msg %= (da.shape, da.nbytes)
+        if self.gather_policy == 'raise':
+            raise GatherError(msg)
+        warnings.warn(msg, GatherWarning, stacklevel=3)
+
     def _key_and_push(self, *values, **kwargs):
         keys = [self._generate_key() for value in values]
         targets = kwargs.get('targets', self.targets)
@@ -123,10 +260,13 @@ class BaseContext(object):
         with self.view.temp_flags(targets=targets):
             self.view.apply_sync(_local_delete, key)
 
-    def _create_local(self, local_call, shape_or_dist, dtype):
+    def _create_local(self, local_call, shape_or_dist, dtype, shared=False,
+                      scratch=None):
         """Creates LocalArrays with the method named in `local_call`."""
+        if shared and scratch is not None:
+            raise ValueError("An array cannot be both shared and out of core.")
 
-        def create_local(local_call, ddpr, dtype, comm):
+        def create_local(local_call, ddpr, dtype, comm, shared, scratch):
             from distarray.localapi.maps import Distribution
             if len(ddpr) == 0:
                 dim_data = ()
@@ -134,25 +274,39 @@ class BaseContext(object):
                 dim_data = ddpr[comm.Get_rank()]
             local_call = eval(local_call)
             distribution = Distribution(comm=comm, dim_data=dim_data)
-            rval = local_call(distribution=distribution, dtype=dtype)
+            rval = local_call(distribution=distribution, dtype=dtype,
+                              shared=shared, scratch=scratch)
             return proxyize(rval)
 
         distribution = asdistribution(self, shape_or_dist)
 
         ddpr = distribution.get_dim_data_per_rank()
-        args = [local_call, ddpr, dtype, distribution.comm]
+        args = [local_call, ddpr, dtype, distribution.comm, shared, scratch]
         da_key = self.apply(create_local, args=args,
                             targets=distribution.targets)[0]
         return DistArray.from_localarrays(da_key, distribution=distribution,
-                                          dtype=dtype)
+                                          dtype=dtype, shared=shared)
 
-    def empty(self, shape_or_dist, dtype=float):
+    def empty(self, shape_or_dist, dtype=float, shared=False, scratch=None):
         """Create an empty Distarray.
 
         Parameters
         ----------
         shape_or_dist : shape tuple or Distribution object
         dtype : NumPy dtype, optional (default float)
+        shared : bool, optional (default False)
+            Allocate the LocalArrays in MPI-3 shared memory windows, one per
+            node.  Engines on the same node then redistribute by copying
+            from each other's memory, and `tondarray` gathers one message
+            per node.
+        scratch : str, optional
+            A directory on the engines' local disks.  If given, store the
+            LocalArrays out of core, in files in this directory mapped in
+            memory; ufuncs and reductions on them stream through the data
+            in chunks, so an engine's resident memory stays bounded, and
+            put their results in `scratch` too.  The files are unlinked as
+            soon as they are mapped: their space is reclaimed when the
+            arrays are deleted.  Cannot be combined with `shared`.
 
         Returns
         -------
@@ -160,15 +314,20 @@ class BaseContext(object):
             A DistArray distributed as specified, with uninitialized values.
         """
         return self._create_local(local_call='distarray.localapi.empty',
-                                  shape_or_dist=shape_or_dist, dtype=dtype,)
+                                  shape_or_dist=shape_or_dist, dtype=dtype,
+                                  shared=shared, scratch=scratch)
 
-    def zeros(self, shape_or_dist, dtype=float):
+    def zeros(self, shape_or_dist, dtype=float, shared=False, scratch=None):
         """Create a Distarray filled with zeros.
 
         Parameters
         ----------
         shape_or_dist : shape tuple or Distribution object
         dtype : NumPy dtype, optional (default float)
+        shared : bool, optional (default False)
+            Allocate in shared memory; see `empty`.
+        scratch : str, optional
+            Store out of core in this directory; see `empty`.
 
         Returns
         -------
@@ -176,15 +335,20 @@ class BaseContext(object):
             A DistArray distributed as specified, filled with zeros.
         """
         return self._create_local(local_call='distarray.localapi.zeros',
-                                  shape_or_dist=shape_or_dist, dtype=dtype,)
+                                  shape_or_dist=shape_or_dist, dtype=dtype,
+                                  shared=shared, scratch=scratch)
 
-    def ones(self, shape_or_dist, dtype=float):
+    def ones(self, shape_or_dist, dtype=float, shared=False, scratch=None):
         """Create a Distarray filled with ones.
 
         Parameters
         ----------
         shape_or_dist : shape tuple or Distribution object
         dtype : NumPy dtype, optional (default float)
+        shared : bool, optional (default False)
+            Allocate in shared memory; see `empty`.
+        scratch : str, optional
+            Store out of core in this directory; see `empty`.
 
         Returns
         -------
@@ -192,7 +356,8 @@ class BaseContext(object):
             A DistArray distributed as specified, filled with ones.
         """
         return self._create_local(local_call='distarray.localapi.ones',
-                                  shape_or_dist=shape_or_dist, dtype=dtype,)
+                                  shape_or_dist=shape_or_dist, dtype=dtype,
+                                  shared=shared, scratch=scratch)
 
     def allclose(self, a, b, rtol=1e-05, atol=1e-08):
 
@@ -211,7 +376,7 @@ class BaseContext(object):
                                   targets=a.targets)
         return all(local_results)
 
-    def save_dnpy(self, name, da):
+    def save_dnpy(self, name, da, single_file=False, codec=None):
         """
         Save a distributed array to files in the ``.dnpy`` format.
 
@@ -231,29 +396,66 @@ class BaseContext(object):
             If a list of str, each engine will use the name at the index
             corresponding to its rank.  An exception is raised if the length of
             this list is not the same as the context's communicator's size.
+            With `single_file`, the name of the file.
         da : DistArray
             Array to save to files.
+        single_file : bool, optional
+            If True, the engines write `da` together, with MPI-IO, to the one
+            file `name` in version 2.0 of the format, which can be loaded
+            with any number of engines and any distribution.
+        codec : str, optional
+            Have each engine compress its data with this codec, e.g. 'zlib'
+            or 'lzma' (see `register_codec`).  Not supported with
+            `single_file`.
 
         Raises
         ------
         TypeError
             If `name` is an sequence whose length is different from the
-            context's communicator's size.
+            context's communicator's size, or if `single_file` is True and
+            `name` is not a str.
 
         See Also
         --------
         load_dnpy : Loading files saved with save_dnpy.
         """
+        if codec is not None:
+            from distarray.localapi.format import CODECS
+            if single_file:
+                errmsg = "`codec` is not supported with `single_file`."
+                raise ValueError(errmsg)
+            if codec not in CODECS:
+                errmsg = "Unknown codec %r; see `register_codec`."
+                raise ValueError(errmsg % (codec,))
+            if da.dtype.hasobject:
+                errmsg = "Cannot compress arrays of Python objects."
+                raise ValueError(errmsg)
+
+        if single_file:
+            if not isinstance(name, six.string_types):
+                errmsg = "`name` must be a string with `single_file`."
+                raise TypeError(errmsg)
+            if da.dtype.hasobject:
+                errmsg = "Cannot save arrays of Python objects in one file."
+                raise ValueError(errmsg)
+
+            def _local_save_dnpy_collective(local_arr, fname):
+                from distarray.localapi import save_dnpy_collective
+                save_dnpy_collective(fname, local_arr)
 
-        def _local_save_dnpy(local_arr, fname_base):
+            self.apply(_local_save_dnpy_collective, (da.key, name),
+                       targets=da.targets)
+            return
+
+        def _local_save_dnpy(local_arr, fname_base, codec):
             from distarray.localapi import save_dnpy
             fname = "%s_%s.dnpy" % (fname_base, local_arr.comm_rank)
-            save_dnpy(fname, local_arr)
+            save_dnpy(fname, local_arr, codec=codec)
 
-        def _local_save_dnpy_names(local_arr, fnames):
+        def _local_save_dnpy_names(local_arr, fnames, codec):
             from distarray.localapi import save_dnpy
             fname = fnames[local_arr.comm_rank]
-            save_dnpy(fname, local_arr)
+            save_dnpy(fname, local_arr, codec=codec)
 
         if isinstance(name, six.string_types):
             func = _local_save_dnpy
@@ -266,9 +468,92 @@ class BaseContext(object):
             errmsg = "`name` must be a string or a list."
             raise TypeError(errmsg)
 
-        self.apply(func, (da.key, name), targets=da.targets)
+        self.apply(func, (da.key, name, codec), targets=da.targets)
+
+    def checkpoint_async(self, arrays, path, codec=None):
+        """
+        Save DistArrays to ``.dnpy`` files in the background.
+
+        Each engine copies its local arrays before this returns, and then
+        writes the copies from a background thread, so the client can go
+        on computing with, and modifying, the arrays.  The copies double
+        the memory used by the arrays until they are written.
+
+        Parameters
+        ----------
+        arrays : DistArray, sequence of DistArray or dict
+            The arrays to save.  A dict maps names to arrays; the arrays
+            of a sequence are named by their positions.
+        path : str
+            Prefix of the file names.  The array named ``<name>`` is saved
+            as by ``save_dnpy('<path>_<name>', ...)``.
+        codec : str, optional
+            See `save_dnpy`.
+
+        Returns
+        -------
+        Checkpoint
+            A handle to wait for the checkpoint, and to report the bytes
+            written and the throughput.  Wait for it before closing the
+            context.
+        """
+        if isinstance(arrays, DistArray):
+            arrays = [arrays]
+        if isinstance(arrays, collections.Mapping):
+            names = sorted(arrays)
+            arrays = [arrays[name] for name in names]
+        else:
+            names = [str(i) for i in range(len(arrays))]
+        if codec is not None:
+            from distarray.localapi.format import CODECS
+            if codec not in CODECS:
+                errmsg = "Unknown codec %r; see `register_codec`."
+                raise ValueError(errmsg % (codec,))
+            if any(da.dtype.hasobject for da in arrays):
+                errmsg = "Cannot compress arrays of Python objects."
+                raise ValueError(errmsg)
+        prefixes = ["%s_%s" % (path, name) for name in names]
+        targets = sorted(set(t for da in arrays for t in da.targets))
+        job_id = nonce()
+
+        def _local_checkpoint_start(job_id, prefixes, codec, *local_arrs):
+            from distarray.localapi import checkpoint
+            saved = [(la, "%s_%s.dnpy" % (prefix, la.comm_rank))
+                     for (prefix, la) in zip(prefixes, local_arrs)
+                     if la is not None]
+            checkpoint.start(job_id, [la for (la, _) in saved],
+                             [fname for (_, fname) in saved], codec)
+
+        self.apply(_local_checkpoint_start,
+                   (job_id, prefixes, codec) + tuple(da.key for da in arrays),
+                   targets=targets)
+        return Checkpoint(self, job_id, targets, dict(zip(names, prefixes)))
+
+    def register_codec(self, name, compress, decompress):
+        """
+        Register a codec for compressing ``.dnpy`` files, here and on the
+        engines.
+
+        Parameters
+        ----------
+        name : str
+            The name to pass as `codec` to `save_dnpy`.
+        compress, decompress : callable
+            Functions taking and returning bytes.  They are sent to the
+            engines, so they must be picklable, e.g. module-level functions.
+        """
+        from distarray.localapi.format import register_codec
+
+        def _local_register_codec(name, compress, decompress):
+            from distarray.localapi.format import register_codec
+            register_codec(name, compress, decompress)
+
+        register_codec(name, compress, decompress)
+        self.apply(_local_register_codec, (name, compress, decompress),
+                   targets=self.targets)
 
-    def load_dnpy(self, name):
+    def load_dnpy(self, name, single_file=False, distribution=None,
+                  mmap_mode=None):
         """
         Load a distributed array from ``.dnpy`` files.
 
@@ -288,6 +573,19 @@ class BaseContext(object):
             If a list of str, each engine will use the name at the index
             corresponding to its rank.  An exception is raised if the length of
             this list is not the same as the context's communicator's size.
+            With `single_file`, the name of the file.
+        single_file : bool, optional
+            If True, load the one file `name` written by `save_dnpy` with
+            `single_file`.  Each engine reads only its own section of it.
+        distribution : Distribution or shape, optional
+            With `single_file`, how to distribute the loaded array (see
+            `Distribution`).  The default is a block distribution over this
+            context's targets.
+        mmap_mode : {None, 'r+', 'r', 'c'}, optional
+            If not None, each engine memory-maps the data of its file with
+            this mode (see `numpy.memmap`) instead of reading it, so that
+            only the pages that are used are read.  Not supported with
+            `single_file`.
 
         Returns
         -------
@@ -298,23 +596,29 @@ class BaseContext(object):
         ------
         TypeError
             If `name` is an iterable whose length is different from the
-            context's communicator's size.
+            context's communicator's size, or if `single_file` is True and
+            `name` is not a str.
 
         See Also
         --------
         save_dnpy : Saving files to load with with load_dnpy.
         """
+        if single_file:
+            if mmap_mode is not None:
+                errmsg = "`mmap_mode` is not supported with `single_file`."
+                raise ValueError(errmsg)
+            return self._load_dnpy_single_file(name, distribution)
 
-        def _local_load_dnpy(comm, fname_base):
+        def _local_load_dnpy(comm, fname_base, mmap_mode):
             from distarray.localapi import load_dnpy
             fname = "%s_%s.dnpy" % (fname_base, comm.Get_rank())
-            local_arr = load_dnpy(comm, fname)
+            local_arr = load_dnpy(comm, fname, mmap_mode=mmap_mode)
             return proxyize(local_arr)
 
-        def _local_load_dnpy_names(comm, fnames):
+        def _local_load_dnpy_names(comm, fnames, mmap_mode):
             from distarray.localapi import load_dnpy
             fname = fnames[comm.Get_rank()]
-            local_arr = load_dnpy(comm, fname)
+            local_arr = load_dnpy(comm, fname, mmap_mode=mmap_mode)
             return proxyize(local_arr)
 
         if isinstance(name, six.string_types):
@@ -328,9 +632,45 @@ class BaseContext(object):
             errmsg = "`name` must be a string or a list."
             raise TypeError(errmsg)
 
-        da_key = self.apply(func, (self.comm, name), targets=self.targets)
+        da_key = self.apply(func, (self.comm, name, mmap_mode),
+                            targets=self.targets)
         return DistArray.from_localarrays(da_key[0], context=self)
 
+    def _load_dnpy_single_file(self, filename, distribution):
+        if not isinstance(filename, six.string_types):
+            errmsg = "`name` must be a string with `single_file`."
+            raise TypeError(errmsg)
+
+        def _local_read_dnpy_header(filename):
+            from distarray.localapi import read_dnpy_header
+            header = read_dnpy_header(filename)
+            return header['shape'], header['descr']
+
+        shape, dtype = self.apply(_local_read_dnpy_header, (filename,),
+                                  targets=self.targets[:1])[0]
+        if distribution is None:
+            distribution = Distribution(self, shape)
+        else:
+            distribution = asdistribution(self, distribution)
+        if distribution.shape != tuple(shape):
+            msg = "Distribution has shape %r, but the file holds shape %r."
+            raise ValueError(msg % (distribution.shape, tuple(shape)))
+
+        def _local_load_dnpy_collective(filename, ddpr, comm):
+            from distarray.localapi import load_dnpy_collective
+            if len(ddpr):
+                dim_data = ddpr[comm.Get_rank()]
+            else:
+                dim_data = ()
+            return proxyize(load_dnpy_collective(comm, filename, dim_data))
+
+        ddpr = distribution.get_dim_data_per_rank()
+        da_key = self.apply(_local_load_dnpy_collective,
+                            (filename, ddpr, distribution.comm),
+                            targets=distribution.targets)
+        return DistArray.from_localarrays(da_key[0], distribution=distribution,
+                                          dtype=dtype)
+
     def save_hdf5(self, filename, da, key='buffer', mode='a'):
         """
         Save a DistArray to a dataset in an ``.hdf5`` file.
@@ -368,7 +708,36 @@ class BaseContext(object):
         self.apply(_local_save_dnpy, (filename, da.key, key, mode),
                    targets=da.targets)
 
-    def load_npy(self, filename, distribution):
+    def save_npy(self, filename, da):
+        """
+        Save a DistArray to a ``.npy`` file.
+
+        The engines write the file together: it is sized for the whole
+        array, and each engine writes its own elements at their offsets
+        with MPI-IO.  The file can be read with `numpy.load`.
+
+        Parameters
+        ----------
+        filename : str
+            Name of file to write to.  It is overwritten if it exists.
+        da : DistArray
+            Array to save to a file.
+
+        See Also
+        --------
+        load_npy : Loading a DistArray from a ``.npy`` file.
+        """
+        if da.dtype.hasobject:
+            errmsg = "Cannot save arrays of Python objects in parallel."
+            raise ValueError(errmsg)
+
+        def _local_save_npy(filename, local_arr):
+            from distarray.localapi import save_npy
+            save_npy(filename, local_arr)
+
+        self.apply(_local_save_npy, (filename, da.key), targets=da.targets)
+
+    def load_npy(self, filename, distribution, mmap_mode=None, scratch=None):
         """
         Load a DistArray from a dataset in a ``.npy`` file.
 
@@ -377,6 +746,15 @@ class BaseContext(object):
         filename : str
             Filename to load.
         distribution: Distribution object
+        mmap_mode : {None, 'r', 'c'}, optional
+            If not None, engines whose section of the file is contiguous
+            keep a view of the file memory-mapped with this mode, instead of
+            a copy (see `distarray.localapi.load_npy`).  With 'r' the loaded
+            DistArray is read-only.
+        scratch : str, optional
+            Copy the data to files in this directory on the engines, and
+            store the DistArray out of core there (see `empty`).  Cannot be
+            combined with `mmap_mode`.
 
         Returns
         -------
@@ -384,21 +762,48 @@ class BaseContext(object):
             A DistArray encapsulating the file loaded.
         """
 
-        def _local_load_npy(filename, ddpr, comm):
+        if mmap_mode is not None and scratch is not None:
+            raise ValueError("Cannot both memory-map the file and copy it "
+                             "to scratch.")
+
+        def _local_load_npy(filename, ddpr, comm, mmap_mode, scratch):
             from distarray.localapi import load_npy
             if len(ddpr):
                 dim_data = ddpr[comm.Get_rank()]
             else:
                 dim_data = ()
-            return proxyize(load_npy(comm, filename, dim_data))
+            return proxyize(load_npy(comm, filename, dim_data, mmap_mode,
+                                     scratch))
 
         ddpr = distribution.get_dim_data_per_rank()
 
-        da_key = self.apply(_local_load_npy, (filename, ddpr, distribution.comm),
+        da_key = self.apply(_local_load_npy,
+                            (filename, ddpr, distribution.comm, mmap_mode,
+                             scratch),
                             targets=distribution.targets)
         return DistArray.from_localarrays(da_key[0], distribution=distribution)
 
-    def load_hdf5(self, filename, distribution, key='buffer'):
+    def _hdf5_distribution(self, filename, key):
+        """Distribute the dataset `key` of `filename` along its chunks."""
+
+        def _local_hdf5_layout(filename, key):
+            import h5py
+            with h5py.File(filename, mode='r') as fp:
+                dset = fp[key]
+                return dset.shape, dset.chunks
+
+        shape, chunks = self.apply(_local_hdf5_layout, (filename, key),
+                                   targets=self.targets[:1])[0]
+        if chunks is None:
+            return Distribution(self, shape)
+        bounds = chunk_aligned_bounds(shape, chunks, len(self.targets))
+        nprocs = int(numpy.prod([len(b) - 1 for b in bounds]))
+        global_dim_data = tuple({'dist_type': 'b', 'bounds': b}
+                                for b in bounds)
+        return Distribution.from_global_dim_data(
+            self, global_dim_data, targets=self.targets[:nprocs])
+
+    def load_hdf5(self, filename, distribution=None, key='buffer'):
         """
         Load a DistArray from a dataset in an ``.hdf5`` file.
 
@@ -406,7 +811,12 @@ class BaseContext(object):
         ----------
         filename : str
             Filename to load.
-        distribution: Distribution object
+        distribution: Distribution object, optional
+            If not given, the dataset's layout decides: a chunked dataset is
+            split into blocks of whole chunks (see
+            `distarray.metadata_utils.chunk_aligned_bounds`), so that each
+            chunk is read and decompressed by one engine only; a contiguous
+            one gets the default block distribution.
         key : str, optional
             The identifier for the group to load the DistArray from (the
             default is 'buffer').
@@ -422,6 +832,9 @@ class BaseContext(object):
             errmsg = "An MPI-enabled h5py must be available to use load_hdf5."
             raise ImportError(errmsg)
 
+        if distribution is None:
+            distribution = self._hdf5_distribution(filename, key)
+
         def _local_load_hdf5(filename, ddpr, comm, key):
             from distarray.localapi import load_hdf5
             if len(ddpr):
@@ -472,9 +885,16 @@ class BaseContext(object):
         `fromfunction` is restricted to the same Distribution as the
         index array generated from `shape`.
 
+        By default the function is called once per element with integer
+        global indices.  With ``vectorized=True`` it is instead called once
+        per engine with broadcastable arrays of global indices, as numpy
+        does, which is much faster for functions written with array
+        operations.  ``vectorized=None`` tries the vectorized call and, if
+        it raises TypeError or ValueError, warns and falls back to
+        per-element calls.  See `distarray.localapi.fromfunction`.
+
         See numpy.fromfunction for more details.
         """
-
         self.push_function(function.__name__, function, targets=self.targets)
 
         def _local_fromfunction(func_name, comm, ddpr, kwargs):
@@ -493,8 +913,8 @@ class BaseContext(object):
             local_arr = fromfunction(func, dist, **kwargs)
             return proxyize(local_arr)
 
-        dist = kwargs.get('dist', None)
-        grid_shape = kwargs.get('grid_shape', None)
+        dist = kwargs.pop('dist', None)
+        grid_shape = kwargs.pop('grid_shape', None)
         distribution = Distribution(context=self,
                                     shape=shape, dist=dist,
                                     grid_shape=grid_shape)
@@ -631,6 +1051,9 @@ class IPythonContext(BaseContext):
                 else:
                     self.targets.append(target)
         self.targets = sorted(self.targets)
+        self.reset_gather_log()
+        self._node_ids = None
+        self.backend = 'numpy'
 
         # local imports
         self.view.execute("from functools import reduce; "
@@ -743,7 +1166,8 @@ class IPythonContext(BaseContext):
     def _push(self, d, targets):
         return self.view.push(d, targets=targets, block=True)
 
-    def apply(self, func, args=None, kwargs=None, targets=None, autoproxyize=False):
+    def apply(self, func, args=None, kwargs=None, targets=None,
+              autoproxyize=False, per_target_args=None):
         """
         Analogous to IPython.parallel.view.apply_sync
 
@@ -758,6 +1182,9 @@ class IPythonContext(BaseContext):
             engines func is to be run on.
         autoproxyize: bool, default False
             If True, implicitly return a Proxy object from the function.
+        per_target_args : dict, optional
+            Maps each target to a tuple of extra positional arguments that
+            are appended to `args` on that target only.
 
         Returns
         -------
@@ -773,10 +1200,11 @@ class IPythonContext(BaseContext):
             from importlib import import_module
             import types
             from distarray.metadata_utils import arg_kwarg_proxy_converter
-            from distarray.localapi import LocalArray
+            from distarray.localapi import LocalArray, backends
 
             main = import_module('__main__')
             main.proxyize.set_state(apply_nonce)
+            backends.activate(context_key)
 
             # Modify func to change the namespace it executes in.
             # but builtins don't have __code__, __globals__, etc.
@@ -815,8 +1243,18 @@ class IPythonContext(BaseContext):
 
         targets = self.targets if targets is None else targets
 
-        with self.view.temp_flags(targets=targets):
-            return self.view.apply_sync(func_wrapper, *wrapped_args)
+        with self._lock:
+            if per_target_args is not None:
+                pending = []
+                for target in targets:
+                    target_args = args + tuple(per_target_args[target])
+                    pending.append(self.client[target].apply_async(
+                        func_wrapper, func, apply_nonce, self.context_key,
+                        target_args, kwargs, autoproxyize))
+                return [result.get() for result in pending]
+
+            with self.view.temp_flags(targets=targets):
+                return self.view.apply_sync(func_wrapper, *wrapped_args)
 
     def push_function(self, key, func, targets=None):
         targets = targets or self.targets
@@ -859,6 +1297,9 @@ class MPIContext(BaseContext):
         self.nengines = MPIContext.INTERCOMM.remote_size
         self.all_targets = list(range(self.nengines))
         self.targets = self.all_targets if targets is None else sorted(targets)
+        self.reset_gather_log()
+        self._node_ids = None
+        self.backend = 'numpy'
 
         # make/get comms
         # this is the object we want to use with push, pull, etc'
@@ -904,14 +1345,16 @@ class MPIContext(BaseContext):
 
     def _send_msg(self, msg, targets=None):
         targets = self.targets if targets is None else targets
-        for t in targets:
-            MPIContext.INTERCOMM.send(msg, dest=t)
+        with self._lock:
+            for t in targets:
+                MPIContext.INTERCOMM.send(msg, dest=t)
 
     def _recv_msg(self, targets=None):
         res = []
         targets = self.targets if targets is None else targets
-        for t in targets:
-            res.append(MPIContext.INTERCOMM.recv(source=t))
+        with self._lock:
+            for t in targets:
+                res.append(MPIContext.INTERCOMM.recv(source=t))
         return res
 
     def make_subcomm(self, targets):
@@ -929,8 +1372,9 @@ class MPIContext(BaseContext):
             pass
 
         msg = ('make_targets_comm', targets)
-        self._send_msg(msg, targets=self.all_targets)
-        new_comm = make_targets_comm(targets)
+        with self._lock:
+            self._send_msg(msg, targets=self.all_targets)
+            new_comm = make_targets_comm(targets)
         self._comm_from_targets[tuple(targets)] = new_comm
         return new_comm
 
@@ -942,7 +1386,8 @@ class MPIContext(BaseContext):
         msg = ('push', d)
         return self._send_msg(msg, targets=targets)
 
-    def apply(self, func, args=None, kwargs=None, targets=None, autoproxyize=False):
+    def apply(self, func, args=None, kwargs=None, targets=None,
+              autoproxyize=False, per_target_args=None):
         """
         Analogous to IPython.parallel.view.apply_sync
 
@@ -957,6 +1402,9 @@ class MPIContext(BaseContext):
             engines func is to be run on.
         autoproxyize: bool, default False
             If True, implicitly return a Proxy object from the function.
+        per_target_args : dict, optional
+            Maps each target to a tuple of extra positional arguments that
+            are appended to `args` on that target only.
 
         Returns
         -------
@@ -984,13 +1432,22 @@ class MPIContext(BaseContext):
 
             func_data = (func_code, func_name, func_defaults, func_closure)
 
-            msg = ('func_call', func_data, args, kwargs, apply_metadata, autoproxyize)
+            def make_msg(args):
+                return ('func_call', func_data, args, kwargs, apply_metadata,
+                        autoproxyize)
 
         else:
-            msg = ('builtin_call', func, args, kwargs, autoproxyize)
+            def make_msg(args):
+                return ('builtin_call', func, args, kwargs, autoproxyize)
 
-        self._send_msg(msg, targets=targets)
-        return self._recv_msg(targets=targets)
+        with self._lock:
+            if per_target_args is None:
+                self._send_msg(make_msg(args), targets=targets)
+            else:
+                for target in targets:
+                    target_args = args + tuple(per_target_args[target])
+                    self._send_msg(make_msg(target_args), targets=[target])
+            return self._recv_msg(targets=targets)
 
     def push_function(self, key, func, targets=None):
         push_function(self, key, func, targets=targets)
@@ -19,17 +19,23 @@ from __future__ import absolute_import, division
 import operator
 from itertools import product
 from functools import reduce
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 
 import distarray.localapi
-from distarray.metadata_utils import sanitize_indices
+from distarray.localapi import format
+from distarray.localapi.maps import map_from_dim_dict
+from distarray.metadata_utils import sanitize_indices, sanitize_fancy_indices
 from distarray.globalapi.maps import Distribution, asdistribution
 from distarray.utils import _raise_nie
 from distarray.metadata_utils import normalize_reduction_axes
 
 __all__ = ['DistArray']
 
+# Default size of the blocks of `DistArray.to_npy_stream`.
+STREAM_BLOCK_BYTES = 2 ** 26
+
 
 # ---------------------------------------------------------------------------
 # Code
@@ -39,10 +45,14 @@ class DistArray(object):
 
     __array_priority__ = 20.0
 
-    def __init__(self, distribution, dtype=float):
-        """Creates an empty DistArray according to the `distribution` given."""
+    def __init__(self, distribution, dtype=float, shared=False):
+        """Creates an empty DistArray according to the `distribution` given.
+
+        If `shared` is True, the LocalArrays are allocated in shared memory
+        windows; see `Context.empty`.
+        """
 
-        def _local_create(comm, ddpr, dtype):
+        def _local_create(comm, ddpr, dtype, shared):
             from distarray.localapi import empty
             from distarray.localapi.maps import Distribution
             if len(ddpr):
@@ -50,21 +60,23 @@ class DistArray(object):
             else:
                 dim_data = ()
             dist = Distribution(comm=comm, dim_data=dim_data)
-            return proxyize(empty(dist, dtype))
+            return proxyize(empty(dist, dtype, shared=shared))
 
         ctx = distribution.context
         ddpr = distribution.get_dim_data_per_rank()
 
-        da_key = ctx.apply(_local_create, (distribution.comm, ddpr, dtype),
+        da_key = ctx.apply(_local_create,
+                           (distribution.comm, ddpr, dtype, shared),
                            targets=distribution.targets)
 
         self.distribution = distribution
         self.key = da_key[0]
         self._dtype = dtype
+        self.shared = shared
 
     @classmethod
     def from_localarrays(cls, key, context=None, targets=None, distribution=None,
-                         dtype=None):
+                         dtype=None, shared=False):
         """The caller has already created the LocalArray objects.  `key` is
         their name on the engines.  This classmethod creates a DistArray that
         refers to these LocalArrays.
@@ -76,6 +88,9 @@ class DistArray(object):
         reflect the  distribution of the existing ``LocalArray``\s.
 
         If `dtype` is not provided, it will be fetched from the engines.
+
+        `shared` tells whether the ``LocalArray``\s are in shared memory
+        windows (see `Context.empty`).
         """
 
         def get_dim_datas_and_dtype(arr):
@@ -83,6 +98,7 @@ class DistArray(object):
 
         da = cls.__new__(cls)
         da.key = key
+        da.shared = shared
 
         if (context is None) == (distribution is None):
             errmsg = "Must provide `context` or `distribution` but not both."
@@ -192,7 +208,265 @@ class DistArray(object):
         else:
             return result
 
+    def _is_mask(self, index):
+        if isinstance(index, DistArray):
+            return True
+        return (isinstance(index, (list, np.ndarray)) and
+                np.asarray(index).dtype == np.bool_)
+
+    def _check_mask(self, mask):
+        """Return the key of a DistArray `mask`, or `mask` as an ndarray."""
+        if isinstance(mask, DistArray):
+            if mask.dtype != np.bool_:
+                raise IndexError("DistArray indices must be boolean.")
+            if not mask.distribution.is_compatible(self.distribution):
+                raise ValueError("mask Distribution not compatible.")
+            return mask.key
+        mask = np.asarray(mask)
+        if mask.shape != self.shape:
+            msg = "mask shape %r does not match array shape %r."
+            raise IndexError(msg % (mask.shape, self.shape))
+        return mask
+
+    def _is_row_major(self):
+        """Whether the LocalArrays, in rank order, hold the elements in C
+        order.
+        """
+        ranks = self.distribution.rank_from_coords.ravel()
+        return (self.dist[0] in ('b', 'n') and
+                all(g == 1 for g in self.grid_shape[1:]) and
+                np.array_equal(ranks, np.arange(len(ranks))))
+
+    def _mask_args(self, mask_key, distribution):
+        """Return the apply arguments for a mask checked by `_check_mask`.
+
+        A DistArray mask is passed by key; an ndarray mask is cut into the
+        section each target holds, so that no engine gets the whole mask.
+        """
+        if not isinstance(mask_key, np.ndarray):
+            return (mask_key,), None
+        return (), self._sections(mask_key, distribution)
+
+    @staticmethod
+    def _sections(array, distribution):
+        """Map each target of `distribution` to a 1-tuple holding the
+        section of the global ndarray `array` that it owns.
+        """
+        try:
+            ddpr = distribution.get_dim_data_per_rank()
+        except ValueError:  # unstructured maps with unknown indices
+            return {t: (array,) for t in distribution.targets}
+        sections = {}
+        for target, dim_data in zip(distribution.targets, ddpr):
+            index = [map_from_dim_dict(dd).global_indices
+                     for dd in dim_data]
+            sections[target] = (array[np.ix_(*index)],)
+        return sections
+
+    def _get_masked(self, mask):
+        """Select the elements where `mask` is True into a 1-D DistArray.
+
+        The result holds the selected elements in C order, block
+        distributed.  Unless the LocalArrays already hold the elements in C
+        order, the array (and a DistArray `mask`) are first redistributed
+        with `distribute_as`, which only handles block and undistributed
+        dimensions: for arrays with cyclic, block-cyclic or unstructured
+        dimensions this raises NotImplementedError.
+        """
+        arr = self
+        if not self._is_row_major():
+            # Redistribute so that the compacted elements are in C order.
+            dist = Distribution(self.context, self.shape,
+                                dist=('b',) + ('n',) * (self.ndim - 1),
+                                targets=self.targets)
+            arr = self.distribute_as(dist)
+            if isinstance(mask, DistArray):
+                mask = mask.distribute_as(dist)
+        mask_args, mask_sections = self._mask_args(arr._check_mask(mask),
+                                                    arr.distribution)
+
+        def local_compress(arr, mask):
+            from distarray.localapi import LocalArray
+            if isinstance(mask, LocalArray):
+                mask = mask.ndarray
+            values = arr.ndarray[mask]
+            count = len(values)
+            offset = arr.comm.exscan(count)
+            if arr.comm.Get_rank() == 0:
+                offset = 0
+            total = arr.comm.allreduce(count)
+            return proxyize(values), offset, count, total  # noqa
+
+        res = self.context.apply(local_compress, args=(arr.key,) + mask_args,
+                                 targets=arr.targets,
+                                 per_target_args=mask_sections)
+        values_key = res[0][0]
+        nprocs = len(res)
+        ddpr = [({'dist_type': 'b',
+                  'size': total,
+                  'start': offset,
+                  'stop': offset + count,
+                  'proc_grid_size': nprocs,
+                  'proc_grid_rank': rank},)
+                for rank, (_, offset, count, total) in enumerate(res)]
+        distribution = Distribution.from_dim_data_per_rank(self.context, ddpr,
+                                                           arr.targets)
+
+        def local_wrap(values, comm, ddpr):
+            from distarray.localapi import LocalArray
+            from distarray.localapi.maps import Distribution
+            dist = Distribution(comm=comm, dim_data=ddpr[comm.Get_rank()])
+            return proxyize(LocalArray(dist, buf=values))  # noqa
+
+        key = self.context.apply(local_wrap,
+                                 args=(values_key, distribution.comm, ddpr),
+                                 targets=arr.targets)[0]
+        self.context.delete_key(values_key, arr.targets)
+        return DistArray.from_localarrays(key, distribution=distribution,
+                                          dtype=self.dtype)
+
+    def _set_masked(self, mask, value):
+        """Set the elements where `mask` is True to `value`."""
+        mask_args, mask_sections = self._mask_args(self._check_mask(mask),
+                                                    self.distribution)
+        if not np.isscalar(value):
+            value = np.asarray(value)
+            if value.ndim != 1:
+                raise ValueError("masked assignment needs a scalar or a "
+                                 "1-D array of values.")
+            if not self._is_row_major():
+                msg = ("Masked assignment of an array of values is only "
+                       "implemented when the first axis alone is block "
+                       "distributed.")
+                raise NotImplementedError(msg)
+
+        def local_set_masked(arr, value, mask):
+            import numpy
+            from distarray.localapi import LocalArray
+            if isinstance(mask, LocalArray):
+                mask = mask.ndarray
+            if numpy.isscalar(value):
+                arr.ndarray[mask] = value
+                return True
+            count = int(mask.sum())
+            offset = arr.comm.exscan(count)
+            if arr.comm.Get_rank() == 0:
+                offset = 0
+            total = arr.comm.allreduce(count)
+            if total != len(value):
+                return False
+            arr.ndarray[mask] = value[offset:offset + count]
+            return True
+
+        res = self.context.apply(local_set_masked,
+                                 args=(self.key, value) + mask_args,
+                                 targets=self.targets,
+                                 per_target_args=mask_sections)
+        if not all(res):
+            raise ValueError("Number of values does not match the number of "
+                             "True elements in the mask.")
+
+    def _group_outer(self, indices):
+        """Group 1-D per-dimension `indices` by owner.
+
+        Returns a dict mapping each target that owns part of the outer
+        selection to the positions, per dimension, of its indices.
+        """
+        candidates = []
+        for m, idx in zip(self.distribution.maps, indices):
+            try:
+                owners = m.index_owners_array(idx)
+            except NotImplementedError:
+                everything = np.arange(len(idx))
+                candidates.append([everything] * m.grid_size)
+            else:
+                candidates.append([np.flatnonzero(owners == coord)
+                                   for coord in range(m.grid_size)])
+        groups = {}
+        for coords in product(*[range(len(c)) for c in candidates]):
+            positions = tuple(c[coord] for (c, coord) in zip(candidates, coords))
+            if all(len(p) for p in positions):
+                rank = self.distribution.rank_from_coords[coords]
+                groups[self.targets[rank]] = positions
+        return groups
+
+    def _get_fancy(self, index_type, indices):
+        """Gather the elements at integer-array `indices` to the client.
+
+        Each owning engine is sent just the indices it holds.
+        """
+        outer = (index_type == 'outer')
+        if outer:
+            shape = sum((i.shape for i in indices), ())
+            indices = tuple(i.ravel() for i in indices)
+            groups = self._group_outer(indices)
+            result = np.empty(tuple(i.size for i in indices), dtype=self.dtype)
+        else:
+            shape = indices[0].shape
+            indices = tuple(i.ravel() for i in indices)
+            groups = self._group_by_owner(indices)
+            result = np.empty(indices[0].size, dtype=self.dtype)
+        if not groups:
+            return result.reshape(shape)
+        targets = sorted(groups)
+        payload = {t: (_select(indices, groups[t], outer),) for t in targets}
+
+        def local_take(arr, outer, indices):
+            from distarray.localapi import take_global
+            return take_global(arr, indices, outer)
+
+        res = self.context.apply(local_take, args=(self.key, outer),
+                                 targets=targets, per_target_args=payload)
+        for target, (positions, values) in zip(targets, res):
+            group = groups[target]
+            if outer:
+                index = np.ix_(*[g[p] for (g, p) in zip(group, positions)])
+                result[index] = values
+            else:
+                result[group[positions]] = values
+        return result.reshape(shape)
+
+    def _set_fancy(self, index_type, indices, value):
+        """Scatter `value` to the elements at integer-array `indices`.
+
+        Each owning engine is sent just its indices and values.
+        """
+        outer = (index_type == 'outer')
+        if outer:
+            shape = sum((i.shape for i in indices), ())
+            indices = tuple(i.ravel() for i in indices)
+            flat_shape = tuple(i.size for i in indices)
+            groups = self._group_outer(indices)
+        else:
+            shape = indices[0].shape
+            indices = tuple(i.ravel() for i in indices)
+            flat_shape = (indices[0].size,)
+            groups = self._group_by_owner(indices)
+        value = np.broadcast_to(np.asarray(value, dtype=self.dtype), shape)
+        value = value.reshape(flat_shape)
+        if not groups:
+            return
+        targets = sorted(groups)
+        payload = {}
+        for t in targets:
+            group = groups[t]
+            value_index = np.ix_(*group) if outer else group
+            payload[t] = (_select(indices, group, outer), value[value_index])
+
+        def local_put(arr, outer, indices, value):
+            from distarray.localapi import put_global
+            put_global(arr, indices, value, outer)
+
+        self.context.apply(local_put, args=(self.key, outer),
+                           targets=targets, per_target_args=payload)
+
     def __getitem__(self, index):
+        if self._is_mask(index):
+            return self._get_masked(index)
+        fancy = sanitize_fancy_indices(index, self.shape)
+        if fancy is not None:
+            return self._get_fancy(*fancy)
+
         return_type, index = sanitize_indices(index, ndim=self.ndim,
                                               shape=self.shape)
         if not self.distribution.has_precise_index:
@@ -265,6 +539,14 @@ class DistArray(object):
             raise IndexError("Index %s is out of bounds" % (index,))
 
     def __setitem__(self, index, value):
+        if self._is_mask(index):
+            self._set_masked(index, value)
+            return
+        fancy = sanitize_fancy_indices(index, self.shape)
+        if fancy is not None:
+            self._set_fancy(fancy[0], fancy[1], value)
+            return
+
         set_type, index = sanitize_indices(index, ndim=self.ndim,
                                            shape=self.shape)
         if not self.distribution.has_precise_index:
@@ -276,6 +558,109 @@ class DistArray(object):
         else:
             assert False
 
+    def _group_points(self, index_array):
+        """Sanitize the points in `index_array` and group them by owner.
+
+        Returns the index arrays of the points (one per dimension) and a
+        dict mapping each owning target to the positions of its points.
+        """
+        index_array = np.asarray(index_array)
+        if index_array.ndim == 1 and self.ndim == 1:
+            index_array = index_array[:, np.newaxis]
+        if index_array.ndim != 2 or index_array.shape[1] != self.ndim:
+            msg = "index_array must have shape (npoints, %d)."
+            raise IndexError(msg % self.ndim)
+        _, idxs = sanitize_fancy_indices(tuple(index_array.T), self.shape)
+        return idxs, self._group_by_owner(idxs)
+
+    def _group_by_owner(self, idxs):
+        """Group the points with coordinates `idxs` by owner.
+
+        Returns a dict mapping each owning target to the positions of its
+        points.  If the owners aren't known precisely, every target gets
+        all the points.
+        """
+        try:
+            ranks = self.distribution.owning_ranks_array(idxs)
+        except NotImplementedError:
+            everything = np.arange(len(idxs[0]))
+            return {t: everything for t in self.targets if len(everything)}
+        order = np.argsort(ranks, kind='mergesort')
+        bounds = np.searchsorted(ranks[order], np.arange(len(self.targets) + 1))
+        groups = {}
+        for rank, target in enumerate(self.targets):
+            positions = order[bounds[rank]:bounds[rank + 1]]
+            if len(positions):
+                groups[target] = positions
+        return groups
+
+    def take_points(self, index_array):
+        """Return the values at a set of points.
+
+        The points are grouped by owner on the client, so each engine gets
+        a single message with just its own points.
+
+        Parameters
+        ----------
+        index_array : array_like of int, shape (npoints, ndim)
+            The global coordinates of the points.  For 1-D arrays, shape
+            (npoints,) is also accepted.
+
+        Returns
+        -------
+        ndarray of shape (npoints,)
+            The values, in the order of `index_array`.
+        """
+        idxs, groups = self._group_points(index_array)
+        result = np.empty(len(idxs[0]), dtype=self.dtype)
+        if not groups:
+            return result
+        targets = sorted(groups)
+        payload = {t: (tuple(idx[groups[t]] for idx in idxs),)
+                   for t in targets}
+
+        def local_take_points(arr, indices):
+            from distarray.localapi import take_global
+            return take_global(arr, indices)
+
+        res = self.context.apply(local_take_points, args=(self.key,),
+                                 targets=targets, per_target_args=payload)
+        for target, (positions, values) in zip(targets, res):
+            result[groups[target][positions]] = values
+        return result
+
+    def put_points(self, index_array, values):
+        """Set the values at a set of points.
+
+        Parameters
+        ----------
+        index_array : array_like of int, shape (npoints, ndim)
+            The global coordinates of the points.  For 1-D arrays, shape
+            (npoints,) is also accepted.
+        values : array_like
+            Broadcast to shape (npoints,).
+
+        See Also
+        --------
+        take_points
+        """
+        idxs, groups = self._group_points(index_array)
+        values = np.broadcast_to(np.asarray(values, dtype=self.dtype),
+                                 idxs[0].shape)
+        if not groups:
+            return
+        targets = sorted(groups)
+        payload = {t: (tuple(idx[groups[t]] for idx in idxs),
+                       values[groups[t]])
+                   for t in targets}
+
+        def local_put_points(arr, indices, values):
+            from distarray.localapi import put_global
+            put_global(arr, indices, values)
+
+        self.context.apply(local_put_points, args=(self.key,),
+                           targets=targets, per_target_args=payload)
+
     @property
     def context(self):
         return self.distribution.context
@@ -310,7 +695,7 @@ class DistArray(object):
 
     @property
     def itemsize(self):
-        return self._dtype.itemsize
+        return self.dtype.itemsize
 
     @property
     def targets(self):
@@ -318,14 +703,20 @@ class DistArray(object):
 
     @property
     def __array_interface__(self):
+        self.context._check_gather(self)
         return {'shape': self.shape,
                 'typestr': self.dtype.str,
                 'data': self.tondarray(),
                 'version': 3}
 
     def tondarray(self):
-        """Returns the distributed array as an ndarray."""
+        """Returns the distributed array as an ndarray.
+
+        A shared DistArray is gathered from one engine per node.
+        """
         arr = np.empty(self.shape, dtype=self.dtype)
+        if self.shared:
+            return self._node_gather(arr)
         local_arrays = self.get_localarrays()
         try:
             for local_array in local_arrays:
@@ -342,12 +733,106 @@ class DistArray(object):
 
     toarray = tondarray
 
+    def _node_gather(self, arr):
+        """Fill `arr` from the lowest target on each node, which reads the
+        shared memory of the other targets on its node.
+        """
+        def _local_node_gather(larr):
+            from distarray.localapi import node_gather
+            return node_gather(larr)
+
+        leaders = []
+        seen = set()
+        for target, node in zip(self.targets,
+                                self.context.node_ids(self.targets)):
+            if node not in seen:
+                seen.add(node)
+                leaders.append(target)
+        results = self.context.apply(_local_node_gather, (self.key,),
+                                     targets=leaders)
+        for pieces in results:
+            for global_indices, ndarray in pieces:
+                arr[np.ix_(*global_indices)] = ndarray
+        return arr
+
+    def iter_blocks(self, block_shape):
+        """Iterate over the array in blocks of at most `block_shape`.
+
+        Yields ``(index, block)`` pairs in C order of the blocks, where
+        `index` is a tuple of slices and `block` is an ndarray holding
+        ``self[index]``.  The next block is gathered in a background thread
+        while the current one is processed, so the client holds about two
+        blocks at a time, whatever the size of the array.
+        """
+        block_shape = tuple(block_shape)
+        if len(block_shape) != self.ndim or any(b < 1 for b in block_shape):
+            msg = "block_shape must hold a positive size per dimension: %r"
+            raise ValueError(msg % (block_shape,))
+        return self._iter_blocks(block_shape)
+
+    def _iter_blocks(self, block_shape):
+
+        def _local_global_block(larr, bounds):
+            from distarray.localapi import global_block
+            return global_block(larr, bounds)
+
+        def fetch(index):
+            block = np.empty(tuple(s.stop - s.start for s in index),
+                             dtype=self.dtype)
+            bounds = tuple((s.start, s.stop) for s in index)
+            pieces = self.context.apply(_local_global_block,
+                                        (self.key, bounds),
+                                        targets=self.targets)
+            for piece in pieces:
+                if piece is not None:
+                    positions, ndarray = piece
+                    block[np.ix_(*positions)] = ndarray
+            return block
+
+        corners = product(*(range(0, n, b)
+                            for (n, b) in zip(self.shape, block_shape)))
+        indices = (tuple(slice(start, min(start + b, n))
+                         for (start, b, n) in zip(corner, block_shape,
+                                                  self.shape))
+                   for corner in corners)
+
+        pool = ThreadPool(1)
+        try:
+            pending = None
+            for index in indices:
+                prefetch = (index, pool.apply_async(fetch, (index,)))
+                if pending is not None:
+                    yield pending[0], pending[1].get()
+                pending = prefetch
+            if pending is not None:
+                yield pending[0], pending[1].get()
+        finally:
+            pool.close()
+            pool.join()
+
+    def to_npy_stream(self, filename, block_bytes=STREAM_BLOCK_BYTES):
+        """Save the array to the ``.npy`` file `filename` on the client.
+
+        The data goes through the client in blocks of at most about
+        `block_bytes` bytes (see `iter_blocks`), written in order, so
+        arrays larger than the client's memory can be saved.
+        """
+        if self.dtype.hasobject:
+            raise ValueError("Cannot stream arrays of Python objects.")
+        block_shape = _stream_block_shape(self.shape, self.itemsize,
+                                          block_bytes)
+        with open(filename, 'wb') as fp:
+            format.write_npy_header(fp, self.dtype, self.shape)
+            for _, block in self.iter_blocks(block_shape):
+                block.tofile(fp)
+
     def fill(self, value):
         def inner_fill(arr, value):
             arr.fill(value)
         self.context.apply(inner_fill, args=(self.key, value), targets=self.targets)
 
-    def _reduce(self, local_reduce_name, axes=None, dtype=None, out=None):
+    def _reduce(self, local_reduce_name, axes=None, dtype=None, out=None,
+                reducer_args=()):
 
         if any(0 in localshape for localshape in self.localshapes()):
             raise NotImplementedError("Reduction not implemented for empty "
@@ -361,15 +846,18 @@ class DistArray(object):
         out_dist = self.distribution.reduce(axes=axes)
         ddpr = out_dist.get_dim_data_per_rank()
 
-        def _local_reduce(local_name, larr, out_comm, ddpr, dtype, axes):
+        def _local_reduce(local_name, larr, out_comm, ddpr, dtype, axes,
+                          reducer_args):
+            from functools import partial
             import distarray.localapi.localarray as la
-            local_reducer = getattr(la, local_name)
+            local_reducer = partial(getattr(la, local_name), *reducer_args)
             res = proxyize(la.local_reduction(out_comm, local_reducer, larr,  # noqa
                                               ddpr, dtype, axes))
             return res
 
         local_reduce_args = (local_reduce_name, self.key, out_dist.comm, ddpr,
-                             dtype, normalize_reduction_axes(axes, self.ndim))
+                             dtype, normalize_reduction_axes(axes, self.ndim),
+                             reducer_args)
         out_key = self.context.apply(_local_reduce, local_reduce_args,
                                      targets=self.targets)[0]
 
@@ -402,6 +890,16 @@ class DistArray(object):
         """Return the maximum of array elements over the given axis."""
         return self._reduce('max_reducer', axis, dtype, out)
 
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        return distarray.globalapi.functions.apply_ufunc(ufunc, method,
+                                                         inputs, kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        array_functions = distarray.globalapi.functions.array_functions
+        if func not in array_functions:
+            return NotImplemented
+        return array_functions[func](*args, **kwargs)
+
     def get_ndarrays(self):
         """Pull the local ndarrays from the engines.
 
@@ -495,7 +993,7 @@ class DistArray(object):
         return DistArray.from_localarrays(key=new_key, distribution=new_dist,
                                           dtype=dtype)
 
-    def distribute_as(self, shape_or_dist):
+    def distribute_as(self, shape_or_dist, shared=False):
         """
         Redistributes this DistArray, returning a new DistArray with the same
         data and corresponding distribution.
@@ -507,6 +1005,11 @@ class DistArray(object):
             the same number of items as this distarray.  The global shape and
             targets may be different.  If shape tuple, immediately converted to
             a Distribution object with default parameters.
+        shared : bool, optional
+            Allocate the new DistArray in shared memory (see
+            `Context.empty`).  Independently of this, if this DistArray is
+            shared and keeps its shape, engines read the parts they need
+            from engines on the same node directly.
 
         Returns
         -------
@@ -548,7 +1051,7 @@ class DistArray(object):
 
         plan = self.distribution.get_redist_plan(dist)
         ubercomm, all_targets = self.distribution.comm_union(dist)
-        result = DistArray(dist, dtype=self.dtype)
+        result = DistArray(dist, dtype=self.dtype, shared=shared)
 
         self.context.apply(_local_redistribute, (ubercomm, plan, self.key, result.key),
                                                 targets=all_targets)
@@ -650,6 +1153,47 @@ class DistArray(object):
     def __rxor__(self, other, *args, **kwargs):
         return self._rbinary_op_from_ufunc(other, distarray.globalapi.bitwise_xor, '__xor__', *args, **kwargs)
 
+    # Binary - in-place versions
+
+    def __iadd__(self, other):
+        return distarray.globalapi.add(self, other, out=self)
+
+    def __isub__(self, other):
+        return distarray.globalapi.subtract(self, other, out=self)
+
+    def __imul__(self, other):
+        return distarray.globalapi.multiply(self, other, out=self)
+
+    def __idiv__(self, other):
+        return distarray.globalapi.divide(self, other, out=self)
+
+    def __itruediv__(self, other):
+        return distarray.globalapi.true_divide(self, other, out=self)
+
+    def __ifloordiv__(self, other):
+        return distarray.globalapi.floor_divide(self, other, out=self)
+
+    def __imod__(self, other):
+        return distarray.globalapi.mod(self, other, out=self)
+
+    def __ipow__(self, other, modulo=None):
+        return distarray.globalapi.power(self, other, out=self)
+
+    def __ilshift__(self, other):
+        return distarray.globalapi.left_shift(self, other, out=self)
+
+    def __irshift__(self, other):
+        return distarray.globalapi.right_shift(self, other, out=self)
+
+    def __iand__(self, other):
+        return distarray.globalapi.bitwise_and(self, other, out=self)
+
+    def __ior__(self, other):
+        return distarray.globalapi.bitwise_or(self, other, out=self)
+
+    def __ixor__(self, other):
+        return distarray.globalapi.bitwise_xor(self, other, out=self)
+
     def __neg__(self, *args, **kwargs):
         return distarray.globalapi.negative(self, *args, **kwargs)
 
@@ -681,3 +1225,29 @@ class DistArray(object):
 
     def __ge__(self, other, *args, **kwargs):
         return self._binary_op_from_ufunc(other, distarray.globalapi.greater_equal, '__ge__', *args, **kwargs)
+
+
+def _select(indices, positions, outer):
+    """Select `positions` from 1-D integer-array `indices`; see
+    `DistArray._get_fancy`.
+    """
+    if outer:
+        return tuple(idx[p] for (idx, p) in zip(indices, positions))
+    return tuple(idx[positions] for idx in indices)
+
+
+def _stream_block_shape(shape, itemsize, block_bytes):
+    """Return the largest block shape of at most `block_bytes` bytes (or of
+    a single element) whose blocks, in C order, are consecutive runs of
+    the array in C order; see `DistArray.to_npy_stream`.
+    """
+    if len(shape) == 0:
+        return ()
+    # the first axis whose subarrays fit in a block
+    for axis in range(len(shape)):
+        inner = itemsize * int(np.prod(shape[axis + 1:]))
+        if inner <= block_bytes:
+            break
+    count = max(1, min(shape[axis], block_bytes // max(inner, 1)))
+    return ((1,) * axis + (count,) +
+            tuple(max(1, n) for n in shape[axis + 1:]))
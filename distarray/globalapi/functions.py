@@ -13,41 +13,70 @@ from __future__ import absolute_import
 import numpy
 
 from distarray.error import ContextError
+from distarray.metadata_utils import positivify, broadcast_shape
 from distarray.globalapi.distarray import DistArray
+from distarray.globalapi.maps import Distribution
 
 
-__all__ = []  # unary_names and binary_names added to __all__ below.
+__all__ = ['clip', 'where', 'empty_like', 'zeros_like', 'ones_like',
+           'full_like']  # unary_names and binary_names added below.
 
 # numpy unary operations to wrap
 unary_names = ('absolute', 'arccos', 'arccosh', 'arcsin', 'arcsinh', 'arctan',
-               'arctanh', 'conjugate', 'cos', 'cosh', 'exp', 'expm1', 'invert',
-               'log', 'log10', 'log1p', 'negative', 'reciprocal', 'rint',
-               'sign', 'sin', 'sinh', 'sqrt', 'square', 'tan', 'tanh')
+               'arctanh', 'ceil', 'conjugate', 'cos', 'cosh', 'exp', 'expm1',
+               'fabs', 'floor', 'invert', 'isfinite', 'isinf', 'isnan', 'log',
+               'log10', 'log1p', 'logical_not', 'negative', 'reciprocal',
+               'rint', 'sign', 'sin', 'sinh', 'sqrt', 'square', 'tan', 'tanh',
+               'trunc')
 
 # numpy binary operations to wrap
 binary_names = ('add', 'arctan2', 'bitwise_and', 'bitwise_or', 'bitwise_xor',
-                'divide', 'floor_divide', 'fmod', 'hypot', 'left_shift', 'mod',
-                'multiply', 'power', 'remainder', 'right_shift', 'subtract',
-                'true_divide', 'less', 'less_equal', 'equal', 'not_equal',
-                'greater', 'greater_equal',)
+                'divide', 'floor_divide', 'fmax', 'fmin', 'fmod', 'hypot',
+                'left_shift', 'logical_and', 'logical_or', 'logical_xor',
+                'maximum', 'minimum', 'mod', 'multiply', 'power', 'remainder',
+                'right_shift', 'subtract', 'true_divide', 'less', 'less_equal',
+                'equal', 'not_equal', 'greater', 'greater_equal',)
 
 for func_name in unary_names + binary_names:
     __all__.append(func_name)
 
 
+def _pop_out(args, kwargs, distribution):
+    """Pull the `out` argument from `args` or `kwargs` and check it.
+
+    Returns `out` (a DistArray or None) and the remaining `args`.
+    """
+    out = kwargs.pop('out', None)
+    if out is None and args and isinstance(args[0], DistArray):
+        out, args = args[0], args[1:]
+    if out is not None:
+        if not isinstance(out, DistArray):
+            raise TypeError('`out` must be a DistArray.')
+        if not out.distribution.is_compatible(distribution):
+            raise ValueError("`out` distribution not compatible.")
+    return out, args
+
+
 def unary_proxy(name):
     def proxy_func(a, *args, **kwargs):
         context = determine_context(a)
+        out, args = _pop_out(args, kwargs, a.distribution)
 
-        def func_call(func_name, arr_name, args, kwargs):
-            from distarray.utils import get_from_dotted_name
-            dotted_name = 'distarray.localapi.%s' % (func_name,)
-            func = get_from_dotted_name(dotted_name)
+        def func_call(func_name, arr_name, out, args, kwargs):
+            from distarray.localapi import local_ufunc
+            func = local_ufunc(func_name)
+            if out is not None:
+                func(arr_name, out, *args, **kwargs)
+                return None
             res = func(arr_name, *args, **kwargs)
             return proxyize(res), res.dtype  # noqa
 
-        res = context.apply(func_call, args=(name, a.key, args, kwargs),
+        out_key = None if out is None else out.key
+        res = context.apply(func_call, args=(name, a.key, out_key, args,
+                                             kwargs),
                             targets=a.targets)
+        if out is not None:
+            return out
         new_key = res[0][0]
         dtype = res[0][1]
         return DistArray.from_localarrays(new_key,
@@ -56,45 +85,324 @@ def unary_proxy(name):
     return proxy_func
 
 
+def _shape_of(x):
+    if isinstance(x, DistArray):
+        return x.shape
+    return numpy.shape(x)
+
+
+def _dtype_of(x):
+    if isinstance(x, DistArray):
+        return x.dtype
+    return numpy.asarray(x).dtype
+
+
+def _broadcast_operands(a, b, context):
+    """Sort out the operands of a binary function.
+
+    Returns the (key or value of) each operand and the Distribution of the
+    result.
+
+    Scalars are passed as is.  Array-like operands are shipped to the engines
+    once, and each engine selects the section matching its part of the
+    result.  A DistArray operand with a shape different from that of the
+    result is gathered on the engines, each receiving only the elements its
+    part of the result needs.  If neither operand has the shape of the
+    result, the result gets a new default Distribution.
+    """
+    values = []
+    for x in (a, b):
+        if isinstance(x, DistArray):
+            values.append(x.key)
+        elif numpy.isscalar(x):
+            values.append(x)
+        else:
+            x = numpy.asarray(x)
+            if x.dtype == object:
+                msg = 'only DistArray, scalars, or arrays are accepted'
+                raise TypeError(msg)
+            values.append(x)
+
+    shape = broadcast_shape(_shape_of(a), _shape_of(b))
+    full = [x for x in (a, b)
+            if isinstance(x, DistArray) and x.shape == shape]
+    if len(full) == 2 and not a.distribution.is_compatible(b.distribution):
+        raise ValueError("distributions not compatible.")
+    if full:
+        distribution = full[0].distribution
+    else:
+        distribution = Distribution(context, shape)
+    return values[0], values[1], distribution
+
+
 def binary_proxy(name):
     def proxy_func(a, b, *args, **kwargs):
         context = determine_context(a, b)
-        is_a_dap = isinstance(a, DistArray)
-        is_b_dap = isinstance(b, DistArray)
-        if is_a_dap and is_b_dap:
-            if not a.distribution.is_compatible(b.distribution):
-                raise ValueError("distributions not compatible.")
-            a_key = a.key
-            b_key = b.key
-            distribution = a.distribution
-        elif is_a_dap and numpy.isscalar(b):
-            a_key = a.key
-            b_key = b
-            distribution = a.distribution
-        elif is_b_dap and numpy.isscalar(a):
-            a_key = a
-            b_key = b.key
-            distribution = b.distribution
+        a_key, b_key, distribution = _broadcast_operands(a, b, context)
+        out, args = _pop_out(args, kwargs, distribution)
+
+        # The operand laid out like the result, if any, serves as the
+        # template the other operand is lined up with.
+        template = None
+        for label, x in (('a', a), ('b', b)):
+            if (isinstance(x, DistArray) and
+                    x.distribution is distribution):
+                template = label
+                break
+        if template is None:
+            if out is None:
+                dtype = getattr(numpy, name)(
+                    numpy.ones(1, dtype=_dtype_of(a)),
+                    numpy.ones(1, dtype=_dtype_of(b))).dtype
+                out = context.empty(distribution, dtype=dtype)
+            template = 'out'
+
+        operands = (('a', a), ('b', b))
+        gather = tuple(label for (label, x) in operands
+                       if isinstance(x, DistArray) and
+                       x.shape != distribution.shape)
+        section = tuple(label for (label, x) in operands
+                        if not isinstance(x, DistArray) and
+                        not numpy.isscalar(x))
+        if gather:
+            comm, targets = distribution.comm_union(
+                *[x.distribution for x in (a, b)
+                  if isinstance(x, DistArray)])
         else:
-            raise TypeError('only DistArray or scalars are accepted')
+            comm, targets = None, distribution.targets
 
-        def func_call(func_name, a, b, args, kwargs):
-            from distarray.utils import get_from_dotted_name
-            dotted_name = 'distarray.localapi.%s' % (func_name,)
-            func = get_from_dotted_name(dotted_name)
-            res = func(a, b, *args, **kwargs)
+        def func_call(func_name, a, b, out, args, kwargs, template, gather,
+                      section, comm):
+            from distarray.localapi import (broadcast_operand,
+                                            gather_broadcast_operand,
+                                            local_ufunc)
+            operands = {'a': a, 'b': b}
+            tmpl = out if template == 'out' else operands[template]
+            for label in gather:
+                operands[label] = gather_broadcast_operand(
+                    comm, operands[label], tmpl)
+            if tmpl is None:
+                return None  # this engine holds no part of the result
+            for label in section:
+                operands[label] = broadcast_operand(operands[label], tmpl)
+            func = local_ufunc(func_name)
+            if out is not None:
+                func(operands['a'], operands['b'], out, *args, **kwargs)
+                return None
+            res = func(operands['a'], operands['b'], *args, **kwargs)
             return proxyize(res), res.dtype  # noqa
 
-        res = context.apply(func_call, args=(name, a_key, b_key, args, kwargs),
-                            targets=distribution.targets)
-        new_key = res[0][0]
-        dtype = res[0][1]
+        out_key = None if out is None else out.key
+        res = context.apply(func_call,
+                            args=(name, a_key, b_key, out_key, args, kwargs,
+                                  template, gather, section, comm),
+                            targets=targets)
+        if out is not None:
+            return out
+        new_key, dtype = next(r for r in res if r is not None)
         return DistArray.from_localarrays(new_key,
                                           distribution=distribution,
                                           dtype=dtype)
     return proxy_func
 
 
+def _accumulate(ufunc_name, a, axis=0, dtype=None):
+    """`ufunc.accumulate` along a block distributed (or undistributed) axis.
+    """
+    context = determine_context(a)
+    axis = positivify(axis, a.ndim)
+    if a.dist[axis] not in ('b', 'n'):
+        msg = "accumulate is only implemented along 'b' or 'n' axes."
+        raise NotImplementedError(msg)
+
+    def local_accumulate(ufunc_name, larr, axis, dtype):
+        from distarray.localapi import ufunc_accumulate
+        res = ufunc_accumulate(ufunc_name, larr, axis, dtype)
+        return proxyize(res), res.dtype  # noqa
+
+    res = context.apply(local_accumulate,
+                        args=(ufunc_name, a.key, axis, dtype),
+                        targets=a.targets)
+    return DistArray.from_localarrays(res[0][0], distribution=a.distribution,
+                                      dtype=res[0][1])
+
+
+# Binary ufuncs for which `reduce` and `accumulate` may combine the engines'
+# partial results.
+_associative_ufuncs = frozenset([
+    'add', 'multiply', 'maximum', 'minimum', 'fmax', 'fmin',
+    'logical_and', 'logical_or', 'logical_xor',
+    'bitwise_and', 'bitwise_or', 'bitwise_xor',
+])
+
+
+def apply_ufunc(ufunc, method, inputs, kwargs):
+    """Apply the `method` of a numpy `ufunc` to `inputs` on the engines.
+
+    Backs `DistArray.__array_ufunc__`.  Returns NotImplemented (so that
+    numpy raises a TypeError) for anything that can't be computed on the
+    engines, rather than pulling the data to the client.
+    """
+    if ufunc.nout != 1 or ufunc.signature is not None:
+        return NotImplemented
+    name = ufunc.__name__
+    out = kwargs.pop('out', None)
+    if out is not None:
+        out, = out  # numpy always passes `out` as a tuple
+
+    if method == '__call__':
+        if ufunc.nin == 1:
+            proxy = unary_proxy(name)
+        elif ufunc.nin == 2:
+            proxy = binary_proxy(name)
+        else:
+            return NotImplemented
+        if out is not None:
+            kwargs['out'] = out
+        return proxy(*inputs, **kwargs)
+
+    if method not in ('reduce', 'accumulate') or out is not None:
+        return NotImplemented
+    if name not in _associative_ufuncs:
+        # Partial results are combined across engines, which is only
+        # valid when the order of the combination doesn't matter.
+        return NotImplemented
+    a = inputs[0]
+    if not isinstance(a, DistArray):
+        return NotImplemented
+    axis = kwargs.pop('axis', 0)
+    dtype = kwargs.pop('dtype', None)
+    if kwargs:
+        return NotImplemented
+
+    if method == 'reduce':
+        dtype = ufunc.reduce(numpy.ones(1, dtype=a.dtype), dtype=dtype).dtype
+        return a._reduce('ufunc_reducer', axis, dtype, reducer_args=(name,))
+    else:
+        return _accumulate(name, a, axis, dtype)
+
+
+# numpy functions with a DistArray implementation; see
+# `DistArray.__array_function__`.
+array_functions = {}
+
+
+def _implements(numpy_function):
+    """Register a function as the DistArray version of `numpy_function`."""
+    def decorator(func):
+        array_functions[numpy_function] = func
+        return func
+    return decorator
+
+
+@_implements(numpy.where)
+def where(condition, x, y):
+    """Return elements chosen from `x` or `y` depending on `condition`.
+
+    `condition` must be a DistArray; `x` and `y` are DistArrays with a
+    distribution compatible with `condition`'s, or scalars.
+    """
+    if not isinstance(condition, DistArray):
+        raise TypeError('`condition` must be a DistArray.')
+    context = determine_context(condition, x, y)
+    for value in (x, y):
+        if isinstance(value, DistArray):
+            if not value.distribution.is_compatible(condition.distribution):
+                raise ValueError("distributions not compatible.")
+        elif not numpy.isscalar(value):
+            raise TypeError('only DistArray or scalars are accepted')
+
+    def local_where(condition, x, y):
+        import numpy
+        from distarray.localapi import LocalArray
+        x = getattr(x, 'ndarray', x)
+        y = getattr(y, 'ndarray', y)
+        res = LocalArray(condition.distribution,
+                         buf=numpy.where(condition.ndarray, x, y))
+        return proxyize(res), res.dtype  # noqa
+
+    args = [getattr(value, 'key', value) for value in (condition, x, y)]
+    res = context.apply(local_where, args=args, targets=condition.targets)
+    return DistArray.from_localarrays(res[0][0],
+                                      distribution=condition.distribution,
+                                      dtype=res[0][1])
+
+
+@_implements(numpy.clip)
+def clip(a, a_min, a_max, out=None):
+    """Clip (limit) the values in a DistArray."""
+    if a_min is None and a_max is None:
+        raise ValueError("One of max or min must be given")
+    if a_min is None:
+        return minimum(a, a_max, out=out)  # noqa
+    out = maximum(a, a_min, out=out)  # noqa
+    if a_max is None:
+        return out
+    return minimum(out, a_max, out=out)  # noqa
+
+
+@_implements(numpy.sum)
+def _sum(a, axis=None, dtype=None, out=None):
+    return a.sum(axis=axis, dtype=dtype, out=out)
+
+
+@_implements(numpy.mean)
+def _mean(a, axis=None, dtype=float, out=None):
+    return a.mean(axis=axis, dtype=dtype, out=out)
+
+
+@_implements(numpy.var)
+def _var(a, axis=None, dtype=float, out=None):
+    return a.var(axis=axis, dtype=dtype, out=out)
+
+
+@_implements(numpy.std)
+def _std(a, axis=None, dtype=float, out=None):
+    return a.std(axis=axis, dtype=dtype, out=out)
+
+
+@_implements(numpy.amin)
+def _amin(a, axis=None, out=None):
+    return a.min(axis=axis, out=out)
+
+
+@_implements(numpy.amax)
+def _amax(a, axis=None, out=None):
+    return a.max(axis=axis, out=out)
+
+
+def _empty_like(a, dtype=None, shape=None, create='empty'):
+    """Create a DistArray with the same distribution as `a`."""
+    if shape is not None and tuple(shape) != a.shape:
+        return NotImplemented
+    if dtype is None:
+        dtype = a.dtype
+    return getattr(a.context, create)(a.distribution, dtype=dtype)
+
+
+@_implements(numpy.empty_like)
+def empty_like(a, dtype=None, order='K', subok=True, shape=None):
+    return _empty_like(a, dtype, shape)
+
+
+@_implements(numpy.zeros_like)
+def zeros_like(a, dtype=None, order='K', subok=True, shape=None):
+    return _empty_like(a, dtype, shape, create='zeros')
+
+
+@_implements(numpy.ones_like)
+def ones_like(a, dtype=None, order='K', subok=True, shape=None):
+    return _empty_like(a, dtype, shape, create='ones')
+
+
+@_implements(numpy.full_like)
+def full_like(a, fill_value, dtype=None, order='K', subok=True, shape=None):
+    result = _empty_like(a, dtype, shape)
+    if result is not NotImplemented:
+        result.fill(fill_value)
+    return result
+
+
 def determine_context(*args):
     """ Determine a context from a functions arguments."""
 
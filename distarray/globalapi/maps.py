@@ -38,6 +38,7 @@ from distarray.metadata_utils import (normalize_dist,
                                       normalize_dim_dict,
                                       normalize_reduction_axes,
                                       make_grid_shape,
+                                      node_rank_from_coords,
                                       sanitize_indices,
                                       _start_stop_block,
                                       tuple_intersection,
@@ -177,6 +178,14 @@ class MapBase(object):
         """
         raise IndexError()
 
+    def index_owners_array(self, idxs):
+        """Vectorized `index_owners` for maps with precise owners.
+
+        Returns an integer array holding the process ID in this dimension
+        that owns each index in the (in bounds) integer array `idxs`.
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def get_dimdicts(self):
         """Return a dim_dict per process in this dimension."""
@@ -237,6 +246,9 @@ class NoDistMap(MapBase):
     def index_owners(self, idx):
         return [0] if 0 <= idx < self.size else []
 
+    def index_owners_array(self, idxs):
+        return np.zeros(np.shape(idxs), dtype=int)
+
     def slice_owners(self, idx):
         start = idx.start if idx.start is not None else 0
         stop = idx.stop if idx.stop is not None else self.size
@@ -339,6 +351,12 @@ class BlockMap(MapBase):
                 coords.append(coord)
         return coords
 
+    def index_owners_array(self, idxs):
+        # Empty blocks share their start with the next block, so search
+        # from the right to skip them.
+        starts = np.array([lower for (lower, _) in self.bounds])
+        return np.searchsorted(starts, idxs, side='right') - 1
+
     def slice_owners(self, idx):
         coords = []
         start = idx.start if idx.start is not None else 0
@@ -446,6 +464,9 @@ class BlockCyclicMap(MapBase):
         idx_block = idx // self.block_size
         return [idx_block % self.grid_size]
 
+    def index_owners_array(self, idxs):
+        return (np.asarray(idxs) // self.block_size) % self.grid_size
+
     def get_dimdicts(self):
         return tuple(({'dist_type': 'c',
                         'size': self.size,
@@ -505,6 +526,14 @@ class UnstructuredMap(MapBase):
         # for each local array's global indices.
         return self._index_owners
 
+    def index_owners_array(self, idxs):
+        if self.indices is None:
+            raise NotImplementedError("Owners unknown without indices.")
+        owners = np.empty(self.size, dtype=int)
+        for coord, ind in enumerate(self.indices):
+            owners[ind] = coord
+        return owners[idxs]
+
     def get_dimdicts(self):
         if self.indices is None:
             raise ValueError()
@@ -535,7 +564,7 @@ class Distribution(object):
     """
 
     @classmethod
-    def from_maps(cls, context, maps, targets=None):
+    def from_maps(cls, context, maps, targets=None, rank_from_coords=None):
         """Create a Distribution from a sequence of `Map`\s.
 
         Parameters
@@ -544,6 +573,9 @@ class Distribution(object):
         maps : Sequence of Map objects
         targets : Sequence of int, optional
             Sequence of engine target numbers. Default: all available
+        rank_from_coords : array of int, optional
+            The rank (index into the sorted `targets`) at each coordinate of
+            the process grid.  Default: the ranks in row-major order.
 
         Returns
         -------
@@ -563,8 +595,11 @@ class Distribution(object):
         self.grid_shape = normalize_grid_shape(self.grid_shape, self.shape,
                                                self.dist, len(self.targets))
 
-        nelts = reduce(operator.mul, self.grid_shape, 1)
-        self.rank_from_coords = np.arange(nelts).reshape(self.grid_shape)
+        if rank_from_coords is None:
+            nelts = reduce(operator.mul, self.grid_shape, 1)
+            rank_from_coords = np.arange(nelts)
+        self.rank_from_coords = np.asarray(rank_from_coords).reshape(
+            self.grid_shape)
         return self
 
     @classmethod
@@ -604,7 +639,8 @@ class Distribution(object):
                 axis_dim_dicts in axis_dim_dicts_per_axis]
         return cls.from_maps(context=context, maps=maps, targets=targets)
 
-    def __new__(cls, context, shape, dist=None, grid_shape=None, targets=None):
+    def __new__(cls, context, shape, dist=None, grid_shape=None, targets=None,
+                optimize=None, placement=None):
         """Create a Distribution from a `shape` and other optional args.
 
         Parameters
@@ -618,11 +654,26 @@ class Distribution(object):
         grid_shape : tuple of int
         targets : Sequence of int, optional
             Sequence of engine target numbers. Default: all available
+        optimize : str, optional
+            Cost model for choosing `grid_shape` when it isn't given:
+            'halo' or 'reduce_axis=<axis>'.  See
+            `distarray.metadata_utils.make_grid_shape`.
+        placement : {None, 'node'}, optional
+            How ranks are placed on the process grid.  None (the default)
+            places them in row-major order; 'node' gives the engines on
+            each node (see `Context.node_ids`) a compact block of the grid,
+            so that more of the neighbours exchanging halos or partial
+            reductions share memory.  See
+            `distarray.metadata_utils.node_rank_from_coords`.
 
         Returns
         -------
         Distribution
         """
+        if placement not in (None, 'node'):
+            msg = "placement must be None or 'node', not %r"
+            raise ValueError(msg % (placement,))
+
         # special case when dist is all 'n's.
         if (dist is not None) and all(d == 'n' for d in dist):
             if (targets is not None) and (len(targets) != 1):
@@ -638,7 +689,8 @@ class Distribution(object):
         dist = normalize_dist(dist, ndim)
 
         targets = sorted(targets or context.targets)
-        grid_shape = grid_shape or make_grid_shape(shape, dist, len(targets))
+        grid_shape = grid_shape or make_grid_shape(shape, dist, len(targets),
+                                                   optimize=optimize)
         grid_shape = normalize_grid_shape(grid_shape, shape, dist, len(targets))
 
         # choose targets from grid_shape
@@ -657,6 +709,12 @@ class Distribution(object):
         # distribution to remove empty localshapes.
         if all(d in ('n', 'b') for d in self.dist):
             self = self.slice((slice(None),)*self.ndim)
+
+        if placement == 'node':
+            node_ids = context.node_ids(self.targets)
+            self.rank_from_coords = node_rank_from_coords(self.grid_shape,
+                                                          node_ids,
+                                                          self.shape)
         return self
 
     @classmethod
@@ -777,22 +835,36 @@ class Distribution(object):
         return not any(isinstance(m, UnstructuredMap) for m in self.maps)
 
     def slice(self, index_tuple):
-        """Make a new Distribution from a slice."""
+        """Make a new Distribution from a slice.
+
+        Each owning engine keeps its part of the grid, so a permuted
+        `rank_from_coords` carries over to the slice.
+        """
         new_targets = self.owning_targets(index_tuple) or [0]
         new_maps = []
+        owner_coords = []
         # iterate over the dimensions
         for map_, idx in zip(self.maps, index_tuple):
             if isinstance(idx, Integral):
-                continue  # integral indexing returns reduced dimensionality
+                # integral indexing returns reduced dimensionality
+                owner_coords.append(map_.index_owners(idx)[:1])
             elif isinstance(idx, slice):
                 new_maps.append(map_.slice(idx))
+                owner_coords.append(map_.slice_owners(idx))
             else:
                 msg = "Index must be a sequence of Integrals and slices."
                 raise TypeError(msg)
 
+        rank_from_coords = None
+        if all(owner_coords):
+            ranks = self.rank_from_coords[np.ix_(*owner_coords)].ravel()
+            owners = [self.targets[r] for r in ranks]
+            new_targets = sorted(owners)
+            rank_from_coords = np.searchsorted(new_targets, owners)
         return self.__class__.from_maps(context=self.context,
                                         maps=new_maps,
-                                        targets=new_targets)
+                                        targets=new_targets,
+                                        rank_from_coords=rank_from_coords)
 
     def owning_ranks(self, idxs):
         """ Returns a list of ranks that may *possibly* own the location in the
@@ -818,6 +890,17 @@ class Distribution(object):
         ranks = [self.rank_from_coords[c] for c in all_coords]
         return ranks
 
+    def owning_ranks_array(self, idxs):
+        """Vectorized `owning_ranks` for precisely known owners.
+
+        `idxs` is a sequence of in-bounds integer index arrays, one per
+        dimension, holding the coordinates of a set of points.  Returns an
+        integer array with the owning rank of each point.
+        """
+        coords = tuple(m.index_owners_array(idx)
+                       for (m, idx) in zip(self.maps, idxs))
+        return self.rank_from_coords[coords]
+
     def owning_targets(self, idxs):
         """ Like `owning_ranks()` but returns a list of targets rather than
         ranks.
@@ -839,7 +922,8 @@ class Distribution(object):
     def is_compatible(self, o):
         return ((self.context, self.targets, self.shape, self.ndim, self.grid_shape) ==
                 (o.context,    o.targets,    o.shape,    o.ndim,    o.grid_shape) and
-                all(m.is_compatible(om) for (m, om) in zip(self.maps, o.maps)))
+                all(m.is_compatible(om) for (m, om) in zip(self.maps, o.maps)) and
+                np.array_equal(self.rank_from_coords, o.rank_from_coords))
 
     def reduce(self, axes):
         """
@@ -854,18 +938,27 @@ class Distribution(object):
         reduced_dist = remove_elements(axes, self.dist)
         reduced_grid_shape = remove_elements(axes, self.grid_shape)
 
-        # This block is required because np.min() works one axis at a time.
-        reduced_ranks = self.rank_from_coords.copy()
+        # The result goes to the ranks at coordinate 0 along `axes`, the
+        # roots of the engines' reduction sub-communicators.
+        reduced_ranks = self.rank_from_coords
         for axis in axes:
-            reduced_ranks = np.min(reduced_ranks, axis=axis, keepdims=True)
+            reduced_ranks = reduced_ranks.take([0], axis=axis)
 
         reduced_targets = [self.targets[r] for r in reduced_ranks.flat]
 
-        return Distribution(context=self.context,
-                            shape=reduced_shape,
-                            dist=reduced_dist,
-                            grid_shape=reduced_grid_shape,
-                            targets=reduced_targets)
+        if reduced_targets == sorted(reduced_targets):
+            return Distribution(context=self.context,
+                                shape=reduced_shape,
+                                dist=reduced_dist,
+                                grid_shape=reduced_grid_shape,
+                                targets=reduced_targets)
+        # A permuted grid stays permuted.
+        maps = [map_from_sizes(*args) for args in
+                zip(reduced_shape, reduced_dist, reduced_grid_shape)]
+        targets = sorted(reduced_targets)
+        return self.__class__.from_maps(
+            context=self.context, maps=maps, targets=targets,
+            rank_from_coords=np.searchsorted(targets, reduced_targets))
 
     def view(self, new_dimsize=None):
         """Generate a new Distribution for use with DistArray.view."""
@@ -873,7 +966,9 @@ class Distribution(object):
             return self
         scaled_map = self.maps[-1].view(new_dimsize)
         new_maps = self.maps[:-1] + [scaled_map]
-        return self.__class__.from_maps(context=self.context, maps=new_maps)
+        return self.__class__.from_maps(context=self.context, maps=new_maps,
+                                        targets=self.targets,
+                                        rank_from_coords=self.rank_from_coords)
 
     def localshapes(self):
         return shapes_from_dim_data_per_rank(self.get_dim_data_per_rank())
@@ -907,12 +1002,8 @@ class Distribution(object):
         intersections = []
         for source_dimdict, dest_dimdict in zip(source_dimdata, dest_dimdata):
 
-            if not (source_dimdict['dist_type'] ==
-                    dest_dimdict['dist_type'] == 'b'):
-                raise ValueError("Only 'b' dist_type supported")
-
-            source_idxs = source_dimdict['start'], source_dimdict['stop']
-            dest_idxs = dest_dimdict['start'], dest_dimdict['stop']
+            source_idxs = _block_bounds(source_dimdict)
+            dest_idxs = _block_bounds(dest_dimdict)
 
             intersections.append(tuple_intersection(source_idxs, dest_idxs))
 
@@ -972,6 +1063,16 @@ class Distribution(object):
 # Redistribution helper functions.
 # ----------------------------------------------------------------------------
 
+def _block_bounds(dim_dict):
+    """Return the (start, stop) of a 'b' or 'n' dimension dictionary."""
+    if dim_dict['dist_type'] == 'n':
+        return 0, dim_dict['size']
+    elif dim_dict['dist_type'] == 'b':
+        return dim_dict['start'], dim_dict['stop']
+    else:
+        raise ValueError("Only 'b' and 'n' dist_types supported")
+
+
 def global_flat_indices(dim_data):
     """
     Return a list of tuples of indices into the flattened global array.
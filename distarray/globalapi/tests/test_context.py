@@ -13,6 +13,7 @@ engines should be launched with MPI, using the MPIEngineSetLauncher.
 """
 
 import unittest
+import warnings
 from random import shuffle
 
 import numpy
@@ -21,6 +22,7 @@ from numpy.testing import assert_allclose, assert_array_equal
 
 from distarray.testing import (DefaultContextTestCase, IPythonContextTestCase,
                                check_targets)
+from distarray.error import GatherError, GatherWarning
 from distarray.globalapi.context import Context
 from distarray.globalapi.maps import Distribution
 from distarray.mpionly_utils import is_solo_mpi_process
@@ -350,6 +352,25 @@ class TestApply(DefaultContextTestCase):
 
         self.assertEqual(val, [6] * self.ntargets)
 
+    def test_apply_per_target_args(self):
+
+        def foo(a, b, c=0):
+            return a + b + c
+
+        targets = self.context.targets
+        per_target = {t: (10 * t,) for t in targets}
+        val = self.context.apply(foo, (1,), {'c': 2}, targets=targets,
+                                 per_target_args=per_target)
+
+        self.assertEqual(val, [3 + 10 * t for t in targets])
+
+        # a subset of the targets, in the order of `targets`
+        targets = targets[::2]
+        val = self.context.apply(foo, (1,), targets=targets,
+                                 per_target_args=per_target)
+
+        self.assertEqual(val, [1 + 10 * t for t in targets])
+
     def test_apply_kwargs(self):
 
         def foo(a, b, c=None, d=None):
@@ -438,5 +459,100 @@ class TestGetBaseComm(DefaultContextTestCase):
         self.assertSetEqual(set(sizes), set([len(sizes)]))
 
 
+class TestGatherPolicy(DefaultContextTestCase):
+
+    ntargets = 'any'
+
+    def setUp(self):
+        self.context.reset_gather_log()
+        self.da = self.context.ones((10, 10))
+
+    def tearDown(self):
+        self.context.set_gather_policy('allow')
+
+    def test_allow(self):
+        assert_array_equal(numpy.asarray(self.da), numpy.ones((10, 10)))
+        self.assertEqual(self.context.gather_count, 1)
+        record, = self.context.gather_log
+        self.assertEqual(record.shape, (10, 10))
+        self.assertEqual(record.nbytes, 800)
+        self.assertIn('test_allow', record.stack[-1])
+
+    def test_warn(self):
+        self.context.set_gather_policy('warn')
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            numpy.asarray(self.da)
+        self.assertEqual(len(w), 1)
+        self.assertIs(w[0].category, GatherWarning)
+
+    def test_raise(self):
+        self.context.set_gather_policy('raise')
+        with self.assertRaises(GatherError):
+            numpy.asarray(self.da)
+        self.assertEqual(self.context.gather_count, 1)
+
+    def test_threshold(self):
+        self.context.set_gather_policy('raise', threshold=800)
+        numpy.asarray(self.da)
+
+    def test_tondarray_is_not_implicit(self):
+        self.context.set_gather_policy('raise')
+        self.da.tondarray()
+        self.assertEqual(self.context.gather_count, 0)
+
+    def test_bad_policy(self):
+        with self.assertRaises(ValueError):
+            self.context.set_gather_policy('ignore')
+
+
+class TestBackend(DefaultContextTestCase):
+
+    ntargets = 'any'
+
+    def setUp(self):
+        # small chunks, so that 40 rows are cut into several
+        self.context.set_backend('threaded', nthreads=3, chunk_bytes=64)
+        self.expected = numpy.arange(400.).reshape(40, 10)
+        self.da = self.context.fromndarray(self.expected)
+
+    def tearDown(self):
+        self.context.set_backend('numpy')
+
+    def test_elementwise(self):
+        from distarray.globalapi import functions
+        self.assertEqual(self.context.backend, 'threaded')
+        assert_array_equal((self.da * 2 + 1).tondarray(),
+                           self.expected * 2 + 1)
+        assert_array_equal(functions.sqrt(self.da).tondarray(),
+                           numpy.sqrt(self.expected))
+        out = self.context.empty(self.da.distribution)
+        functions.negative(self.da, out)
+        assert_array_equal(out.tondarray(), -self.expected)
+
+    def test_reductions(self):
+        assert_allclose(self.da.sum(axis=0).tondarray(),
+                        self.expected.sum(axis=0))
+        assert_allclose(self.da.sum(axis=1).tondarray(),
+                        self.expected.sum(axis=1))
+        self.assertEqual(self.da.min(), 0)
+        self.assertEqual(self.da.max(), 399)
+
+    def test_other_context(self):
+        other = Context(targets=self.context.targets)
+        try:
+            self.assertEqual(other.backend, 'numpy')
+            da = other.fromndarray(self.expected)
+            assert_array_equal((da + 1).tondarray(), self.expected + 1)
+        finally:
+            other.close()
+
+    def test_bad_backend(self):
+        with self.assertRaises(ValueError):
+            self.context.set_backend('openmp')
+        with self.assertRaises(ValueError):
+            self.context.set_backend('threaded', nthreads=0)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -12,6 +12,9 @@ engines should be launched with MPI, using the MPIEngineSetLauncher.
 
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 
 import numpy
@@ -19,7 +22,7 @@ from numpy.testing import assert_array_equal, assert_allclose
 
 from distarray.externals.six.moves import range
 from distarray.testing import DefaultContextTestCase
-from distarray.globalapi.distarray import DistArray
+from distarray.globalapi.distarray import DistArray, _stream_block_shape
 from distarray.globalapi.maps import Distribution, global_flat_indices
 
 
@@ -113,14 +116,14 @@ class TestDistArray(DefaultContextTestCase):
     def test_set_numpy_array_full_slice_with_distarray(self):
         distribution = Distribution(self.context, (7, 9))
         darr = self.context.ones(distribution)
-        nparr = numpy.zeros_like(darr)
+        nparr = numpy.zeros(darr.shape, dtype=darr.dtype)
         nparr[...] = darr
         assert_array_equal(nparr, darr.toarray())
 
     def test_set_numpy_array_partial_slice_with_distarray(self):
         distribution = Distribution(self.context, (15, 4))
         darr = self.context.ones(distribution)
-        nparr = numpy.zeros_like(darr)
+        nparr = numpy.zeros(darr.shape, dtype=darr.dtype)
         nparr[3, :] = darr[3, :]
         assert_array_equal(nparr[3, :], darr[3, :].toarray())
 
@@ -139,6 +142,66 @@ class TestDistArray(DefaultContextTestCase):
         numpy.testing.assert_array_equal(dap.tondarray(), ndarr)
 
 
+class TestIterBlocks(DefaultContextTestCase):
+
+    def check_blocks(self, distribution, block_shape):
+        shape = (10, 7)
+        expected = numpy.arange(70).reshape(shape)
+        da = self.context.fromndarray(expected, distribution)
+        corners = []
+        result = numpy.zeros(shape, dtype=int)
+        for index, block in da.iter_blocks(block_shape):
+            corners.append(tuple(s.start for s in index))
+            self.assertTrue(all(n <= b for (n, b) in zip(block.shape,
+                                                         block_shape)))
+            assert_array_equal(block, expected[index])
+            result[index] = block
+        self.assertEqual(corners, sorted(corners))
+        assert_array_equal(result, expected)
+
+    def test_block(self):
+        distribution = Distribution(self.context, (10, 7), ('b', 'b'))
+        self.check_blocks(distribution, (3, 4))
+
+    def test_cyclic(self):
+        distribution = Distribution(self.context, (10, 7), ('c', 'b'))
+        self.check_blocks(distribution, (4, 7))
+
+    def test_unstructured(self):
+        glb_dim_data = ({'dist_type': 'u',
+                         'indices': [[9, 2, 4], [0, 7], [8, 1, 6], [5, 3]]},
+                        {'dist_type': 'n', 'size': 7})
+        distribution = Distribution.from_global_dim_data(self.context,
+                                                         glb_dim_data)
+        self.check_blocks(distribution, (2, 3))
+
+    def test_early_exit(self):
+        distribution = Distribution(self.context, (8, 3))
+        da = self.context.ones(distribution)
+        for index, block in da.iter_blocks((2, 3)):
+            break
+        assert_array_equal(block, numpy.ones((2, 3)))
+        self.assertEqual(da.sum(), 24)
+
+    def test_bad_block_shape(self):
+        distribution = Distribution(self.context, (8, 3))
+        da = self.context.ones(distribution)
+        for block_shape in ((2,), (2, 0)):
+            with self.assertRaises(ValueError):
+                da.iter_blocks(block_shape)
+
+
+class TestStreamBlockShape(unittest.TestCase):
+
+    def test_stream_block_shape(self):
+        self.assertEqual(_stream_block_shape((10, 7), 8, 200), (3, 7))
+        self.assertEqual(_stream_block_shape((10, 7), 8, 1000), (10, 7))
+        self.assertEqual(_stream_block_shape((4, 10, 7), 8, 200), (1, 3, 7))
+        self.assertEqual(_stream_block_shape((4, 10, 7), 8, 4), (1, 1, 1))
+        self.assertEqual(_stream_block_shape((0, 7), 8, 200), (1, 7))
+        self.assertEqual(_stream_block_shape((), 8, 200), ())
+
+
 class TestGetItemSlicing(DefaultContextTestCase):
 
     def test_full_slice_block_dist(self):
@@ -435,6 +498,172 @@ class TestSetItemSlicing(DefaultContextTestCase):
         assert_array_equal(arr[...].toarray(), numpy.array(val1))
 
 
+class TestMaskIndexing(DefaultContextTestCase):
+
+    def setUp(self):
+        self.source = numpy.arange(-30, 30).reshape(6, 10)
+
+    def check_get(self, dist):
+        distribution = Distribution(self.context, self.source.shape, dist)
+        arr = self.context.fromarray(self.source, distribution)
+        for mask in (arr > 0, self.source % 3 == 0):
+            result = arr[mask]
+            self.assertEqual(result.ndim, 1)
+            expected = self.source[numpy.asarray(mask)]
+            assert_array_equal(result.toarray(), expected)
+
+    def test_get_row_blocks(self):
+        self.check_get(('b', 'n'))
+
+    def test_get_2d_blocks(self):
+        self.check_get(('b', 'b'))
+
+    def test_get_column_blocks(self):
+        self.check_get(('n', 'b'))
+
+    def test_set_scalar(self):
+        distribution = Distribution(self.context, self.source.shape,
+                                    ('c', 'b'))
+        arr = self.context.fromarray(self.source, distribution)
+        arr[arr < 0] = 0
+        self.source[self.source < 0] = 0
+        assert_array_equal(arr.toarray(), self.source)
+
+    def test_set_scalar_ndarray_mask(self):
+        distribution = Distribution(self.context, self.source.shape,
+                                    ('c', 'b'))
+        arr = self.context.fromarray(self.source, distribution)
+        mask = self.source % 3 == 0
+        arr[mask] = 0
+        self.source[mask] = 0
+        assert_array_equal(arr.toarray(), self.source)
+
+    def test_get_cyclic(self):
+        distribution = Distribution(self.context, self.source.shape,
+                                    ('c', 'n'))
+        arr = self.context.fromarray(self.source, distribution)
+        with self.assertRaises(NotImplementedError):
+            arr[self.source > 0]
+
+    def test_set_array(self):
+        arr = self.context.fromarray(self.source)
+        mask = self.source % 4 == 1
+        new_data = numpy.arange(mask.sum())
+        arr[mask] = new_data
+        self.source[mask] = new_data
+        assert_array_equal(arr.toarray(), self.source)
+
+    def test_set_wrong_size(self):
+        arr = self.context.fromarray(self.source)
+        with self.assertRaises(ValueError):
+            arr[arr > 0] = numpy.arange(3)
+
+    def test_wrong_shape(self):
+        arr = self.context.fromarray(self.source)
+        with self.assertRaises(IndexError):
+            arr[numpy.ones(10, dtype=bool)]
+
+
+class TestFancyIndexing(DefaultContextTestCase):
+
+    def setUp(self):
+        self.source = numpy.arange(60).reshape(6, 10)
+        distribution = Distribution(self.context, self.source.shape,
+                                    ('c', 'b'))
+        self.arr = self.context.fromarray(self.source, distribution)
+
+    def test_get_rows(self):
+        index = [4, 0, -1]
+        assert_array_equal(self.arr[index], self.source[index])
+
+    def test_get_points(self):
+        index = (numpy.array([[0, 5], [3, 3]]), [9, 1])
+        assert_array_equal(self.arr[index], self.source[index])
+
+    def test_set_rows(self):
+        self.arr[[1, 3]] = numpy.arange(10)
+        self.source[[1, 3]] = numpy.arange(10)
+        assert_array_equal(self.arr.toarray(), self.source)
+
+    def test_set_points(self):
+        index = ([0, 2, 5], [9, 1, 4])
+        self.arr[index] = [-1, -2, -3]
+        self.source[index] = [-1, -2, -3]
+        assert_array_equal(self.arr.toarray(), self.source)
+
+    def test_get_rows_and_slice(self):
+        for index in (([4, 0], slice(None)), ([[5], [1]], slice(2, 9, 3)),
+                      (slice(None, None, -1), [9, 0, 4]), (Ellipsis, [7])):
+            assert_array_equal(self.arr[index], self.source[index])
+
+    def test_set_columns(self):
+        index = (slice(1, 5), [8, 0])
+        self.arr[index] = [[-1], [-2], [-3], [-4]]
+        self.source[index] = [[-1], [-2], [-3], [-4]]
+        assert_array_equal(self.arr.toarray(), self.source)
+
+    def test_get_empty(self):
+        self.assertEqual(self.arr[[]].shape, (0, 10))
+        self.assertEqual(self.arr[[], [], ].shape, (0,))
+
+    def test_mixed_not_supported(self):
+        arr = self.context.zeros((2, 3, 4))
+        with self.assertRaises(IndexError):
+            arr[[1], :, 0]
+
+    def test_out_of_bounds(self):
+        with self.assertRaises(IndexError):
+            self.arr[[6]]
+
+
+class TestPoints(DefaultContextTestCase):
+
+    def setUp(self):
+        self.source = numpy.arange(60).reshape(6, 10)
+        self.points = numpy.array([[5, 9], [0, 0], [3, 4], [-1, 2], [3, 4]])
+
+    def check_take(self, dist):
+        distribution = Distribution(self.context, self.source.shape, dist)
+        arr = self.context.fromarray(self.source, distribution)
+        assert_array_equal(arr.take_points(self.points),
+                           self.source[tuple(self.points.T)])
+
+    def check_put(self, dist):
+        distribution = Distribution(self.context, self.source.shape, dist)
+        arr = self.context.fromarray(self.source, distribution)
+        values = numpy.arange(4, -1, -1)
+        arr.put_points(self.points[:4], values[:4])
+        self.source[tuple(self.points[:4].T)] = values[:4]
+        assert_array_equal(arr.toarray(), self.source)
+
+    def test_take_block(self):
+        self.check_take(('b', 'b'))
+
+    def test_take_cyclic(self):
+        self.check_take(('c', 'n'))
+
+    def test_put_block(self):
+        self.check_put(('b', 'n'))
+
+    def test_put_cyclic(self):
+        self.check_put(('n', 'c'))
+
+    def test_1d(self):
+        arr = self.context.fromarray(numpy.arange(20))
+        assert_array_equal(arr.take_points([19, 0, 7]), [19, 0, 7])
+        arr.put_points([3, 4], 0)
+        self.assertEqual(arr.take_points([3, 4]).tolist(), [0, 0])
+
+    def test_empty(self):
+        arr = self.context.fromarray(self.source)
+        self.assertEqual(len(arr.take_points(numpy.empty((0, 2), int))), 0)
+
+    def test_bad_shape(self):
+        arr = self.context.fromarray(self.source)
+        with self.assertRaises(IndexError):
+            arr.take_points([1, 2])
+
+
 class TestDistArrayCreationFromGlobalDimData(DefaultContextTestCase):
 
     def test_from_global_dim_data_irregular_block(self):
@@ -647,6 +876,35 @@ class TestDistArrayCreation(DefaultContextTestCase):
         zero_ndarray = numpy.zeros(shape)
         assert_array_equal(zero_distarray.tondarray(), zero_ndarray)
 
+    def test_zeros_shared(self):
+        shape = (16, 7)
+        distribution = Distribution(self.context, shape, ('b', 'b'))
+        da = self.context.zeros(distribution, dtype=int, shared=True)
+        self.assertTrue(da.shared)
+        assert_array_equal(da.tondarray(), numpy.zeros(shape, dtype=int))
+        da.fill(3)
+        assert_array_equal(da.tondarray(), numpy.full(shape, 3))
+        self.assertFalse(self.context.zeros(distribution).shared)
+
+    def test_zeros_out_of_core(self):
+        shape = (16, 7)
+        distribution = Distribution(self.context, shape, ('b', 'c'))
+        scratch = tempfile.mkdtemp()
+        try:
+            da = self.context.zeros(distribution, dtype=int, scratch=scratch)
+            assert_array_equal(da.tondarray(), numpy.zeros(shape, dtype=int))
+            da.fill(3)
+            db = da * 2 + da
+            assert_array_equal(db.tondarray(), numpy.full(shape, 9))
+            self.assertEqual(db.sum(), 9 * 16 * 7)
+            assert_allclose(db.sum(axis=0).tondarray(), numpy.full(7, 144))
+            self.assertAlmostEqual(db.var(), 0.0)
+            self.assertEqual(os.listdir(scratch), [])
+            with self.assertRaises(ValueError):
+                self.context.empty(distribution, shared=True, scratch=scratch)
+        finally:
+            shutil.rmtree(scratch)
+
     def test_zeros_0d(self):
         shape = ()
         distribution = Distribution(self.context, shape)
@@ -707,6 +965,26 @@ class TestDistArrayCreation(DefaultContextTestCase):
         result = self.context.fromfunction(fn, shape, dtype=int)
         assert_array_equal(expected, result.tondarray())
 
+    def test_fromfunction_scalar_only(self):
+        def fn(i, j):
+            return i if i > j else j
+        shape = (7, 9)
+        expected = numpy.fromfunction(numpy.vectorize(fn), shape, dtype=int)
+        result = self.context.fromfunction(fn, shape, dtype=int,
+                                           dist=('c', 'b'))
+        assert_array_equal(expected, result.tondarray())
+
+    def test_fromfunction_vectorized(self):
+        def fn(i, j):
+            return 10 * i - j
+        shape = (7, 9)
+        expected = numpy.fromfunction(fn, shape, dtype=int)
+        for vectorized in (True, None):
+            result = self.context.fromfunction(fn, shape, dtype=int,
+                                               dist=('b', 'c'),
+                                               vectorized=vectorized)
+            assert_array_equal(expected, result.tondarray())
+
 
 class TestDistArrayCreationSubSet(DefaultContextTestCase):
 
@@ -1043,6 +1321,24 @@ class TestBlockRedistribution(DefaultContextTestCase):
         self.assertSequenceEqual(dc.localshapes(), da.localshapes())
         assert_array_equal(da.tondarray(), dc.tondarray())
 
+    def test_redist_shared(self):
+        expected = numpy.arange(48).reshape(8, 6)
+        source_dist = Distribution(self.context, (8, 6), ('b', 'b'), (2, 2))
+        source_da = self.context.empty(source_dist, dtype=int, shared=True)
+        source_da[...] = expected
+        dest_dist = Distribution(self.context, (8, 6), ('n', 'b'), (1, 4))
+        for shared in (False, True):
+            dest_da = source_da.distribute_as(dest_dist, shared=shared)
+            self.assertEqual(dest_da.shared, shared)
+            assert_array_equal(dest_da.tondarray(), expected)
+
+    def test_redist_shared_to_other_targets(self):
+        dist0 = Distribution(self.context, (40,), ('b',), (2,), targets=[1, 3])
+        dist1 = Distribution(self.context, (40,), ('b',), (2,), targets=[0, 2])
+        da = self.context.ones(dist0, shared=True)
+        db = da.distribute_as(dist1)
+        assert_array_equal(db.tondarray(), numpy.ones(40))
+
     def test_redist_2D(self):
         nrows, ncols = 7, 13
         source_dist = Distribution(self.context, (nrows, ncols),
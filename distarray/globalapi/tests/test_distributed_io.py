@@ -13,6 +13,9 @@ access to the same filesystem but do not assume the client has access to that
 same filesystem.
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 
 import numpy as np
@@ -20,7 +23,8 @@ from numpy.testing import assert_array_equal
 
 from distarray.externals.six.moves import range
 
-from distarray.testing import import_or_skip, DefaultContextTestCase
+from distarray.testing import (import_or_skip, temp_filepath,
+                               DefaultContextTestCase)
 from distarray.globalapi.distarray import DistArray
 from distarray.globalapi.maps import Distribution
 
@@ -56,6 +60,50 @@ class TestDnpyFileIO(DefaultContextTestCase):
             for filepath, target in zip(self.output_paths, self.context.targets):
                 self.context.apply(cleanup_file, (filepath,), targets=(target,))
 
+    def test_save_load_mmap(self):
+
+        output_path = self.output_paths[0]
+        try:
+            self.context.save_dnpy(output_path, self.da)
+            db = self.context.load_dnpy(output_path, mmap_mode='r')
+            assert_array_equal(db.toarray(), self.da.toarray())
+        finally:
+            for rank in self.context.targets:
+                filepath = output_path + "_" + str(rank) + ".dnpy"
+                self.context.apply(cleanup_file, (filepath,), targets=(rank,))
+
+    def test_save_load_compressed(self):
+
+        output_path = self.output_paths[0]
+        da = self.context.fromndarray(np.linspace(0, 1, 100),
+                                      self.distribution)
+        try:
+            self.context.save_dnpy(output_path, da, codec='zlib')
+            db = self.context.load_dnpy(output_path)
+            assert_array_equal(db.toarray(), da.toarray())
+        finally:
+            for rank in self.context.targets:
+                filepath = output_path + "_" + str(rank) + ".dnpy"
+                self.context.apply(cleanup_file, (filepath,), targets=(rank,))
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            self.context.save_dnpy(self.output_paths[0], self.da, codec='nope')
+
+    def test_register_codec(self):
+        import zlib
+        output_path = self.output_paths[0]
+        da = self.context.fromndarray(np.arange(100.0), self.distribution)
+        self.context.register_codec('zlib-1', zlib.compress, zlib.decompress)
+        try:
+            self.context.save_dnpy(output_path, da, codec='zlib-1')
+            db = self.context.load_dnpy(output_path)
+            assert_array_equal(db.toarray(), da.toarray())
+        finally:
+            for rank in self.context.targets:
+                filepath = output_path + "_" + str(rank) + ".dnpy"
+                self.context.apply(cleanup_file, (filepath,), targets=(rank,))
+
     def test_save_load_with_prefix(self):
 
         output_path = self.output_paths[0]
@@ -70,6 +118,108 @@ class TestDnpyFileIO(DefaultContextTestCase):
                 self.context.apply(cleanup_file, (filepath,), targets=(rank,))
 
 
+class TestDnpySingleFileIO(DefaultContextTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestDnpySingleFileIO, cls).setUpClass()
+        cls.expected = np.arange(120.0).reshape(12, 10)
+        distribution = Distribution(cls.context, (12, 10),
+                                    dist=('b', 'b'))
+        cls.da = cls.context.fromndarray(cls.expected, distribution)
+        target = cls.context.targets[:1]
+        cls.output_path = cls.context.apply(engine_temp_path, ('.dnpy',),
+                                            targets=target)[0]
+
+    def tearDown(self):
+        self.context.apply(cleanup_file, (self.output_path,),
+                           targets=self.context.targets[:1])
+
+    def test_save_load(self):
+        self.context.save_dnpy(self.output_path, self.da, single_file=True)
+        db = self.context.load_dnpy(self.output_path, single_file=True)
+        self.assertEqual(db.dtype, self.da.dtype)
+        assert_array_equal(db.toarray(), self.expected)
+
+    def test_load_other_distribution(self):
+        self.context.save_dnpy(self.output_path, self.da, single_file=True)
+        distribution = Distribution(self.context, (12, 10),
+                                    dist=('c', 'n'),
+                                    targets=self.context.targets[:3])
+        db = self.context.load_dnpy(self.output_path, single_file=True,
+                                    distribution=distribution)
+        self.assertEqual(db.targets, self.context.targets[:3])
+        assert_array_equal(db.toarray(), self.expected)
+
+    def test_wrong_shape(self):
+        self.context.save_dnpy(self.output_path, self.da, single_file=True)
+        with self.assertRaises(ValueError):
+            self.context.load_dnpy(self.output_path, single_file=True,
+                                   distribution=(10, 12))
+
+    def test_name_list(self):
+        with self.assertRaises(TypeError):
+            self.context.save_dnpy(['a', 'b'], self.da, single_file=True)
+
+
+class TestCheckpointAsync(DefaultContextTestCase):
+
+    def setUp(self):
+        self.path = self.context.apply(engine_temp_path,
+                                       targets=self.context.targets[:1])[0]
+        self.a = self.context.fromndarray(np.arange(100.0))
+        distribution = Distribution(self.context, (6, 5),
+                                    targets=self.context.targets[:2])
+        self.b = self.context.fromndarray(np.arange(30).reshape(6, 5),
+                                          distribution)
+
+    def tearDown(self):
+        for prefix in ("%s_a" % self.path, "%s_b" % self.path):
+            for rank in range(len(self.context.targets)):
+                filepath = "%s_%s.dnpy" % (prefix, rank)
+                self.context.apply(cleanup_file, (filepath,),
+                                   targets=self.context.targets[:1])
+
+    def test_checkpoint(self):
+        checkpoint = self.context.checkpoint_async({'a': self.a}, self.path,
+                                                   codec='zlib')
+        self.a[0] = -1
+        checkpoint.wait()
+        self.assertTrue(checkpoint.done())
+        self.assertGreater(checkpoint.nbytes, 0)
+        self.assertGreater(checkpoint.throughput, 0)
+        da = self.context.load_dnpy(checkpoint.names['a'])
+        assert_array_equal(da.toarray(), np.arange(100.0))
+
+    def test_targets(self):
+        checkpoint = self.context.checkpoint_async({'a': self.a, 'b': self.b},
+                                                   self.path)
+        self.assertEqual(checkpoint.names['b'], "%s_b" % self.path)
+        checkpoint.wait()
+
+        def load(filename):
+            from distarray.localapi import format
+            with open(filename, 'rb') as fp:
+                return format.read_localarray(fp)['buffer']
+
+        for rank in range(2):
+            filepath = "%s_b_%s.dnpy" % (self.path, rank)
+            local = self.context.apply(load, (filepath,),
+                                       targets=self.context.targets[:1])[0]
+            assert_array_equal(local, self.b.toarray()[3 * rank:3 * rank + 3])
+
+    def test_error(self):
+        checkpoint = self.context.checkpoint_async(self.a,
+                                                   self.path + '/missing/x')
+        with self.assertRaises(IOError):
+            checkpoint.wait()
+        self.assertTrue(checkpoint.done())
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            self.context.checkpoint_async(self.a, self.path, codec='nope')
+
+
 bn_test_data = [
         ({'size': 2,
           'dist_type': 'b',
@@ -198,6 +348,97 @@ class TestNpyFileLoad(DefaultContextTestCase):
             for j in range(da.shape[1]):
                 self.assertEqual(da[i, j], self.expected[i, j])
 
+    def test_load_mmap(self):
+        for dim_data in (bn_test_data, nc_test_data):
+            distribution = Distribution.from_dim_data_per_rank(self.context,
+                                                               dim_data)
+            da = self.context.load_npy(self.output_path, distribution,
+                                       mmap_mode='r')
+            assert_array_equal(da.toarray(), self.expected)
+
+    def test_load_scratch(self):
+        scratch = tempfile.mkdtemp()
+        try:
+            for dim_data in (bn_test_data, nc_test_data, nu_test_data):
+                distribution = Distribution.from_dim_data_per_rank(
+                    self.context, dim_data)
+                da = self.context.load_npy(self.output_path, distribution,
+                                           scratch=scratch)
+                assert_array_equal(da.toarray(), self.expected)
+                assert_array_equal((da * 2).toarray(), self.expected * 2)
+            self.assertEqual(os.listdir(scratch), [])
+            with self.assertRaises(ValueError):
+                self.context.load_npy(self.output_path, distribution,
+                                      mmap_mode='r', scratch=scratch)
+        finally:
+            shutil.rmtree(scratch)
+
+
+class TestNpyFileSave(DefaultContextTestCase):
+
+    def setUp(self):
+        self.output_path = self.context.apply(
+            engine_temp_path, ('.npy',), targets=self.context.targets[:1])[0]
+
+    def tearDown(self):
+        self.context.apply(cleanup_file, (self.output_path,),
+                           targets=self.context.targets[:1])
+
+    def check_saved(self, da, expected):
+        self.context.save_npy(self.output_path, da)
+
+        def load(filename):
+            import numpy
+            return numpy.load(filename)
+
+        saved = self.context.apply(load, (self.output_path,),
+                                   targets=self.context.targets[:1])[0]
+        assert_array_equal(saved, expected)
+
+    def test_save_block(self):
+        expected = np.arange(120).reshape(12, 10)
+        distribution = Distribution(self.context, (12, 10), dist=('b', 'b'))
+        self.check_saved(self.context.fromndarray(expected, distribution),
+                         expected)
+
+    def test_save_cyclic(self):
+        expected = np.arange(120.0).reshape(10, 12)
+        distribution = Distribution(self.context, (10, 12), dist=('n', 'c'))
+        self.check_saved(self.context.fromndarray(expected, distribution),
+                         expected)
+
+    def test_save_load(self):
+        expected = np.arange(40).reshape(10, 4)
+        da = self.context.fromndarray(expected)
+        self.context.save_npy(self.output_path, da)
+        db = self.context.load_npy(self.output_path, da.distribution)
+        assert_array_equal(db.toarray(), expected)
+
+
+class TestNpyStream(DefaultContextTestCase):
+
+    def setUp(self):
+        self.output_path = temp_filepath('.npy')
+
+    def tearDown(self):
+        cleanup_file(self.output_path)
+
+    def check_streamed(self, expected, dist, block_bytes):
+        distribution = Distribution(self.context, expected.shape, dist=dist)
+        da = self.context.fromndarray(expected, distribution)
+        da.to_npy_stream(self.output_path, block_bytes=block_bytes)
+        assert_array_equal(np.load(self.output_path), expected)
+
+    def test_rows(self):
+        self.check_streamed(np.arange(120).reshape(12, 10), ('b', 'b'), 200)
+
+    def test_partial_rows(self):
+        self.check_streamed(np.arange(120.0).reshape(2, 6, 10),
+                            ('n', 'c', 'b'), 100)
+
+    def test_one_block(self):
+        self.check_streamed(np.arange(12).reshape(3, 4), ('c', 'n'), 2 ** 20)
+
 
 def check_hdf5_file(output_path, expected, dataset="buffer"):
     import h5py
@@ -319,5 +560,43 @@ class TestHdf5FileLoad(DefaultContextTestCase):
         assert_array_equal(self.expected, da)
 
 
+class TestHdf5ChunkedLoad(DefaultContextTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.h5py = import_or_skip('h5py')
+        super(TestHdf5ChunkedLoad, cls).setUpClass()
+        cls.output_path = cls.context.apply(engine_temp_path, ('.hdf5',),
+                                            targets=[cls.context.targets[0]])[0]
+        cls.expected = np.arange(600).reshape(20, 30)
+
+        def make_test_file(output_path, arr):
+            import h5py
+            with h5py.File(output_path, 'w') as fp:
+                fp.create_dataset("chunked", data=arr, chunks=(10, 5))
+                fp["contiguous"] = arr
+
+        cls.context.apply(make_test_file, (cls.output_path, cls.expected),
+                          targets=[cls.context.targets[0]])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.context.apply(cleanup_file, (cls.output_path,),
+                          targets=[cls.context.targets[0]])
+        super(TestHdf5ChunkedLoad, cls).tearDownClass()
+
+    def test_load_chunked(self):
+        da = self.context.load_hdf5(self.output_path, key="chunked")
+        assert_array_equal(self.expected, da.toarray())
+        for m, chunk in zip(da.distribution.maps, (10, 5)):
+            self.assertEqual(m.dist, 'b')
+            for (start, stop) in m.bounds:
+                self.assertEqual(start % chunk, 0)
+
+    def test_load_contiguous(self):
+        da = self.context.load_hdf5(self.output_path, key="contiguous")
+        assert_array_equal(self.expected, da.toarray())
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
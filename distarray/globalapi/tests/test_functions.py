@@ -13,11 +13,11 @@ Many of these tests require a 4-engine cluster to be running locally.
 import unittest
 
 import numpy as np
-from numpy.testing import assert_allclose
+from numpy.testing import assert_allclose, assert_array_equal
 
 from distarray.testing import DefaultContextTestCase
 import distarray.globalapi.functions as functions
-from distarray.globalapi import Context
+from distarray.globalapi import Context, DistArray, Distribution
 
 SKIP = True
 try:
@@ -121,6 +121,56 @@ class TestSpecialMethods(DefaultContextTestCase):
         assert_allclose(result.toarray(), expected)
 
 
+class TestBroadcasting(DefaultContextTestCase):
+    """Test binary operations on operands with different shapes."""
+
+    ntargets = 'any'
+
+    def setUp(self):
+        self.arr = np.arange(1, 61, dtype=float).reshape(6, 10)
+        self.darr = self.context.fromndarray(self.arr)
+
+    def test_ndarray_row(self):
+        row = self.arr.mean(axis=0)
+        result = functions.subtract(self.darr, row)
+        assert_allclose(result.toarray(), self.arr - row)
+
+    def test_ndarray_column(self):
+        col = self.arr.mean(axis=1)[:, np.newaxis]
+        assert_allclose((self.darr - col).toarray(), self.arr - col)
+
+    def test_ndarray_left_operand(self):
+        row = np.arange(10.)
+        assert_allclose((row * self.darr).toarray(), row * self.arr)
+
+    def test_distarray_row(self):
+        row = np.arange(10.)
+        drow = self.context.fromndarray(row)
+        assert_allclose((self.darr + drow).toarray(), self.arr + row)
+        assert_allclose((drow + self.darr).toarray(), row + self.arr)
+
+    def test_distarray_column_cyclic(self):
+        darr = self.context.fromndarray(self.arr, Distribution(
+            self.context, self.arr.shape, dist=('c', 'b')))
+        col = np.arange(6.).reshape(6, 1)
+        dcol = self.context.fromndarray(col, Distribution(
+            self.context, col.shape, dist=('b', 'n')))
+        assert_allclose((darr * dcol).toarray(), self.arr * col)
+
+    def test_both_operands_broadcast(self):
+        col = np.arange(4.).reshape(4, 1)
+        row = np.arange(5.)
+        dcol = self.context.fromndarray(col)
+        drow = self.context.fromndarray(row)
+        assert_allclose((dcol + drow).toarray(), col + row)
+        assert_allclose((dcol + row).toarray(), col + row)
+        assert_allclose(functions.less(row, dcol).toarray(), row < col)
+
+    def test_not_broadcastable(self):
+        with self.assertRaises(ValueError):
+            self.darr + np.ones(7)
+
+
 arr_a = np.arange(1, 11)
 arr_b = np.ones_like(arr_a) * 2
 arr_c = np.random.rand(100)
@@ -162,5 +212,139 @@ add_checkers(TestDistArrayUfuncs, unary_ops_2, 'check_unary_op')
 add_checkers(TestSpecialMethods, unary_special_methods, 'check_unary_op')
 
 
+class TestOutArgument(DefaultContextTestCase):
+    """Test ufuncs writing into an existing DistArray."""
+
+    ntargets = 'any'
+
+    def setUp(self):
+        self.arr = np.arange(1, 61, dtype=float).reshape(6, 10)
+        self.darr = self.context.fromndarray(self.arr)
+
+    def test_unary_out(self):
+        out = self.context.empty(self.darr.distribution)
+        result = functions.sqrt(self.darr, out=out)
+        self.assertIs(result, out)
+        assert_allclose(out.toarray(), np.sqrt(self.arr))
+
+    def test_binary_out(self):
+        out = self.context.empty(self.darr.distribution)
+        result = functions.add(self.darr, 2, out=out)
+        self.assertIs(result, out)
+        assert_allclose(out.toarray(), self.arr + 2)
+
+    def test_binary_out_positional(self):
+        out = self.context.empty(self.darr.distribution)
+        functions.multiply(self.darr, self.darr, out)
+        assert_allclose(out.toarray(), self.arr * self.arr)
+
+    def test_iadd(self):
+        darr = self.darr
+        key = darr.key
+        darr += 1
+        self.assertIs(darr, self.darr)
+        self.assertEqual(darr.key, key)
+        assert_allclose(darr.toarray(), self.arr + 1)
+
+    def test_imul_broadcast(self):
+        row = np.arange(10.)
+        self.darr *= row
+        assert_allclose(self.darr.toarray(), self.arr * row)
+
+    def test_out_incompatible(self):
+        out = self.context.zeros((6, 11))
+        with self.assertRaises(ValueError):
+            functions.add(self.darr, 1, out=out)
+
+
+class TestNumpyDispatch(DefaultContextTestCase):
+    """Test numpy functions and ufuncs called on DistArrays."""
+
+    ntargets = 'any'
+
+    def setUp(self):
+        self.arr = np.arange(-30, 30, dtype=float).reshape(6, 10)
+        self.darr = self.context.fromndarray(self.arr)
+
+    def test_ufunc_call(self):
+        result = np.maximum(self.darr, 3)
+        self.assertIsInstance(result, DistArray)
+        assert_allclose(result.toarray(), np.maximum(self.arr, 3))
+
+    def test_ufunc_not_wrapped(self):
+        result = np.copysign(self.darr, -1)
+        self.assertIsInstance(result, DistArray)
+        assert_allclose(result.toarray(), np.copysign(self.arr, -1))
+
+    def test_ufunc_out(self):
+        out = self.context.empty(self.darr.distribution, dtype=bool)
+        result = np.isfinite(self.darr, out=out)
+        self.assertIs(result, out)
+        self.assertTrue(out.toarray().all())
+
+    def test_ufunc_ndarray_left_operand(self):
+        row = np.arange(10.)
+        result = np.logical_and(row, self.darr)
+        self.assertIsInstance(result, DistArray)
+        assert_array_equal(result.toarray(), np.logical_and(row, self.arr))
+
+    def test_reduce(self):
+        for axis in (0, 1, None):
+            result = np.maximum.reduce(self.darr, axis=axis)
+            assert_allclose(result.toarray(),
+                            np.maximum.reduce(self.arr, axis=axis))
+
+    def test_accumulate(self):
+        dist = Distribution(self.context, self.arr.shape, dist=('b', 'n'))
+        for darr in (self.darr, self.context.fromndarray(self.arr, dist)):
+            for axis in (0, 1):
+                result = np.add.accumulate(darr, axis=axis)
+                assert_allclose(result.toarray(),
+                                np.add.accumulate(self.arr, axis=axis))
+
+    def test_unsupported_ufunc_method(self):
+        with self.assertRaises(TypeError):
+            np.add.outer(self.darr, self.darr)
+
+    def test_non_associative_reduce(self):
+        with self.assertRaises(TypeError):
+            np.subtract.reduce(self.darr, axis=0)
+        with self.assertRaises(TypeError):
+            np.subtract.accumulate(self.darr, axis=0)
+
+    def test_gufunc(self):
+        with self.assertRaises(TypeError):
+            np.matmul(self.darr, self.darr)
+
+    def test_like(self):
+        for func, expected in ((np.zeros_like, 0), (np.ones_like, 1),
+                               (np.empty_like, None)):
+            result = func(self.darr, dtype=int)
+            self.assertIsInstance(result, DistArray)
+            self.assertEqual(result.dtype, np.dtype(int))
+            self.assertIs(result.distribution, self.darr.distribution)
+            if expected is not None:
+                assert_array_equal(result.toarray(),
+                                   np.full(self.arr.shape, expected))
+        result = np.full_like(self.darr, 7)
+        assert_array_equal(result.toarray(), np.full_like(self.arr, 7))
+
+    def test_where(self):
+        result = np.where(self.darr > 0, self.darr, 0)
+        assert_allclose(result.toarray(), np.where(self.arr > 0, self.arr, 0))
+
+    def test_clip(self):
+        result = np.clip(self.darr, -5, 5)
+        assert_allclose(result.toarray(), np.clip(self.arr, -5, 5))
+
+    def test_sum(self):
+        assert_allclose(np.sum(self.darr, axis=0).toarray(),
+                        np.sum(self.arr, axis=0))
+
+    def test_unsupported_function(self):
+        with self.assertRaises(TypeError):
+            np.cumsum(self.darr)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
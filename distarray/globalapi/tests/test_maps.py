@@ -9,6 +9,8 @@ from __future__ import division
 import unittest
 from random import randrange
 
+import numpy as np
+
 from distarray.externals.six.moves import range
 
 from distarray.testing import DefaultContextTestCase
@@ -51,6 +53,24 @@ class TestClientMap(DefaultContextTestCase):
                 actual = cm.owning_ranks((r,c))
                 self.assertSequenceEqual(actual, [rank])
 
+    def test_owning_ranks_array(self):
+        shape = (7, 9)
+        for dist in (('b', 'n'), ('b', 'b'), ('c', 'b'), ('n', 'c')):
+            cm = Distribution(self.context, shape, dist)
+            rows, cols = np.indices(shape)
+            actual = cm.owning_ranks_array((rows.ravel(), cols.ravel()))
+            expected = [cm.owning_ranks((r, c))[0]
+                        for (r, c) in zip(rows.flat, cols.flat)]
+            self.assertSequenceEqual(actual.tolist(), expected)
+
+    def test_owning_ranks_array_unstructured(self):
+        indices = [[5, 0, 2], [1, 4], [3]]
+        cm = Distribution.from_global_dim_data(
+            self.context, ({'dist_type': 'u', 'indices': indices},),
+            targets=self.context.targets[:3])
+        actual = cm.owning_ranks_array((np.arange(6),))
+        self.assertSequenceEqual(actual.tolist(), [0, 1, 0, 2, 1, 0])
+
     def test_is_compatible(self):
         nr, nc, nd = 10**5, 10**6, 10**4
 
@@ -299,6 +319,88 @@ class TestDistributionCreation(DefaultContextTestCase):
                                     dist=('n', 'n'))
         self.context.ones(distribution)
 
+    def test_optimize(self):
+        ntargets = len(self.context.targets)
+        distribution = Distribution(self.context, shape=(120, 120),
+                                    dist=('b', 'b'),
+                                    optimize='reduce_axis=0')
+        self.assertEqual(distribution.grid_shape, (1, ntargets))
+
+    def test_placement(self):
+        distribution = Distribution(self.context, shape=(8, 6),
+                                    dist=('b', 'b'), placement='node')
+        node_ids = self.context.node_ids(distribution.targets)
+        self.assertEqual(sorted(distribution.rank_from_coords.flat),
+                         list(range(len(node_ids))))
+
+    def test_bad_placement(self):
+        with self.assertRaises(ValueError):
+            Distribution(self.context, shape=(8, 6), placement='socket')
+
+
+class TestPermutedPlacement(DefaultContextTestCase):
+
+    """Operations on a Distribution whose ranks are in reverse order."""
+
+    ntargets = 4
+
+    def setUp(self):
+        default = Distribution(self.context, (8, 6), ('b', 'b'), (2, 2))
+        self.distribution = Distribution.from_maps(
+            self.context, default.maps, targets=default.targets,
+            rank_from_coords=[[3, 2], [1, 0]])
+        self.expected = np.arange(48).reshape(8, 6)
+        self.darr = self.context.fromndarray(self.expected,
+                                             self.distribution)
+
+    def test_owning_targets(self):
+        self.assertEqual(self.distribution.owning_targets((0, 0)),
+                         [self.distribution.targets[3]])
+
+    def test_round_trip(self):
+        np.testing.assert_array_equal(self.darr.toarray(), self.expected)
+
+    def test_local_coords(self):
+        def local_coords(arr):
+            return arr.cart_coords
+        coords = self.context.apply(local_coords, (self.darr.key,),
+                                    targets=self.darr.targets)
+        self.assertEqual([tuple(c) for c in coords],
+                         [(1, 1), (1, 0), (0, 1), (0, 0)])
+
+    def test_reduce(self):
+        for axis in (0, 1, None):
+            result = self.darr.sum(axis=axis)
+            expected = self.expected.sum(axis=axis)
+            if axis is None:
+                self.assertEqual(result, expected)
+            else:
+                np.testing.assert_array_equal(result.toarray(), expected)
+
+    def test_slice(self):
+        result = self.darr[1:7, 4:]
+        self.assertEqual(result.distribution.grid_shape, (2, 1))
+        np.testing.assert_array_equal(result.toarray(),
+                                      self.expected[1:7, 4:])
+        row = self.darr[5]
+        np.testing.assert_array_equal(row.toarray(), self.expected[5])
+
+    def test_getitem(self):
+        self.assertEqual(self.darr[0, 0], 0)
+        self.assertEqual(self.darr[7, 5], 47)
+        np.testing.assert_array_equal(self.darr[[7, 0], :],
+                                      self.expected[[7, 0], :])
+
+    def test_binary_op(self):
+        ones = self.context.ones(self.distribution, dtype=int)
+        np.testing.assert_array_equal((self.darr + ones).toarray(),
+                                      self.expected + 1)
+
+    def test_incompatible_with_row_major(self):
+        default = Distribution(self.context, (8, 6), ('b', 'b'), (2, 2))
+        self.assertFalse(self.distribution.is_compatible(default))
+
+
 class TestRedistribution(DefaultContextTestCase):
 
     def test_block_redistribution_one_to_one(self):
@@ -0,0 +1,281 @@
+# encoding: utf-8
+# ---------------------------------------------------------------------------
+#  Copyright (C) 2008-2014, IPython Development Team and Enthought, Inc.
+#  Distributed under the terms of the BSD License.  See COPYING.rst.
+# ---------------------------------------------------------------------------
+
+"""
+Backends that execute the local part of elementwise operations and
+reductions on an engine.
+
+The 'numpy' backend calls NumPy directly.  The 'threaded' backend cuts the
+work into chunks along the first axis and runs them on a thread pool; NumPy
+releases the GIL in its inner loops, so an engine can use several cores.
+The 'streaming' backend runs the chunks one after the other on LocalArrays
+stored out of core in memory-mapped scratch files (see `spill_memmap`).
+
+Each Context chooses its backend (`Context.set_backend`).  The engines
+keep one backend per context key, and `activate` selects the one for the
+context making the current call.
+"""
+
+from __future__ import division
+
+import mmap
+import os
+import tempfile
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+
+class NumPyBackend(object):
+
+    """Execute with plain, single-threaded NumPy."""
+
+    name = 'numpy'
+
+    def ufunc(self, func, operands, args=(), kwargs=None, out=None):
+        """Return ``func(*operands, *args, out=out, **kwargs)``."""
+        kwargs = {} if kwargs is None else kwargs
+        if out is not None:
+            kwargs = dict(kwargs, out=out)
+        return func(*(tuple(operands) + tuple(args)), **kwargs)
+
+    def reduce(self, ufunc, array, axes, dtype=None):
+        """Return ``ufunc.reduce(array, axis=axes, dtype=dtype)``."""
+        return ufunc.reduce(array, axis=tuple(axes), dtype=dtype)
+
+    def close(self):
+        pass
+
+
+class ThreadedBackend(NumPyBackend):
+
+    """Execute in chunks of about `chunk_bytes` bytes of output on a pool
+    of `nthreads` threads.
+
+    Operations with a single output and reductions are chunked along the
+    first axis; anything else, and work smaller than one chunk, runs as in
+    `NumPyBackend`.  Chunked reductions combine per-chunk partial results,
+    so floating point sums may differ in the last bits from NumPy's.
+    """
+
+    name = 'threaded'
+
+    def __init__(self, nthreads=None, chunk_bytes=None):
+        self.nthreads = cpu_count() if nthreads is None else nthreads
+        self.chunk_bytes = (DEFAULT_CHUNK_BYTES if chunk_bytes is None
+                            else chunk_bytes)
+        self.pool = ThreadPool(self.nthreads)
+
+    def _chunks(self, shape, itemsize):
+        """Return slices cutting `shape` along its first axis into chunks
+        of about `chunk_bytes` bytes, or None if one chunk would do.
+        """
+        if len(shape) == 0 or shape[0] < 2:
+            return None
+        row_bytes = itemsize * int(np.prod(shape[1:]))
+        rows = max(1, self.chunk_bytes // max(row_bytes, 1))
+        if rows >= shape[0]:
+            return None
+        return [slice(start, min(start + rows, shape[0]))
+                for start in range(0, shape[0], rows)]
+
+    def ufunc(self, func, operands, args=(), kwargs=None, out=None):
+        kwargs = {} if kwargs is None else kwargs
+        if args or getattr(func, 'nout', 1) != 1 or 'out' in kwargs:
+            return super(ThreadedBackend, self).ufunc(func, operands, args,
+                                                      kwargs, out)
+        shape = np.broadcast(*operands).shape
+        itemsize = max([np.asarray(op).itemsize for op in operands] +
+                       ([out.itemsize] if out is not None else []))
+        chunks = self._chunks(shape, itemsize)
+        if chunks is None:
+            return super(ThreadedBackend, self).ufunc(func, operands, args,
+                                                      kwargs, out)
+
+        def piece(operand, chunk):
+            # operands that broadcast along the first axis go in whole
+            if (isinstance(operand, np.ndarray) and
+                    operand.ndim == len(shape) and operand.shape[0] > 1):
+                return operand[chunk]
+            return operand
+
+        if out is None:
+            first = func(*[piece(op, chunks[0]) for op in operands], **kwargs)
+            out = self._empty(shape, first.dtype)
+            out[chunks[0]] = first
+            chunks = chunks[1:]
+
+        def run(chunk):
+            func(*[piece(op, chunk) for op in operands], out=out[chunk],
+                 **kwargs)
+
+        self._map(run, chunks, tuple(operands) + (out,))
+        return out
+
+    def reduce(self, ufunc, array, axes, dtype=None):
+        axes = tuple(axes)
+        chunks = self._chunks(array.shape, array.itemsize)
+        if chunks is None:
+            return super(ThreadedBackend, self).reduce(ufunc, array, axes,
+                                                       dtype)
+
+        def run(chunk):
+            return ufunc.reduce(array[chunk], axis=axes, dtype=dtype,
+                                keepdims=True)
+
+        partials = self._map(run, chunks, (array,))
+        if 0 in axes:
+            result = ufunc.reduce(np.concatenate(partials), axis=0,
+                                  dtype=dtype, keepdims=True)
+        else:
+            result = np.concatenate(partials)
+        shape = tuple(s for (i, s) in enumerate(result.shape)
+                      if i not in axes)
+        return result.reshape(shape)
+
+    def _map(self, run, chunks, arrays):
+        """Return ``[run(chunk) for chunk in chunks]``, computed on the pool.
+
+        `arrays` are the arrays `run` reads or writes.
+        """
+        return self.pool.map(run, chunks)
+
+    def _empty(self, shape, dtype):
+        return np.empty(shape, dtype=dtype)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+class StreamingBackend(ThreadedBackend):
+
+    """Execute in chunks of about `chunk_bytes` bytes, one after the other,
+    for LocalArrays stored out of core in the directory `scratch`.
+
+    After each chunk, the pages of the memory-mapped arrays involved are
+    released (see `release_pages`), so the resident set stays around one
+    chunk per operand whatever the size of the arrays.  New outputs are
+    memory-mapped files in `scratch`; only operations with a single output
+    are streamed, others run in memory as in `NumPyBackend`.
+    """
+
+    name = 'streaming'
+
+    def __init__(self, scratch, chunk_bytes=None):
+        self.scratch = scratch
+        self.nthreads = 1
+        self.chunk_bytes = (SPILL_CHUNK_BYTES if chunk_bytes is None
+                            else chunk_bytes)
+        self.pool = None
+
+    def row_chunks(self, shape, itemsize):
+        """Return slices cutting `shape` along its first axis into chunks
+        of about `chunk_bytes` bytes.
+        """
+        return self._chunks(shape, itemsize) or [Ellipsis]
+
+    def ufunc(self, func, operands, args=(), kwargs=None, out=None):
+        result = super(StreamingBackend, self).ufunc(func, operands, args,
+                                                     kwargs, out)
+        if out is None and type(result) is np.ndarray:
+            # computed in one piece, in memory
+            spilled = self._empty(result.shape, result.dtype)
+            spilled[...] = result
+            return spilled
+        return result
+
+    def fill(self, out, value):
+        """Assign `value`, a scalar, to `out` chunk by chunk."""
+        for chunk in self.row_chunks(out.shape, out.itemsize):
+            out[chunk] = value
+            release_pages(out)
+
+    def _map(self, run, chunks, arrays):
+        results = []
+        for chunk in chunks:
+            results.append(run(chunk))
+            for array in arrays:
+                release_pages(array)
+        return results
+
+    def _empty(self, shape, dtype):
+        return spill_memmap(self.scratch, shape, dtype)
+
+    def close(self):
+        pass
+
+
+def spill_memmap(scratch, shape, dtype):
+    """Return a new, zero-filled `numpy.memmap` of `shape` and `dtype`
+    backed by a file in the directory `scratch`.
+
+    The file is unlinked right away: the mapping keeps its data, and the
+    disk space is reclaimed with the last reference to the array, even if
+    the process dies.
+    """
+    dtype = np.dtype(dtype)
+    if int(np.prod(shape)) * dtype.itemsize == 0:
+        # an empty file cannot be mapped
+        return np.zeros(shape, dtype=dtype)
+    fd, filename = tempfile.mkstemp(suffix='.spill', dir=scratch)
+    os.close(fd)
+    try:
+        return np.memmap(filename, dtype=dtype, mode='w+', shape=shape)
+    finally:
+        os.remove(filename)
+
+
+def release_pages(array):
+    """Drop the resident pages of the file mapping `array` is a view of.
+
+    Pages of a shared mapping are read back from the file when they are
+    next touched, so no data is lost; copy-on-write mappings (mode 'c')
+    and arrays not backed by a mapping are left alone.
+    """
+    mode = None
+    base = array
+    while base is not None and not isinstance(base, mmap.mmap):
+        mode = getattr(base, 'mode', mode)
+        base = getattr(base, 'base', None)
+    if base is not None and mode != 'c' and hasattr(base, 'madvise'):
+        base.madvise(mmap.MADV_DONTNEED)
+
+
+# About half of a typical per-core L2 cache.
+DEFAULT_CHUNK_BYTES = 2 ** 17
+
+# Large enough for disk reads and writes to run at streaming speed.
+SPILL_CHUNK_BYTES = 2 ** 24
+
+BACKENDS = {'numpy': NumPyBackend, 'threaded': ThreadedBackend}
+
+_DEFAULT = NumPyBackend()
+_backends = {}
+_active = _DEFAULT
+
+
+def set_backend(context_key, name, **options):
+    """Use the backend called `name`, built with `options`, for the calls
+    of the context with key `context_key`.
+    """
+    old = _backends.pop(context_key, None)
+    if old is not None:
+        old.close()
+    _backends[context_key] = BACKENDS[name](**options)
+    activate(context_key)
+
+
+def activate(context_key):
+    """Select the backend of the context with key `context_key`."""
+    global _active
+    _active = _backends.get(context_key, _DEFAULT)
+
+
+def get_backend():
+    """Return the backend selected by `activate`."""
+    return _active
@@ -0,0 +1,88 @@
+# encoding: utf-8
+# ---------------------------------------------------------------------------
+#  Copyright (C) 2008-2014, IPython Development Team and Enthought, Inc.
+#  Distributed under the terms of the BSD License.  See COPYING.rst.
+# ---------------------------------------------------------------------------
+
+"""
+Save snapshots of LocalArrays to ``.dnpy`` files in the background.
+
+`start` copies the arrays, so the caller may go on modifying them, and
+hands the copies to a thread that saves them.  `wait` joins the thread.
+The thread only does file I/O, never MPI calls.
+"""
+
+import os
+import threading
+from timeit import default_timer as clock
+
+from distarray.localapi.localarray import LocalArray, save_dnpy
+
+
+class _Job(object):
+
+    def __init__(self, snapshots, codec, start):
+        self.snapshots = snapshots
+        self.codec = codec
+        self.start = start
+        self.stop = None
+        self.nbytes = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        try:
+            for larr, filename in self.snapshots:
+                save_dnpy(filename, larr, codec=self.codec)
+                self.nbytes += os.path.getsize(filename)
+        except Exception as e:
+            self.error = "%s: %s" % (type(e).__name__, e)
+        finally:
+            self.snapshots = None
+            self.stop = clock()
+
+
+_jobs = {}
+
+
+def start(job_id, arrays, filenames, codec=None):
+    """Copy `arrays` and start saving the copies to `filenames`.
+
+    Parameters
+    ----------
+    job_id : str
+        Name of the job, for `done` and `wait`.
+    arrays : sequence of LocalArray
+    filenames : sequence of str
+    codec : str, optional
+        See `distarray.localapi.save_dnpy`.
+    """
+    begin = clock()
+    snapshots = [(LocalArray(larr.distribution, dtype=larr.dtype,
+                             buf=larr.ndarray.copy()), filename)
+                 for (larr, filename) in zip(arrays, filenames)]
+    _jobs[job_id] = _Job(snapshots, codec, begin)
+
+
+def done(job_id):
+    """Return whether the job `job_id` has finished."""
+    return not _jobs[job_id].thread.is_alive()
+
+
+def wait(job_id):
+    """Wait for the job `job_id` to finish, and forget it.
+
+    Returns
+    -------
+    nbytes : int
+        The size of the files written.
+    seconds : float
+        The time from the start of the snapshot to the end of the writes.
+    error : str or None
+        A description of the exception that stopped the job, if any.
+    """
+    job = _jobs.pop(job_id)
+    job.thread.join()
+    return job.nbytes, job.stop - job.start, job.error
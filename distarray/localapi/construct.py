@@ -6,6 +6,8 @@
 
 from __future__ import division
 
+import numpy
+
 from distarray.localapi.mpiutils import MPI
 from distarray.localapi.error import NullCommError, InvalidBaseCommError
 
@@ -32,7 +34,24 @@ def init_base_comm(comm):
         raise InvalidBaseCommError("Not an MPI.Comm instance")
 
 
-def init_comm(base_comm, grid_shape):
-    """Create an MPI communicator with a cartesian topology."""
-    return base_comm.Create_cart(grid_shape, len(grid_shape) * (False,),
-                                 reorder=False)
+def init_comm(base_comm, grid_shape, grid_coords=None):
+    """Create an MPI communicator with a cartesian topology.
+
+    By default the processes fill the grid in rank order.  If
+    `grid_coords` (this process's coordinates) is given, the communicator
+    is built so that each process sits at its own coordinates, which lets
+    the client place ranks on the grid in any order.
+    """
+    periods = len(grid_shape) * (False,)
+    if grid_coords is None or len(grid_shape) == 0:
+        return base_comm.Create_cart(grid_shape, periods, reorder=False)
+
+    position = int(numpy.ravel_multi_index(tuple(grid_coords), grid_shape))
+    if not base_comm.allreduce(position != base_comm.Get_rank(), op=MPI.LOR):
+        return base_comm.Create_cart(grid_shape, periods, reorder=False)
+
+    ordered_comm = base_comm.Split(0, position)
+    try:
+        return ordered_comm.Create_cart(grid_shape, periods, reorder=False)
+    finally:
+        ordered_comm.Free()
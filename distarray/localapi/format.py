@@ -56,6 +56,73 @@ data buffer.  This contains the full output of ``save``, beginning with
 the magic number for ``.npy`` files, followed by the ``.npy`` header and
 array data.
 
+Format Version 1.1
+------------------
+
+Version 1.1 lifts the size limit of the version 1.0 header, which embeds
+the full ``indices`` of unstructured dimensions.  It differs from version
+1.0 in two ways.
+
+The header length is a 4-byte little-endian unsigned int, so the header
+data can be up to 4 GiB.
+
+The ``dim_data`` dictionaries of unstructured (``'u'``) dimensions have no
+``indices`` key.  Instead, following the header, there is the output of
+``numpy.save`` for the ``indices`` of each unstructured dimension, in
+dimension order, and then that for the data buffer as in version 1.0.
+
+The dictionary may have a third key, "codec", when the data is
+compressed:
+
+    "codec" : dict
+        The "name" of the codec (see `register_codec`) and the number of
+        bytes of uncompressed data in each frame, "chunk_bytes".
+
+The data buffer is then written as a ``.npy`` header for a C-ordered
+array, followed by the raw data in frames of "chunk_bytes" bytes (the
+last may be shorter), each compressed on its own and preceded by its
+compressed length as an 8-byte little-endian unsigned int.  A reader can
+decompress the frames one at a time.
+
+Writers use version 1.0 when possible, and version 1.1 when the array has
+unstructured dimensions, is compressed, or the header is too long for
+version 1.0.
+
+Format Version 2.0
+------------------
+
+Version 2.0 holds a whole distributed array in a single file, written
+collectively by all the processes holding it (see
+`distarray.localapi.save_dnpy_collective`).
+
+The first 8 bytes are the magic string with the version:
+``\\x93DARRY\\x02\\x00``.
+
+The next 4 bytes form a little-endian unsigned int: the length of the
+header data HEADER_LEN.
+
+The next HEADER_LEN bytes form the global header, an ASCII Python literal
+of a dictionary, terminated by a newline and padded with spaces so that
+the data that follows starts on a multiple of `CHUNK_ALIGNMENT` bytes.  Its
+keys are:
+
+    "__version__" : str
+        Version of the Distributed Array Protocol used in this header.
+    "descr" : str
+        The dtype of the data, as in the ``.npy`` format.
+    "shape" : tuple of int
+        The global shape of the array.
+    "chunks" : tuple of dict
+        The offset table: one dictionary per process that wrote the file,
+        with its ``dim_data`` (as in version 1.0) and the ``offset`` in bytes,
+        from the start of the file, of its local data.
+
+Each chunk's data is its local array in C order, with no header of its own,
+starting at its offset; offsets are multiples of `CHUNK_ALIGNMENT`.  A
+reader can load any section of the array, with any number of processes,
+by intersecting its global indices with those of each chunk (see
+`chunk_byte_ranges`).
+
 Notes
 -----
 
@@ -66,6 +133,7 @@ module docstring for ``numpy.lib.format``.
 """
 
 import io
+import zlib
 from distarray.externals import six
 
 import numpy as np
@@ -76,6 +144,33 @@ from numpy.compat import asbytes
 MAGIC_PREFIX = asbytes('\x93DARRY')
 MAGIC_LEN = len(MAGIC_PREFIX) + 2
 
+# Alignment, in bytes, of the header end and of each chunk in version 2.0.
+CHUNK_ALIGNMENT = 64
+
+# Uncompressed bytes per compressed frame.
+CODEC_CHUNK_BYTES = 2 ** 22
+
+CODECS = {}
+
+
+def register_codec(name, compress, decompress):
+    """Make the codec `name` available to compress ``.dnpy`` data.
+
+    `compress` and `decompress` take and return bytes.  The codec must be
+    registered wherever files using it are read or written; see also
+    `distarray.globalapi.Context.register_codec`.
+    """
+    CODECS[name] = (compress, decompress)
+
+
+register_codec('zlib', zlib.compress, zlib.decompress)
+try:
+    import lzma
+except ImportError:  # Python 2
+    pass
+else:
+    register_codec('lzma', lzma.compress, lzma.decompress)
+
 
 # This is only copied from numpy/lib/format.py because the numpy version
 # doesn't allow one to set the MAGIC_PREFIX
@@ -158,25 +253,26 @@ def write_localarray_header(fp, d, version=None):
         the file version which needs to be used to store the data
     """
     import struct
-    header = ["{"]
-    for key, value in sorted(d.items()):
-        # Need to use repr here, since we eval these when reading
-        header.append("'%s': %s, " % (key, repr(value)))
-    header.append("}")
-    header = "".join(header)
-    # Pad the header with spaces and a final newline such that the magic
-    # string, the header-length short and the header are aligned on a
-    # 16-byte boundary.  Hopefully, some system, possibly memory-mapping,
-    # can take advantage of our premature optimization.
-    current_header_len = MAGIC_LEN + 2 + len(header) + 1  # 1 for the newline
-    topad = 16 - (current_header_len % 16)
-    header = header + ' '*topad + '\n'
-    header = asbytes(header)
-
-    hlen = len(header)
+    header = _header_literal(d)
+
+    def pad(header, length_len):
+        # Pad the header with spaces and a final newline such that the magic
+        # string, the header length and the header are aligned on a 16-byte
+        # boundary.  Hopefully, some system, possibly memory-mapping, can
+        # take advantage of our premature optimization.
+        current_header_len = MAGIC_LEN + length_len + len(header) + 1
+        topad = 16 - (current_header_len % 16)
+        return asbytes(header + ' '*topad + '\n')
+
+    hlen = len(pad(header, 2))
     if hlen < 256*256 and version in (None, (1, 0)):
         version = (1, 0)
-        header_prefix = magic(1, 0) + struct.pack('<H', hlen)
+        header = pad(header, 2)
+        header_prefix = magic(1, 0) + struct.pack('<H', len(header))
+    elif version in (None, (1, 1)):
+        version = (1, 1)
+        header = pad(header, 4)
+        header_prefix = magic(1, 1) + struct.pack('<I', len(header))
     else:
         msg = "Header length %s too big for version=%s"
         msg %= (hlen, version)
@@ -187,13 +283,14 @@ def write_localarray_header(fp, d, version=None):
     return version
 
 
-def write_localarray(fp, larr, version=(1, 0)):
+def write_localarray(fp, larr, version=None, codec=None):
     """
     Write a LocalArray to a .dnpy file, including a header.
 
     The ``__version__`` and ``dim_data`` keys from the Distributed Array
     Protocol are written to a header, then ``numpy.save`` is used to write the
-    value of the ``buffer`` key.
+    value of the ``buffer`` key (after the ``indices`` of unstructured
+    dimensions, in version 1.1).
 
     Parameters
     ----------
@@ -202,8 +299,12 @@ def write_localarray(fp, larr, version=(1, 0)):
         method.
     larr : LocalArray
         The array to write to disk.
-    version : (int, int), optional
-        The version number of the file format.  Default: (1, 0)
+    version : (int, int) or None, optional
+        The version number of the file format.  None, the default, means the
+        oldest that works.
+    codec : str, optional
+        Name of a codec (see `register_codec`) to compress the data with.
+        Requires version 1.1.
 
     Raises
     ------
@@ -215,23 +316,100 @@ def write_localarray(fp, larr, version=(1, 0)):
         objects are not picklable.
 
     """
-    if version != (1, 0):
-        msg = "Only version (1, 0) is supported, not %s."
+    if version not in (None, (1, 0), (1, 1)):
+        msg = "Only versions (1, 0) and (1, 1) are supported, not %s."
         raise ValueError(msg % (version,))
 
     distbuffer = larr.__distarray__()
+    if codec is not None:
+        if codec not in CODECS:
+            raise ValueError("Unknown codec %r." % (codec,))
+        if version == (1, 0):
+            raise ValueError("Compression requires version (1, 1).")
+        if distbuffer['buffer'].dtype.hasobject:
+            raise ValueError("Cannot compress arrays of Python objects.")
+    dim_data = distbuffer['dim_data']
+    indices = [dd['indices'] for dd in dim_data if dd['dist_type'] == 'u']
+    if (indices or codec is not None) and version is None:
+        version = (1, 1)
+    if version == (1, 1):
+        dim_data = tuple(dict((key, value) for (key, value) in dd.items()
+                              if key != 'indices')
+                         for dd in dim_data)
+    else:
+        dim_data = _literal_dim_data(dim_data)
     metadata = {'__version__': distbuffer['__version__'],
-                'dim_data': distbuffer['dim_data'],
+                'dim_data': dim_data,
                 }
+    if codec is not None:
+        metadata['codec'] = {'name': codec, 'chunk_bytes': CODEC_CHUNK_BYTES}
+
+    version = write_localarray_header(fp, metadata, version=version)
+    if version == (1, 1):
+        for dim_indices in indices:
+            np.save(fp, np.asarray(dim_indices))
+    if codec is None:
+        np.save(fp, distbuffer['buffer'])
+    else:
+        write_compressed(fp, distbuffer['buffer'], metadata['codec'])
 
-    write_localarray_header(fp, metadata, version=(1, 0))
-    np.save(fp, distbuffer['buffer'])
 
+def write_npy_header(fp, dtype, shape):
+    """Write the ``.npy`` header of a C-ordered array of `dtype` and `shape`
+    to `fp`, in format version 1.0 if possible, else 2.0.
+    """
+    d = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+         'fortran_order': False,
+         'shape': tuple(shape)}
+    try:
+        np.lib.format.write_array_header_1_0(fp, d)
+    except ValueError:
+        np.lib.format.write_array_header_2_0(fp, d)
+
+
+def write_compressed(fp, array, codec):
+    """Write `array` as a ``.npy`` header and compressed frames.
 
-def read_localarray_header(fp, version):
+    `codec` is the "codec" dictionary of the header (see the module
+    docstring).
+    """
+    import struct
+    compress = CODECS[codec['name']][0]
+    array = np.ascontiguousarray(array)
+    write_npy_header(fp, array.dtype, array.shape)
+    data = array.reshape(-1).view(np.uint8)
+    step = codec['chunk_bytes']
+    for start in range(0, len(data), step):
+        frame = compress(data[start:start + step].tobytes())
+        fp.write(struct.pack('<Q', len(frame)))
+        fp.write(frame)
+
+
+def read_compressed(fp, codec):
+    """Read an array written by `write_compressed`, one frame at a time."""
+    import struct
+    try:
+        decompress = CODECS[codec['name']][1]
+    except KeyError:
+        msg = "Unknown codec %r; see register_codec."
+        raise ValueError(msg % (codec['name'],))
+    shape, fortran_order, dtype = _read_npy_header(fp)
+    array = np.empty(shape, dtype=dtype)
+    data = array.reshape(-1).view(np.uint8)
+    start = 0
+    while start < len(data):
+        length_str = _read_bytes(fp, 8, "Compressed frame length")
+        length = struct.unpack('<Q', length_str)[0]
+        frame = decompress(_read_bytes(fp, length, "Compressed frame"))
+        data[start:start + len(frame)] = np.frombuffer(frame, dtype=np.uint8)
+        start += len(frame)
+    return array
+
+
+def read_localarray_header(fp, version, return_dict=False):
     """
-    Read an array header from a filelike object using the 1.0 file format
-    version.
+    Read an array header from a filelike object using the 1.0 or 1.1 file
+    format version.
 
     This will leave the file object located just after the header.
 
@@ -240,6 +418,8 @@ def read_localarray_header(fp, version):
     fp : filelike object
         A file object or something with a `.read()` method like a file.
     version : tuple of int
+    return_dict : bool, optional
+        If True, return the whole header dictionary instead.
 
     Returns
     -------
@@ -262,31 +442,27 @@ def read_localarray_header(fp, version):
         hlength_str = _read_bytes(fp, 2, "Array header length")
         header_length = struct.unpack('<H', hlength_str)[0]
         header = _read_bytes(fp, header_length, "Array header")
+    elif version == (1, 1):
+        hlength_str = _read_bytes(fp, 4, "Array header length")
+        header_length = struct.unpack('<I', hlength_str)[0]
+        header = _read_bytes(fp, header_length, "Array header")
     else:
         raise ValueError("Invalid version %r" % version)
 
     # The header is a pretty-printed string representation of a literal Python
     # dictionary with trailing newlines padded to a 16-byte boundary. The keys
     # are strings.
-    try:
-        d = safe_eval(header)
-    except SyntaxError as e:
-        msg = "Cannot parse header: %r\nException: %r"
-        raise ValueError(msg % (header, e))
-    if not isinstance(d, dict):
-        msg = "Header is not a dictionary: %r"
-        raise ValueError(msg % d)
-    keys = sorted(d.keys())
-    if keys != ['__version__', 'dim_data']:
-        msg = "Header does not contain the correct keys: %r"
-        raise ValueError(msg % (keys,))
+    optional = ['codec'] if version == (1, 1) else []
+    d = _eval_header(header, ['__version__', 'dim_data'], optional)
 
     # TODO: Sanity check with the DAP validator
 
+    if return_dict:
+        return d
     return d['__version__'], d['dim_data']
 
 
-def read_localarray(fp):
+def read_localarray(fp, mmap_mode=None):
     """
     Read a LocalArray from an .dnpy file.
 
@@ -295,6 +471,10 @@ def read_localarray(fp):
     fp : file_like object
         If this is not a real file object, then this may take extra memory
         and time.
+    mmap_mode : {None, 'r+', 'r', 'c'}, optional
+        If not None, memory-map the data instead of reading it, with this
+        mode (see `numpy.memmap`).  `fp` must then be a real file object.
+        Compressed data is always read.
 
     Returns
     -------
@@ -308,13 +488,23 @@ def read_localarray(fp):
 
     """
     version = read_magic(fp)
-    if version != (1, 0):
-        msg = "only support version (1,0) of file format, not %r"
+    if version not in ((1, 0), (1, 1)):
+        msg = "only support versions (1,0) and (1,1) of file format, not %r"
         raise ValueError(msg % (version,))
 
-    __version__, dim_data = read_localarray_header(fp, version=(1, 0))
-
-    buf = np.load(fp)
+    header = read_localarray_header(fp, version=version, return_dict=True)
+    __version__, dim_data = header['__version__'], header['dim_data']
+    if version == (1, 1):
+        for dd in dim_data:
+            if dd['dist_type'] == 'u':
+                dd['indices'] = np.load(fp)
+
+    if 'codec' in header:
+        buf = read_compressed(fp, header['codec'])
+    elif mmap_mode is None:
+        buf = np.load(fp)
+    else:
+        buf = _memmap_npy(fp, mmap_mode)
 
     distbuffer = {
         '__version__': __version__,
@@ -325,6 +515,235 @@ def read_localarray(fp):
     return distbuffer
 
 
+def _read_npy_header(fp):
+    """Read a ``.npy`` magic string and header, and return the shape,
+    fortran_order and dtype.
+    """
+    npy_version = np.lib.format.read_magic(fp)
+    if npy_version == (1, 0):
+        read_header = np.lib.format.read_array_header_1_0
+    elif npy_version == (2, 0):
+        read_header = np.lib.format.read_array_header_2_0
+    else:
+        msg = "Unsupported version %r of the .npy format."
+        raise ValueError(msg % (npy_version,))
+    return read_header(fp)
+
+
+def _memmap_npy(fp, mmap_mode):
+    """Memory-map the ``.npy`` data starting at the position of `fp`."""
+    shape, fortran_order, dtype = _read_npy_header(fp)
+    if dtype.hasobject:
+        raise ValueError("Cannot memory-map arrays of Python objects.")
+    order = 'F' if fortran_order else 'C'
+    if np.prod(shape) == 0:
+        # mmap can't map zero bytes
+        return np.empty(shape, dtype=dtype, order=order)
+    return np.memmap(fp, dtype=dtype, mode=mmap_mode, shape=shape,
+                     order=order, offset=fp.tell())
+
+
+def _header_literal(d):
+    """Return the Python literal of dictionary `d`, with sorted keys."""
+    header = ["{"]
+    for key, value in sorted(d.items()):
+        # Need to use repr here, since we eval these when reading
+        header.append("'%s': %s, " % (key, repr(value)))
+    header.append("}")
+    return "".join(header)
+
+
+def _eval_header(header, keys, optional=()):
+    """Evaluate the literal `header` and check it is a dictionary with
+    all of `keys`, and no other keys than those and `optional`.
+    """
+    if isinstance(header, bytes):
+        header = header.decode('latin1')
+    try:
+        d = safe_eval(header)
+    except SyntaxError as e:
+        msg = "Cannot parse header: %r\nException: %r"
+        raise ValueError(msg % (header, e))
+    if not isinstance(d, dict):
+        msg = "Header is not a dictionary: %r"
+        raise ValueError(msg % d)
+    if sorted(k for k in d.keys() if k not in optional) != sorted(keys):
+        msg = "Header does not contain the correct keys: %r"
+        raise ValueError(msg % (sorted(d.keys()),))
+    return d
+
+
+def _align(n, alignment=CHUNK_ALIGNMENT):
+    return -(-n // alignment) * alignment
+
+
+def _literal_dim_data(dim_data):
+    """Return `dim_data` with index arrays as lists, so that it survives a
+    round trip through its literal.
+    """
+    return tuple(dict((key, value.tolist() if isinstance(value, np.ndarray)
+                       else value) for (key, value) in dd.items())
+                 for dd in dim_data)
+
+
+def global_header(__version__, dtype, shape, chunk_dim_data, chunk_nbytes):
+    """Build the header of a version 2.0 file.
+
+    Parameters
+    ----------
+    __version__ : str
+        Version of the Distributed Array Protocol.
+    dtype : numpy dtype
+    shape : tuple of int
+        Global shape.
+    chunk_dim_data : sequence of tuples of dict
+        The ``dim_data`` of each chunk, in file order.
+    chunk_nbytes : sequence of int
+        The number of bytes of each chunk.
+
+    Returns
+    -------
+    header : bytes
+        Magic string, header length and header.
+    offsets : list of int
+        The offset of each chunk.
+    """
+    import struct
+    dtype = np.dtype(dtype)
+    if dtype.hasobject:
+        raise ValueError("Cannot save arrays of Python objects in a .dnpy "
+                         "version 2.0 file.")
+    # The offsets depend on the header length and the header holds the
+    # offsets, so grow the offsets until the header fits before them.
+    data_start = 0
+    while True:
+        offsets = []
+        offset = data_start
+        for nbytes in chunk_nbytes:
+            offsets.append(offset)
+            offset = _align(offset + nbytes)
+        d = {'__version__': __version__,
+             'descr': np.lib.format.dtype_to_descr(dtype),
+             'shape': tuple(shape),
+             'chunks': tuple({'dim_data': _literal_dim_data(dim_data),
+                              'offset': offset}
+                             for (dim_data, offset) in
+                             zip(chunk_dim_data, offsets))}
+        header = _header_literal(d)
+        prefix_len = MAGIC_LEN + 4
+        needed = _align(prefix_len + len(header) + 1)
+        if needed <= data_start:
+            break
+        data_start = needed
+    header = header + ' ' * (data_start - prefix_len - len(header) - 1) + '\n'
+    header = asbytes(header)
+    return magic(2, 0) + struct.pack('<I', len(header)) + header, offsets
+
+
+def read_global_header(fp):
+    """Read the header of a version 2.0 file.
+
+    Returns the header dictionary; its "descr" is converted to a dtype.
+    """
+    import struct
+    version = read_magic(fp)
+    if version != (2, 0):
+        msg = "Expected version (2, 0) of the file format, not %r"
+        raise ValueError(msg % (version,))
+    hlength_str = _read_bytes(fp, 4, "Array header length")
+    header_length = struct.unpack('<I', hlength_str)[0]
+    header = _read_bytes(fp, header_length, "Array header")
+    d = _eval_header(header, ['__version__', 'chunks', 'descr', 'shape'])
+    d['descr'] = np.lib.format.descr_to_dtype(d['descr'])
+    return d
+
+
+def _global_indices(dim_data):
+    from distarray.localapi.maps import map_from_dim_dict
+    return [map_from_dim_dict(dd).global_indices for dd in dim_data]
+
+
+def chunk_byte_ranges(header, dim_data):
+    """Find the bytes of a version 2.0 file holding a local section.
+
+    Parameters
+    ----------
+    header : dict
+        As returned by `read_global_header`.
+    dim_data : tuple of dict
+        The section to load.
+
+    Returns
+    -------
+    starts, lengths : ndarray of int
+        The byte ranges to read, in increasing order of offset.
+    pieces : list of (shape, local_index)
+        For each chunk intersecting the section, in file order, the shape of
+        the data read from it and the index of the section where that data
+        goes.  The data of the pieces follow each other in the bytes read.
+    """
+    itemsize = header['descr'].itemsize
+    mine = _global_indices(dim_data)
+    starts, lengths, pieces = [], [], []
+    for chunk in header['chunks']:
+        theirs = _global_indices(chunk['dim_data'])
+        chunk_positions, local_positions = [], []
+        for m, t in zip(mine, theirs):
+            _, in_mine, in_theirs = np.intersect1d(m, t, assume_unique=True,
+                                                   return_indices=True)
+            order = np.argsort(in_theirs, kind='mergesort')
+            chunk_positions.append(in_theirs[order])
+            local_positions.append(in_mine[order])
+        if any(len(p) == 0 for p in chunk_positions):
+            continue
+        chunk_shape = tuple(len(t) for t in theirs)
+        s, l = block_byte_ranges(chunk_shape, chunk_positions,
+                                  chunk['offset'], itemsize)
+        starts.append(s)
+        lengths.append(l)
+        pieces.append((tuple(len(p) for p in chunk_positions),
+                       np.ix_(*local_positions) if local_positions else ()))
+    if not pieces:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, pieces
+    return _merge_ranges(np.concatenate(starts), np.concatenate(lengths)) + \
+        (pieces,)
+
+
+def block_byte_ranges(shape, positions, offset, itemsize):
+    """Return the byte ranges of the elements at `positions` (increasing
+    indices, one array per dimension) of a C-ordered array of `shape`
+    stored at `offset`.
+    """
+    if not shape:
+        return (np.array([offset], dtype=np.int64),
+                np.array([itemsize], dtype=np.int64))
+    if any(len(p) == 0 for p in positions):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    strides = [int(np.prod(shape[i + 1:])) for i in range(len(shape))]
+    last = np.asarray(positions[-1], dtype=np.int64)
+    breaks = np.flatnonzero(np.diff(last) != 1) + 1
+    run_starts = last[np.r_[0, breaks]]
+    run_lengths = np.diff(np.r_[0, breaks, len(last)])
+    lead = np.zeros(1, dtype=np.int64)
+    for p, stride in zip(positions[:-1], strides[:-1]):
+        lead = np.add.outer(lead, np.asarray(p, dtype=np.int64) * stride)
+        lead = lead.ravel()
+    starts = np.add.outer(lead, run_starts).ravel() * itemsize + offset
+    lengths = np.tile(run_lengths, len(lead)) * itemsize
+    return _merge_ranges(starts, lengths)
+
+
+def _merge_ranges(starts, lengths):
+    """Merge the byte ranges that follow each other."""
+    if len(starts) < 2:
+        return starts, lengths
+    new = np.r_[True, starts[1:] != starts[:-1] + lengths[:-1]]
+    idx = np.flatnonzero(new)
+    return starts[idx], np.add.reduceat(lengths, idx)
+
+
 # This is only copied from numpy/lib/format.py because importing it doesn't
 # work
 def _read_bytes(fp, size, error_template="ran out of data"):
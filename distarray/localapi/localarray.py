@@ -20,6 +20,7 @@ def mpi_print(*args, **kwargs):
 # ---------------------------------------------------------------------------
 # Imports
 # ---------------------------------------------------------------------------
+import warnings
 from collections import Mapping
 
 import numpy as np
@@ -29,8 +30,8 @@ from distarray.externals.six.moves import zip, reduce
 
 from distarray.metadata_utils import sanitize_indices, strides_from_shape, ndim_from_flat, condense
 
-from distarray.localapi.mpiutils import MPI
-from distarray.localapi import format, maps
+from distarray.localapi.mpiutils import MPI, SharedWindow
+from distarray.localapi import format, maps, backends
 from distarray.localapi.error import InvalidDimensionError, IncompatibleArrayError
 
 # ----------------------------------------------------------------------------
@@ -80,8 +81,38 @@ def make_local_slices(local_arr, glb_indices):
     slices = tuple(slice(*inds) for inds in glb_indices)
     return local_arr.local_from_global(slices)
 
+def _peer_ndarray(window, node_rank):
+    """Return the segment of `node_rank` in a LocalArray's shared `window`
+    as an ndarray, with the peer's maps.
+    """
+    dim_data, dtype = window.info[node_rank]
+    peer_maps = tuple(maps.map_from_dim_dict(dd) for dd in dim_data)
+    shape = tuple(m.size for m in peer_maps)
+    ndarray = np.ndarray(shape, dtype=dtype,
+                         buffer=window.peer_buffer(node_rank))
+    return ndarray, peer_maps
+
+
 def redistribute(comm, plan, la_from, la_to):
+    """Copy the data of `la_from` to `la_to` following `plan`.
+
+    If `la_from` is shared (see `LocalArray.is_shared`), processes on the
+    same node copy straight out of each other's segments instead of
+    sending messages.
+    """
     myrank = comm.Get_rank()
+    # `la_from` is None on processes that only receive
+    window = None
+    if la_from is not None and la_from.is_shared:
+        window = la_from.shared_window
+    if window is not None:
+        window.sync()
+        window.comm.Barrier()
+        window.sync()
+
+    def node_peer(rank):
+        return None if window is None else window.node_rank(comm, rank)
+
     for dta in plan:
         if dta['source_rank'] == dta['dest_rank'] == myrank:
             # simple local copy from `la_from` to `la_to`
@@ -89,6 +120,8 @@ def redistribute(comm, plan, la_from, la_to):
             slices_to = make_local_slices(la_to, dta['indices'])
             la_to.ndarray[slices_to] = la_from.ndarray[slices_from]
         elif dta['source_rank'] == myrank:
+            if node_peer(dta['dest_rank']) is not None:
+                continue  # the destination reads it from the window
             source_slices = make_local_slices(la_from, dta['indices'])
             sliced_ndarr = la_from.ndarray[source_slices]
             sliced_buffer = sliced_ndarr.ravel()
@@ -96,10 +129,59 @@ def redistribute(comm, plan, la_from, la_to):
         elif dta['dest_rank'] == myrank:
             dest_slices = make_local_slices(la_to, dta['indices'])
             sliced_ndarr = la_to.ndarray[dest_slices]
+            source = node_peer(dta['source_rank'])
+            if source is not None:
+                source_ndarr, source_maps = _peer_ndarray(window, source)
+                source_slices = tuple(
+                    m.local_from_global_slice(slice(*inds))
+                    for (m, inds) in zip(source_maps, dta['indices']))
+                sliced_ndarr[...] = source_ndarr[source_slices]
+                continue
             recv_buffer = np.empty_like(sliced_ndarr)
             comm.Recv(recv_buffer, source=dta['source_rank'])
             sliced_ndarr[...] = recv_buffer
 
+
+def node_gather(larr):
+    """Return the data of all processes sharing `larr`'s window.
+
+    `larr` must be shared (see `LocalArray.is_shared`).  Returns a list of
+    ``(global_indices, ndarray)`` pairs, one per process on this node,
+    where `global_indices` holds an integer array per dimension, so that
+    one process per node can serve a gather for its whole node.
+    """
+    if not larr.is_shared:
+        raise ValueError("node_gather needs a shared LocalArray.")
+    window = larr.shared_window
+    window.sync()
+    result = []
+    for node_rank in range(window.comm.Get_size()):
+        ndarray, peer_maps = _peer_ndarray(window, node_rank)
+        global_indices = tuple(m.global_indices for m in peer_maps)
+        result.append((global_indices, ndarray.copy()))
+    return result
+
+def global_block(larr, bounds):
+    """Return this process's part of a block of the global array.
+
+    `bounds` holds a ``(start, stop)`` pair per dimension.  Returns
+    ``(positions, ndarray)``, where `positions` holds an integer array per
+    dimension locating the elements of `ndarray` in the block, or None if
+    this process holds none of the block.
+    """
+    local_indices = []
+    positions = []
+    for global_indices, (start, stop) in zip(larr.distribution.global_indices,
+                                             bounds):
+        hits = np.flatnonzero((global_indices >= start) &
+                              (global_indices < stop))
+        if len(hits) == 0:
+            return None
+        local_indices.append(hits)
+        positions.append(global_indices[hits] - start)
+    return tuple(positions), larr.ndarray[np.ix_(*local_indices)]
+
+
 class GlobalIndex(object):
     """Object which provides access to global indexing on LocalArrays."""
     def __init__(self, distribution, ndarray):
@@ -119,6 +201,24 @@ class GlobalIndex(object):
         except IndexError:
             return None
 
+    def unchecked_getitem(self, global_inds):
+        """Get an element by a full tuple of non-negative integer global
+        indices, skipping index sanitizing.
+
+        See `Distribution.local_from_global_ints`.
+        """
+        local_inds = self.distribution.local_from_global_ints(global_inds)
+        return self.ndarray[local_inds]
+
+    def unchecked_setitem(self, global_inds, value):
+        """Set an element by a full tuple of non-negative integer global
+        indices, skipping index sanitizing.
+
+        See `Distribution.local_from_global_ints`.
+        """
+        local_inds = self.distribution.local_from_global_ints(global_inds)
+        self.ndarray[local_inds] = value
+
     def _local_from_global(self, global_ind):
         return self.distribution.local_from_global(global_ind)
 
@@ -164,12 +264,23 @@ class LocalArray(object):
     # Methods used for initialization
     #-------------------------------------------------------------------------
 
-    def __init__(self, distribution, dtype=None, buf=None):
+    def __init__(self, distribution, dtype=None, buf=None, shared=False,
+                 scratch=None):
         """Make a LocalArray from a `dim_data` tuple.
 
         Parameters
         ----------
         distribution : local._maps.Distribution object
+        shared : bool, optional
+            If True, and `buf` is None, allocate the buffer in an MPI-3
+            shared memory window so that the other processes on this node
+            can read it directly.  The window is freed by `free_shared`.
+        scratch : str, optional
+            A directory on this process's local disk.  If given, the array
+            is stored out of core: if `buf` is None, the buffer is a file in
+            `scratch` mapped in memory (see `backends.spill_memmap`), and
+            ufuncs and reductions stream through it in chunks, spilling
+            their results to `scratch` as well.
 
         Returns
         -------
@@ -178,12 +289,33 @@ class LocalArray(object):
             (uninitialized) LocalArray.
         """
         self.distribution = distribution
+        self.scratch = scratch
+        self._window = None
+        self._segment = None
 
         # create the buffer
-        if buf is None:
+        if buf is None and shared:
+            dtype = np.dtype(dtype)
+            self._window = SharedWindow(distribution.base_comm,
+                                        distribution.local_size * dtype.itemsize,
+                                        dtype.itemsize,
+                                        info=(distribution.dim_data, dtype.str))
+            self._segment = np.ndarray(self.local_shape, dtype=dtype,
+                                       buffer=self._window.peer_buffer(
+                                           self._window.rank))
+            self._ndarray = self._segment
+        elif buf is None and scratch is not None:
+            self._ndarray = backends.spill_memmap(scratch, self.local_shape,
+                                                  dtype)
+        elif buf is None:
             self._ndarray = np.empty(self.local_shape, dtype=dtype)
         else:
-            self._ndarray = np.asarray(buf, dtype=dtype)
+            if (isinstance(buf, np.memmap) and
+                    (dtype is None or np.dtype(dtype) == buf.dtype)):
+                # a file mapped in memory stays a memmap, with its filename
+                self._ndarray = buf
+            else:
+                self._ndarray = np.asarray(buf, dtype=dtype)
             if distribution.local_shape != self.ndarray.shape:
                 msg = "distribution shape must equal buf shape."
                 raise RuntimeError(msg)
@@ -197,6 +329,32 @@ class LocalArray(object):
         self.base = None  # mimic numpy.ndarray.base
         self.ctypes = None  # mimic numpy.ndarray.ctypes
 
+    @property
+    def is_shared(self):
+        """Whether `ndarray` is this process's segment of a shared memory
+        window (see `mpiutils.SharedWindow`).
+        """
+        return self._segment is not None and self._ndarray is self._segment
+
+    @property
+    def shared_window(self):
+        return self._window
+
+    @property
+    def is_out_of_core(self):
+        """Whether this array is stored in `scratch` (see `__init__`)."""
+        return self.scratch is not None
+
+    def free_shared(self):
+        """Release this array's reference to its shared memory window.
+
+        Collective over the processes on this node that hold the array; the
+        window is freed with its last reference.
+        """
+        if self._window is not None:
+            self._window.release()
+            self._window = self._segment = None
+
     @property
     def dim_data(self):
         return self.distribution.dim_data
@@ -389,9 +547,14 @@ class LocalArray(object):
         """Return a new LocalArray whose underlying `ndarray` is a view on
         `self.ndarray`.
         """
-        return self.__class__(distribution=distribution,
+        view = self.__class__(distribution=distribution,
                               dtype=dtype,
                               buf=self.local_view(dtype=dtype))
+        if self._window is not None:
+            # keep the window alive as long as the view
+            self._window.acquire()
+            view._window = self._window
+        return view
 
     def __array__(self, dtype=None):
         if dtype is None:
@@ -413,7 +576,10 @@ class LocalArray(object):
         return self.__class__(self.distribution, buf=obj)
 
     def fill(self, scalar):
-        self.ndarray.fill(scalar)
+        if self.is_out_of_core:
+            backends.StreamingBackend(self.scratch).fill(self.ndarray, scalar)
+        else:
+            self.ndarray.fill(scalar)
 
     def asdist_like(self, other):
         """
@@ -594,6 +760,47 @@ class LocalArray(object):
     def __rxor__(self, other):
         return self._rbinary_op_from_ufunc(other, bitwise_xor, '__xor__')
 
+    # Binary - in-place versions
+
+    def __iadd__(self, other):
+        return add(self, other, self)
+
+    def __isub__(self, other):
+        return subtract(self, other, self)
+
+    def __imul__(self, other):
+        return multiply(self, other, self)
+
+    def __idiv__(self, other):
+        return divide(self, other, self)
+
+    def __itruediv__(self, other):
+        return true_divide(self, other, self)
+
+    def __ifloordiv__(self, other):
+        return floor_divide(self, other, self)
+
+    def __imod__(self, other):
+        return mod(self, other, self)
+
+    def __ipow__(self, other, modulo=None):
+        return power(self, other, self)
+
+    def __ilshift__(self, other):
+        return left_shift(self, other, self)
+
+    def __irshift__(self, other):
+        return right_shift(self, other, self)
+
+    def __iand__(self, other):
+        return bitwise_and(self, other, self)
+
+    def __ior__(self, other):
+        return bitwise_or(self, other, self)
+
+    def __ixor__(self, other):
+        return bitwise_xor(self, other, self)
+
     # Unary
 
     def __neg__(self):
@@ -629,48 +836,63 @@ class LocalArray(object):
 # Creating arrays
 # ---------------------------------------------------------------------------
 
-def empty(distribution, dtype=float):
+def empty(distribution, dtype=float, shared=False, scratch=None):
     """Create an empty LocalArray."""
-    return LocalArray(distribution=distribution, dtype=dtype)
+    return LocalArray(distribution=distribution, dtype=dtype, shared=shared,
+                      scratch=scratch)
 
 
 def empty_like(arr, dtype=None):
-    """Create an empty LocalArray with a distribution like `arr`."""
+    """Create an empty LocalArray with a distribution like `arr`.
+
+    It is stored out of core if `arr` is.
+    """
     if isinstance(arr, LocalArray):
         if dtype is None:
-            return empty(distribution=arr.distribution, dtype=arr.dtype)
+            return empty(distribution=arr.distribution, dtype=arr.dtype,
+                         scratch=arr.scratch)
         else:
-            return empty(distribution=arr.distribution, dtype=dtype)
+            return empty(distribution=arr.distribution, dtype=dtype,
+                         scratch=arr.scratch)
     else:
         raise TypeError("A LocalArray or subclass is expected")
 
 
-def zeros(distribution, dtype=float):
+def zeros(distribution, dtype=float, shared=False, scratch=None):
     """Create a LocalArray filled with zeros."""
-    la = LocalArray(distribution=distribution, dtype=dtype)
-    la.fill(0)
+    la = LocalArray(distribution=distribution, dtype=dtype, shared=shared,
+                    scratch=scratch)
+    # a new scratch file already reads as zeros
+    if not la.is_out_of_core:
+        la.fill(0)
     return la
 
 
 def zeros_like(arr, dtype=float):
-    """Create a LocalArray of zeros with a distribution like `arr`."""
+    """Create a LocalArray of zeros with a distribution like `arr`.
+
+    It is stored out of core if `arr` is.
+    """
     if isinstance(arr, LocalArray):
         if dtype is None:
-            return zeros(distribution=arr.distribution, dtype=arr.dtype)
+            return zeros(distribution=arr.distribution, dtype=arr.dtype,
+                         scratch=arr.scratch)
         else:
-            return zeros(distribution=arr.distribution, dtype=dtype)
+            return zeros(distribution=arr.distribution, dtype=dtype,
+                         scratch=arr.scratch)
     else:
         raise TypeError("A LocalArray or subclass is expected")
 
 
-def ones(distribution, dtype=float):
+def ones(distribution, dtype=float, shared=False, scratch=None):
     """Create a LocalArray filled with ones."""
-    la = LocalArray(distribution=distribution, dtype=dtype)
+    la = LocalArray(distribution=distribution, dtype=dtype, shared=shared,
+                    scratch=scratch)
     la.fill(1)
     return la
 
 
-def save_dnpy(file, arr):
+def save_dnpy(file, arr, codec=None):
     """
     Save a LocalArray to a ``.dnpy`` file.
 
@@ -680,6 +902,10 @@ def save_dnpy(file, arr):
         The file or filename to which the data is to be saved.
     arr : LocalArray
         Array to save to a file.
+    codec : str, optional
+        Compress the data with this codec, e.g. 'zlib' or 'lzma' (see
+        `distarray.localapi.format.register_codec`).  `load_dnpy` detects
+        it.
 
     """
     own_fid = False
@@ -690,13 +916,13 @@ def save_dnpy(file, arr):
         fid = file
 
     try:
-        format.write_localarray(fid, arr)
+        format.write_localarray(fid, arr, codec=codec)
     finally:
         if own_fid:
             fid.close()
 
 
-def load_dnpy(comm, file):
+def load_dnpy(comm, file, mmap_mode=None):
     """
     Load a LocalArray from a ``.dnpy`` file.
 
@@ -704,6 +930,12 @@ def load_dnpy(comm, file):
     ----------
     file : file-like object or str
         The file to read.  It must support ``seek()`` and ``read()`` methods.
+    mmap_mode : {None, 'r+', 'r', 'c'}, optional
+        If not None, the LocalArray's buffer is a memory-map of the file,
+        opened with this mode (see `numpy.memmap`), so that only the header
+        is read now and the data is paged in as it is used.  `file` must
+        then be a filename or a real file object.  Compressed data is
+        always read in full.
 
     Returns
     -------
@@ -719,7 +951,7 @@ def load_dnpy(comm, file):
         fid = file
 
     try:
-        distbuffer = format.read_localarray(fid)
+        distbuffer = format.read_localarray(fid, mmap_mode=mmap_mode)
         return LocalArray.from_distarray(comm=comm, obj=distbuffer)
 
     finally:
@@ -727,6 +959,135 @@ def load_dnpy(comm, file):
             fid.close()
 
 
+def save_dnpy_collective(filename, arr):
+    """
+    Save a distributed array to a single version 2.0 ``.dnpy`` file.
+
+    This is collective: every process of `arr`'s communicator calls it
+    with the same `filename`, and writes its local data with MPI-IO.
+
+    Parameters
+    ----------
+    filename : str
+        The file to write.  It is truncated if it exists.
+    arr : LocalArray
+        This process's part of the array to save.
+
+    """
+    if arr.dtype.hasobject:
+        raise ValueError("Cannot save arrays of Python objects in a single "
+                         ".dnpy file.")
+    comm = arr.comm
+    distbuffer = arr.__distarray__()
+    data = np.ascontiguousarray(arr.ndarray)
+
+    chunk_dim_data = comm.gather(distbuffer['dim_data'], root=0)
+    chunk_nbytes = comm.gather(data.nbytes, root=0)
+    if comm.Get_rank() == 0:
+        header, offsets = format.global_header(distbuffer['__version__'],
+                                               arr.dtype, arr.global_shape,
+                                               chunk_dim_data, chunk_nbytes)
+    else:
+        header, offsets = None, None
+    offset = comm.scatter(offsets, root=0)
+
+    fh = MPI.File.Open(comm, filename, MPI.MODE_WRONLY | MPI.MODE_CREATE)
+    try:
+        fh.Set_size(0)
+        if comm.Get_rank() == 0:
+            fh.Write_at(0, header)
+        fh.Write_at_all(offset, data.reshape(-1).view(np.uint8))
+    finally:
+        fh.Close()
+
+
+def load_dnpy_collective(comm, filename, dim_data):
+    """
+    Load a LocalArray from a single version 2.0 ``.dnpy`` file.
+
+    This is collective over `comm`.  The file may have been written by any
+    number of processes with any distribution; each process reads just the
+    bytes of the section described by its `dim_data`.
+
+    Parameters
+    ----------
+    comm : MPI comm object
+    filename : str
+        The file to read.
+    dim_data : tuple of dict
+        A dict for each dimension, with the data described here:
+        https://github.com/enthought/distributed-array-protocol, describing
+        which portion of the file to load into this LocalArray.
+
+    Returns
+    -------
+    result : LocalArray
+        A LocalArray encapsulating the data loaded.
+
+    """
+    header, error = None, None
+    if comm.Get_rank() == 0:
+        try:
+            header = read_dnpy_header(filename)
+        except Exception as e:
+            error = e
+    header, error = comm.bcast((header, error), root=0)
+    if error is not None:
+        raise error
+
+    distribution = maps.Distribution(comm=comm, dim_data=dim_data)
+    if distribution.global_shape != tuple(header['shape']):
+        msg = "Distribution has shape %r, but the file holds shape %r."
+        raise ValueError(msg % (distribution.global_shape, header['shape']))
+    dtype = header['descr']
+    larr = LocalArray(distribution=distribution, dtype=dtype)
+
+    starts, lengths, pieces = format.chunk_byte_ranges(header, dim_data)
+    buf = np.empty(int(lengths.sum()), dtype=np.uint8)
+    fh = MPI.File.Open(comm, filename, MPI.MODE_RDONLY)
+    try:
+        _transfer_byte_ranges(fh, starts, lengths, buf, write=False)
+    finally:
+        fh.Close()
+
+    position = 0
+    for shape, index in pieces:
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        piece = buf[position:position + nbytes].view(dtype).reshape(shape)
+        larr.ndarray[index] = piece
+        position += nbytes
+    return larr
+
+
+def _transfer_byte_ranges(fh, starts, lengths, buf, write):
+    """Collectively read or write `buf` from or to the byte ranges given
+    by `starts` and `lengths` of the open MPI file `fh`.
+    """
+    if len(starts):
+        filetype = MPI.BYTE.Create_hindexed(lengths.tolist(), starts.tolist())
+        filetype.Commit()
+    else:
+        filetype = MPI.BYTE
+    try:
+        fh.Set_view(0, MPI.BYTE, filetype)
+        if write:
+            fh.Write_all(buf)
+        else:
+            fh.Read_all(buf)
+    finally:
+        if filetype != MPI.BYTE:
+            filetype.Free()
+
+
+def read_dnpy_header(filename):
+    """Return the global header of a single version 2.0 ``.dnpy`` file.
+
+    See `distarray.localapi.format.read_global_header`.
+    """
+    with open(filename, 'rb') as fp:
+        return format.read_global_header(fp)
+
+
 def save_hdf5(filename, arr, key='buffer', mode='a'):
     """
     Save a LocalArray to a dataset in an ``.hdf5`` file.
@@ -761,11 +1122,79 @@ def save_hdf5(filename, arr, key='buffer', mode='a'):
         dset = fp.create_dataset(key, arr.global_shape, dtype=arr.dtype)
         try:
             gslice = arr.distribution.global_slice
-            dset[gslice] = arr
         except AttributeError:
-            # can't represent index with a slice; do it the slow way
-            for index, value in ndenumerate(arr):
-                dset[index] = value
+            # can't represent index with a slice; select hyperslabs
+            _write_hyperslabs(dset, arr)
+        else:
+            with dset.collective:
+                dset[gslice] = arr.ndarray
+
+
+def _index_runs(indices):
+    """Return the starts and lengths of the runs of consecutive values in
+    the increasing array `indices`.
+    """
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = indices[np.r_[0, breaks]]
+    lengths = np.diff(np.r_[0, breaks, len(indices)])
+    return starts, lengths
+
+
+def _hyperslab_patterns(indices):
+    """Cover the increasing array `indices` with HDF5 hyperslab patterns.
+
+    Returns a list of ``(start, stride, count, block)`` tuples.  Regularly
+    spaced runs of the same length, as in cyclic and block-cyclic maps,
+    share a single pattern.
+    """
+    if len(indices) == 0:
+        return []
+    starts, lengths = _index_runs(indices)
+    patterns = []
+    i = 0
+    while i < len(starts):
+        j = i + 1
+        stride = lengths[i]
+        if j < len(starts) and lengths[j] == lengths[i]:
+            stride = starts[j] - starts[i]
+            while (j < len(starts) and lengths[j] == lengths[i] and
+                   starts[j] - starts[j - 1] == stride):
+                j += 1
+        patterns.append((int(starts[i]), int(stride), j - i, int(lengths[i])))
+        i = j
+    return patterns
+
+
+def _write_hyperslabs(dset, arr):
+    """Write `arr` into `dset` with one collective MPI-IO transfer.
+
+    The file selection is the union of the products of each dimension's
+    hyperslab patterns; HDF5 fills it in row-major order of the file
+    indices, so the local data is first sorted by global index.
+    """
+    from itertools import product
+    from h5py import h5s, h5p, h5fd
+
+    global_indices = arr.distribution.global_indices
+    orders = [np.argsort(gi, kind='mergesort') for gi in global_indices]
+    buf = np.ascontiguousarray(arr.ndarray[np.ix_(*orders)])
+
+    fspace = dset.id.get_space()
+    fspace.select_none()
+    mspace = h5s.create_simple(buf.shape)
+    if buf.size == 0:
+        mspace.select_none()
+    else:
+        patterns = [_hyperslab_patterns(gi[order])
+                    for (gi, order) in zip(global_indices, orders)]
+        for slab in product(*patterns):
+            start, stride, count, block = zip(*slab)
+            fspace.select_hyperslab(start, count, stride, block,
+                                    op=h5s.SELECT_OR)
+
+    dxpl = h5p.create(h5p.DATASET_XFER)
+    dxpl.set_dxpl_mpio(h5fd.MPIO_COLLECTIVE)
+    dset.id.write(mspace, fspace, buf, dxpl=dxpl)
 
 
 def compact_indices(dim_data):
@@ -773,7 +1202,7 @@ def compact_indices(dim_data):
 
     For every dimension in `dim_data`, return a representation of the indices
     indicated by that dim_dict; return a slice if possible, else, return the
-    list of global indices.
+    array of global indices.
 
     Parameters
     ----------
@@ -784,7 +1213,7 @@ def compact_indices(dim_data):
 
     Returns
     -------
-    index : tuple of slices and/or lists of int
+    index : tuple of slices and/or arrays of int
         Efficient structure usable for indexing into a numpy-array-like data
         structure.
     """
@@ -798,10 +1227,10 @@ def compact_indices(dim_data):
         if ('block_size' not in dd) or (dd['block_size'] == 1):
             return slice(dd['start'], None, dd['proc_grid_size'])
         else:
-            return list(maps.map_from_dim_dict(dd).global_iter)
+            return maps.map_from_dim_dict(dd).global_indices
 
     def unstructured_index(dd):
-        return list(maps.map_from_dim_dict(dd).global_iter)
+        return maps.map_from_dim_dict(dd).global_indices
 
     index_fn_map = {'n': nodist_index,
                     'b': block_index,
@@ -865,7 +1294,23 @@ def load_hdf5(comm, filename, dim_data, key='buffer'):
     return LocalArray(distribution=distribution, dtype=dtype, buf=buf)
 
 
-def load_npy(comm, filename, dim_data):
+def _chunk_index(index, shape, chunk):
+    """Restrict `index`, indexing an array of `shape`, to the rows `chunk`
+    (a slice, or Ellipsis for all) of the indexed result.
+    """
+    if chunk is Ellipsis:
+        return index
+    first = index[0]
+    if isinstance(first, slice):
+        start, _, step = first.indices(shape[0])
+        first = slice(start + chunk.start * step, start + chunk.stop * step,
+                      step)
+    else:
+        first = first[chunk]
+    return (first,) + tuple(index[1:])
+
+
+def load_npy(comm, filename, dim_data, mmap_mode=None, scratch=None):
     """
     Load a LocalArray from a ``.npy`` file.
 
@@ -879,6 +1324,15 @@ def load_npy(comm, filename, dim_data):
         which portions of the HDF5 file to load into this LocalArray, and with
         what metadata.
     comm : MPI comm object
+    mmap_mode : {None, 'r', 'c'}, optional
+        If not None, and this LocalArray's section of the file is contiguous
+        (as for a block distribution of the first dimension), its buffer is
+        a view of the file memory-mapped with this mode (see
+        `numpy.memmap`), and no data is copied.  Other sections are copied.
+    scratch : str, optional
+        If given, copy this LocalArray's section into a file in this
+        directory, in chunks, and store the LocalArray out of core there
+        (see `LocalArray.__init__`).  `mmap_mode` is then ignored.
 
     Returns
     -------
@@ -888,8 +1342,21 @@ def load_npy(comm, filename, dim_data):
     """
     #TODO: validate dim_data somehow
     index = compact_indices(dim_data)
-    data = np.load(filename, mmap_mode='r')
-    buf = data[index].copy()
+    data = np.load(filename, mmap_mode=mmap_mode or 'r')
+    if scratch is not None:
+        distribution = maps.Distribution(comm=comm, dim_data=dim_data)
+        buf = backends.spill_memmap(scratch, distribution.local_shape,
+                                    data.dtype)
+        backend = backends.StreamingBackend(scratch)
+        for chunk in backend.row_chunks(buf.shape, buf.itemsize):
+            buf[chunk] = data[_chunk_index(index, data.shape, chunk)]
+            backends.release_pages(buf)
+            backends.release_pages(data)
+        return LocalArray(distribution=distribution, dtype=data.dtype,
+                          buf=buf, scratch=scratch)
+    buf = data[index]
+    if mmap_mode is None or not buf.flags.c_contiguous:
+        buf = np.array(buf)
 
     # Apparently there isn't a clean way to close a numpy memmap; it is closed
     # when the object is garbage-collected.  This stackoverflow question claims
@@ -901,17 +1368,65 @@ def load_npy(comm, filename, dim_data):
     return LocalArray(distribution=distribution, dtype=data.dtype, buf=buf)
 
 
+def save_npy(filename, arr):
+    """
+    Save a distributed array to a ``.npy`` file.
+
+    This is collective: every process of `arr`'s communicator calls it with
+    the same `filename`.  The file is sized for the whole array, then each
+    process writes its elements at their offsets with MPI-IO.
+
+    Parameters
+    ----------
+    filename : str
+        The file to write.  It is overwritten if it exists.
+    arr : LocalArray
+        This process's part of the array to save.
+
+    """
+    if arr.dtype.hasobject:
+        raise ValueError("Cannot save arrays of Python objects in parallel.")
+    header = six.BytesIO()
+    format.write_npy_header(header, arr.dtype, arr.global_shape)
+    header = header.getvalue()
+
+    # The file holds the elements in C order of their global indices.
+    global_indices = arr.distribution.global_indices
+    orders = [np.argsort(gi, kind='mergesort') for gi in global_indices]
+    buf = np.ascontiguousarray(arr.ndarray[np.ix_(*orders)])
+    starts, lengths = format.block_byte_ranges(
+        arr.global_shape, [gi[order] for (gi, order) in
+                           zip(global_indices, orders)],
+        len(header), arr.itemsize)
+
+    comm = arr.comm
+    fh = MPI.File.Open(comm, filename, MPI.MODE_WRONLY | MPI.MODE_CREATE)
+    try:
+        fh.Set_size(len(header) + arr.global_size * arr.itemsize)
+        if comm.Get_rank() == 0:
+            fh.Write_at(0, header)
+        _transfer_byte_ranges(fh, starts, lengths,
+                              buf.reshape(-1).view(np.uint8), write=True)
+    finally:
+        fh.Close()
+
+
 class GlobalIterator(six.Iterator):
     def __init__(self, arr):
         self.arr = arr
         self.nditerator = np.ndenumerate(self.arr.local_view())
+        # Translate through per-dimension lookup lists rather than asking the
+        # maps for each element.
+        self.global_indices = [idx.tolist() for idx in
+                               arr.distribution.global_indices]
 
     def __iter__(self):
         return self
 
     def __next__(self):
         local_inds, value = six.advance_iterator(self.nditerator)
-        global_inds = self.arr.global_from_local(local_inds)
+        global_inds = tuple(gi[li] for gi, li in zip(self.global_indices,
+                                                     local_inds))
         return global_inds, value
 
 
@@ -919,11 +1434,71 @@ def ndenumerate(arr):
     return GlobalIterator(arr)
 
 
+def _fromfunction_vectorized(function, local_view, distribution, dtype,
+                             kwargs):
+    """Fill `local_view` with one call to `function`.
+
+    As with `numpy.fromfunction`, `function` receives one index array per
+    dimension, of type `dtype`; here they are open grids that broadcast to
+    the local shape.  The result must have the shape the grids broadcast
+    to, or one that broadcasts to it along the same dimensions; anything
+    else (such as a scalar) raises ValueError.
+    """
+    grids = np.ix_(*distribution.global_indices)
+    grids = [grid.astype(dtype) for grid in grids]
+    result = np.asarray(function(*grids, **kwargs))
+    shape = local_view.shape
+    if (result.ndim != len(shape) or
+            any(r not in (1, s) for (r, s) in zip(result.shape, shape))):
+        msg = ("Vectorized fromfunction result of shape %r does not "
+               "broadcast from the index grids' shape %r.")
+        raise ValueError(msg % (result.shape, shape))
+    local_view[...] = result
+
+
 def fromfunction(function, distribution, **kwargs):
+    """Create a LocalArray by calling `function` with global indices.
+
+    Parameters
+    ----------
+    function : callable
+        Called with ``ndim`` global index arguments.
+    distribution : Distribution
+    dtype : data-type, optional
+        Data type of the result (the default is float).
+    vectorized : bool or None, optional
+        If True, call `function` once with broadcastable arrays of the
+        local global indices, like `numpy.fromfunction`.  If False (the
+        default), call it once per element with integer indices.  If None,
+        try the vectorized call and, if it raises TypeError or ValueError
+        (including for a result of the wrong shape), warn and fall back to
+        per-element calls.  `function` is then called again for every
+        element, so it should be free of side effects.
+
+    Any remaining keyword arguments are passed on to `function`.
+    """
     dtype = kwargs.pop('dtype', float)
+    vectorized = kwargs.pop('vectorized', False)
     da = empty(distribution=distribution, dtype=dtype)
-    for global_inds, x in ndenumerate(da):
-        da.global_index[global_inds] = function(*global_inds, **kwargs)
+    local_view = da.local_view()
+    if vectorized:
+        _fromfunction_vectorized(function, local_view, distribution, dtype,
+                                 kwargs)
+        return da
+    elif vectorized is None:
+        try:
+            _fromfunction_vectorized(function, local_view, distribution,
+                                     dtype, kwargs)
+            return da
+        except (TypeError, ValueError) as err:
+            msg = ("Vectorized fromfunction failed (%s); calling the "
+                   "function once per element instead.")
+            warnings.warn(msg % (err,), RuntimeWarning)
+    global_indices = [idx.tolist() for idx in distribution.global_indices]
+    for local_inds in np.ndindex(*local_view.shape):
+        global_inds = tuple(gi[li] for gi, li in zip(global_indices,
+                                                     local_inds))
+        local_view[local_inds] = function(*global_inds, **kwargs)
     return da
 
 
@@ -1027,8 +1602,8 @@ def min_reducer(reduce_comm, larr, out, axes, dtype):
     if larr.ndarray.dtype == np.bool:
         larr.ndarray.dtype = np.uint8
     return _basic_reducer(reduce_comm, MPI.MIN,
-                          larr.ndarray.min,
-                          (), {'axis': axes}, out)
+                          _backend_for(larr).reduce,
+                          (np.minimum, larr.ndarray, axes), {}, out)
 
 
 def max_reducer(reduce_comm, larr, out, axes, dtype):
@@ -1036,8 +1611,8 @@ def max_reducer(reduce_comm, larr, out, axes, dtype):
     if larr.ndarray.dtype == np.bool:
         larr.ndarray.dtype = np.uint8
     return _basic_reducer(reduce_comm, MPI.MAX,
-                          larr.ndarray.max,
-                          (), {'axis': axes}, out)
+                          _backend_for(larr).reduce,
+                          (np.maximum, larr.ndarray, axes), {}, out)
 
 
 def sum_reducer(reduce_comm, larr, out, axes, dtype):
@@ -1045,8 +1620,8 @@ def sum_reducer(reduce_comm, larr, out, axes, dtype):
     if larr.ndarray.dtype == np.bool:
         larr.ndarray.dtype = np.uint8
     return _basic_reducer(reduce_comm, MPI.SUM,
-                          larr.ndarray.sum,
-                          (), {'axis': axes, 'dtype': dtype}, out)
+                          _backend_for(larr).reduce,
+                          (np.add, larr.ndarray, axes), {'dtype': dtype}, out)
 
 
 def mean_reducer(reduce_comm, larr, out, axes, dtype):
@@ -1076,7 +1651,9 @@ def var_reducer(reduce_comm, larr, out, axes, dtype):
     mean.ndarray.shape = mean_shape
 
     # Do the variance calculation.
-    temp.ndarray[...] = (larr.ndarray - mean.ndarray) ** 2
+    backend = _backend_for(larr)
+    backend.ufunc(np.subtract, (larr.ndarray, mean.ndarray), out=temp.ndarray)
+    backend.ufunc(np.square, (temp.ndarray,), out=temp.ndarray)
 
     # Get the mean reduction of temp's data.
     mean_reducer(reduce_comm, temp, out, axes, dtype)
@@ -1090,6 +1667,52 @@ def std_reducer(reduce_comm, larr, out, axes, dtype):
         np.sqrt(out.ndarray, out=out.ndarray)
     return out
 
+def ufunc_reducer(ufunc_name, reduce_comm, larr, out, axes, dtype):
+    """ Core reduction function for `ufunc.reduce` of a binary ufunc.
+
+    Each rank reduces its local section, and the root of `reduce_comm`
+    combines the partial results in rank order.  Only valid for
+    associative and commutative ufuncs, since the local sections of a
+    cyclic axis interleave.
+    """
+    ufunc = getattr(np, ufunc_name)
+    local_reduce = np.asarray(_backend_for(larr).reduce(
+        ufunc, larr.ndarray, axes, dtype=dtype))
+    partials = reduce_comm.gather(local_reduce, root=0)
+    if out is not None:
+        out.ndarray[...] = ufunc.reduce(np.array(partials), axis=0,
+                                        dtype=dtype)
+    return out
+
+
+def ufunc_accumulate(ufunc_name, larr, axis, dtype):
+    """ Local part of `ufunc.accumulate` along `axis`.
+
+    `axis` must be block distributed (or not distributed).  Each rank
+    accumulates its local section and then combines it with the reduction
+    of the last elements of the preceding sections.  Only valid for
+    associative ufuncs.
+    """
+    ufunc = getattr(np, ufunc_name)
+    result = ufunc.accumulate(larr.ndarray, axis=axis, dtype=dtype)
+
+    remaining_dims = [False] * larr.ndim
+    remaining_dims[axis] = True
+    line_comm = larr.comm.Sub(remaining_dims)
+    if result.shape[axis]:
+        last = result.take([-1], axis=axis)
+    else:
+        last = None
+    lasts = line_comm.allgather(last)[:line_comm.Get_rank()]
+    lasts = [l for l in lasts if l is not None]
+    line_comm.Free()
+    if lasts:
+        prefix = ufunc.reduce(np.concatenate(lasts, axis=axis), axis=axis,
+                              dtype=dtype, keepdims=True)
+        ufunc(prefix, result, out=result)
+    return LocalArray(larr.distribution, buf=result)
+
+
 # ---------------------------------------------------------------------------
 # More data type functions
 # ---------------------------------------------------------------------------
@@ -1137,6 +1760,250 @@ def _are_shapes_bcast(shape, target_shape):
     return True
 
 
+def _is_bcast_to(shape, target_shape):
+    """Can an array of `shape` be broadcast to `target_shape`?"""
+    if len(shape) > len(target_shape):
+        return False
+    shape, target_shape = _prepend_ones(tuple(shape), tuple(target_shape))
+    return _are_shapes_bcast(shape, target_shape)
+
+
+def _global_index_arrays(dim_data):
+    """Return an integer array of global indices for each dimension."""
+    return [maps.map_from_dim_dict(dd).global_indices for dd in dim_data]
+
+
+def _local_positions(larr, indices, outer):
+    """Find the global integer-array `indices` that are local to `larr`.
+
+    See `take_global`.  Returns the positions of the local elements in the
+    (flattened) selection, and a local index selecting them in
+    `larr.ndarray`.
+    """
+    local, valid = larr.distribution.local_from_global_arrays(
+        [idx.ravel() for idx in indices])
+    if outer:
+        positions = [np.flatnonzero(v) for v in valid]
+        local = [lidx[p] for (lidx, p) in zip(local, positions)]
+        return tuple(positions), np.ix_(*local)
+    else:
+        owned = np.ones(indices[0].size, dtype=bool)
+        for v in valid:
+            owned &= v
+        positions = np.flatnonzero(owned)
+        return positions, tuple(lidx[positions] for lidx in local)
+
+
+def take_global(larr, indices, outer=False):
+    """Select the elements at global integer-array `indices` held by `larr`.
+
+    Parameters
+    ----------
+    larr : LocalArray
+    indices : tuple of integer arrays
+        One index array per dimension, as sanitized by
+        `distarray.metadata_utils.sanitize_fancy_indices`.
+    outer : bool, optional
+        If True, the index arrays select along each dimension independently
+        (like `np.ix_`); otherwise they give the coordinates of single
+        elements.
+
+    Returns
+    -------
+    positions : integer array or tuple of integer arrays
+        Where the local elements go in the flattened selection (per
+        dimension if `outer`).
+    values : ndarray
+        The local elements.
+    """
+    positions, local = _local_positions(larr, indices, outer)
+    return positions, larr.ndarray[local]
+
+
+def put_global(larr, indices, values, outer=False):
+    """Set the elements at global integer-array `indices` held by `larr`.
+
+    `values` must have the shape of the (flattened) selection; see
+    `take_global`.
+    """
+    positions, local = _local_positions(larr, indices, outer)
+    if outer:
+        larr.ndarray[local] = values[np.ix_(*positions)]
+    else:
+        larr.ndarray[local] = values[positions]
+
+
+def broadcast_operand(operand, larr):
+    """Return the section of a global `operand` that lines up with `larr`.
+
+    Parameters
+    ----------
+    operand : array_like
+        An array that can be broadcast to `larr.global_shape` according to
+        the NumPy broadcasting rules.
+    larr : LocalArray
+
+    Returns
+    -------
+    ndarray
+        An ndarray with `larr.ndim` dimensions that can be broadcast to
+        `larr.local_shape`.  Dimensions of `operand` with length one are
+        kept as is; all other dimensions are selected by the global indices
+        owned by `larr`.
+
+    Raises
+    ------
+    IncompatibleArrayError
+        If `operand` cannot be broadcast to `larr.global_shape`.
+    """
+    operand = np.asarray(operand)
+    if not _is_bcast_to(operand.shape, larr.global_shape):
+        msg = "Shape %r cannot be broadcast to %r."
+        raise IncompatibleArrayError(msg % (operand.shape, larr.global_shape))
+    shape, _ = _prepend_ones(operand.shape, larr.global_shape)
+    operand = operand.reshape(shape)
+    index = [np.zeros(1, dtype=int) if size == 1 else idx for (size, idx) in
+             zip(shape, _global_index_arrays(larr.dim_data))]
+    return operand[np.ix_(*index)]
+
+
+def _broadcast_needs(operand_shape, dim_data):
+    """Global indices of an operand of `operand_shape` needed to line it up
+    with the LocalArray described by `dim_data`, one array per dimension of
+    the operand.
+    """
+    offset = len(dim_data) - len(operand_shape)
+    needs = []
+    for axis, size in enumerate(operand_shape):
+        if size == 1:
+            needs.append(np.zeros(1, dtype=int))
+        else:
+            dd = dim_data[axis + offset]
+            needs.append(maps.map_from_dim_dict(dd).global_indices)
+    return needs
+
+
+def _outer_intersection(have, need):
+    """Per dimension, the positions in `have` and in `need` of the global
+    indices common to both.
+    """
+    common = [np.intersect1d(h, n, assume_unique=True, return_indices=True)
+              for h, n in zip(have, need)]
+    return [c[1] for c in common], [c[2] for c in common]
+
+
+def gather_broadcast_operand(comm, larr, template):
+    """Collect the section of a distributed operand that lines up with
+    `template`.
+
+    This is the DistArray analog of `broadcast_operand`: `larr` is this
+    rank's section of an operand that broadcasts to the global shape of the
+    `template` LocalArrays.  Each rank receives, from the ranks that own
+    them, only the operand elements its `template` section needs, in a
+    single `Alltoallv`.
+
+    This is a collective operation on `comm`, which must include every rank
+    that holds a section of either array.  Ranks without a section of one
+    or the other pass None for it.
+
+    Returns
+    -------
+    ndarray or None
+        An ndarray that can be broadcast to `template.local_shape`, or None
+        on ranks without a `template` section.
+    """
+    mine = (None if larr is None else (larr.dim_data, larr.dtype.str),
+            None if template is None else template.dim_data)
+    everyone = comm.allgather(mine)
+    dim_data, dtype = next(m[0] for m in everyone if m[0] is not None)
+    dtype = np.dtype(dtype)
+    operand_shape = tuple(dd['size'] for dd in dim_data)
+
+    needs = [None if m[1] is None else _broadcast_needs(operand_shape, m[1])
+             for m in everyone]
+    haves = [None if m[0] is None else _global_index_arrays(m[0][0])
+             for m in everyone]
+
+    # Pack the pieces this rank owns for every rank that needs them.
+    send_parts = []
+    for need in needs:
+        if larr is None or need is None:
+            send_parts.append(np.empty(0, dtype=dtype))
+        else:
+            mine_idx, _ = _outer_intersection(haves[comm.Get_rank()], need)
+            send_parts.append(larr.ndarray[np.ix_(*mine_idx)].ravel())
+
+    # Work out where the pieces from every rank go.
+    my_need = needs[comm.Get_rank()]
+    recv_places = []
+    for have in haves:
+        if have is None or my_need is None:
+            recv_places.append(None)
+        else:
+            recv_places.append(_outer_intersection(have, my_need)[1])
+
+    def counts_displs(sizes):
+        counts = [size * dtype.itemsize for size in sizes]
+        displs = [0] * len(counts)
+        for i in range(1, len(counts)):
+            displs[i] = displs[i - 1] + counts[i - 1]
+        return counts, displs
+
+    send_counts, send_displs = counts_displs([p.size for p in send_parts])
+    recv_sizes = [0 if places is None else
+                  int(np.prod([len(p) for p in places]))
+                  for places in recv_places]
+    recv_counts, recv_displs = counts_displs(recv_sizes)
+
+    sendbuf = np.concatenate(send_parts) if send_parts else \
+        np.empty(0, dtype=dtype)
+    recvbuf = np.empty(sum(recv_sizes), dtype=dtype)
+    comm.Alltoallv([sendbuf.view(np.uint8),
+                    (send_counts, send_displs), MPI.BYTE],
+                   [recvbuf.view(np.uint8),
+                    (recv_counts, recv_displs), MPI.BYTE])
+
+    if template is None:
+        return None
+    result = np.empty(tuple(len(n) for n in my_need), dtype=dtype)
+    start = 0
+    for places, size in zip(recv_places, recv_sizes):
+        if places is not None and size:
+            piece = recvbuf[start:start + size]
+            result[np.ix_(*places)] = piece.reshape([len(p) for p in places])
+        start += size
+    return result
+
+
+def _as_operand(x):
+    """Return the ndarray of a LocalArray, or `x` itself."""
+    return x.ndarray if isinstance(x, LocalArray) else x
+
+
+def _wrap_result(like, result, backend):
+    """Make LocalArrays distributed like `like` from a ufunc's result(s),
+    stored out of core if `backend` streams.
+    """
+    scratch = getattr(backend, 'scratch', None)
+
+    def wrap(r):
+        return like.__class__(like.distribution, buf=r, scratch=scratch)
+
+    if isinstance(result, tuple):
+        return tuple(wrap(r) for r in result)
+    return wrap(result)
+
+
+def _backend_for(*arrays):
+    """Return a `backends.StreamingBackend` if one of `arrays` is an
+    out-of-core LocalArray, else the active backend.
+    """
+    for arr in arrays:
+        if isinstance(arr, LocalArray) and arr.is_out_of_core:
+            return backends.StreamingBackend(arr.scratch)
+    return backends.get_backend()
+
+
 class LocalArrayUnaryOperation(object):
     def __init__(self, numpy_ufunc):
         self.func = numpy_ufunc
@@ -1149,13 +2016,18 @@ class LocalArrayUnaryOperation(object):
         y_isdla = isinstance(y, LocalArray)
         assert x1_isdla or isscalar(x1), "Invalid type for unary ufunc"
         assert y is None or y_isdla, "Invalid return array type"
+        backend = _backend_for(x1, y)
         if y is None:
-            return self.func(x1, *args, **kwargs)
+            if not x1_isdla:
+                return self.func(x1, *args, **kwargs)
+            result = backend.ufunc(self.func, (x1.ndarray,), args, kwargs)
+            return _wrap_result(x1, result, backend)
         elif y_isdla:
             if x1_isdla:
                 if not arecompatible(x1, y):
                     raise IncompatibleArrayError("Incompatible LocalArrays")
-            self.func(x1, y.ndarray, *args, **kwargs)
+            backend.ufunc(self.func, (_as_operand(x1),), args, kwargs,
+                          out=y.ndarray)
             return y
         else:
             raise TypeError("Invalid return type for unary ufunc")
@@ -1175,14 +2047,28 @@ class LocalArrayBinaryOperation(object):
         x1_isdla = isinstance(x1, LocalArray)
         x2_isdla = isinstance(x2, LocalArray)
         y_isdla = isinstance(y, LocalArray)
-        assert x1_isdla or isscalar(x1), "Invalid type for binary ufunc"
-        assert x2_isdla or isscalar(x2), "Invalid type for binary ufunc"
+        # An ndarray operand is allowed if it broadcasts to the local shape of
+        # a LocalArray operand (or of `y`); see `broadcast_operand`.
+        local_shapes = [x.local_shape for x in (x1, x2, y)
+                        if isinstance(x, LocalArray)]
+        for x in (x1, x2):
+            if isinstance(x, np.ndarray) and local_shapes:
+                if not _is_bcast_to(x.shape, local_shapes[0]):
+                    raise IncompatibleArrayError("Operand not broadcastable")
+            else:
+                assert (isinstance(x, LocalArray) or
+                        isscalar(x)), "Invalid type for binary ufunc"
         assert y is None or y_isdla
+        backend = _backend_for(x1, x2, y)
+        operands = (_as_operand(x1), _as_operand(x2))
         if y is None:
             if x1_isdla and x2_isdla:
                 if not arecompatible(x1, x2):
                     raise IncompatibleArrayError("Incompatible DistArrays")
-            return self.func(x1, x2, *args, **kwargs)
+            if not (x1_isdla or x2_isdla):
+                return self.func(x1, x2, *args, **kwargs)
+            result = backend.ufunc(self.func, operands, args, kwargs)
+            return _wrap_result(x1 if x1_isdla else x2, result, backend)
         elif y_isdla:
             if x1_isdla:
                 if not arecompatible(x1, y):
@@ -1191,7 +2077,7 @@ class LocalArrayBinaryOperation(object):
                 if not arecompatible(x2, y):
                     raise IncompatibleArrayError("Incompatible LocalArrays")
             kwargs.pop('y', None)
-            self.func(x1, x2, y.ndarray, *args, **kwargs)
+            backend.ufunc(self.func, operands, args, kwargs, out=y.ndarray)
             return y
         else:
             raise TypeError("Invalid return type for unary ufunc")
@@ -1221,16 +2107,44 @@ def _add_operations(wrapper, ops):
 
 # numpy unary operations to wrap
 _unary_ops = ('absolute', 'arccos', 'arccosh', 'arcsin', 'arcsinh', 'arctan',
-              'arctanh', 'conjugate', 'cos', 'cosh', 'exp', 'expm1', 'invert',
-              'log', 'log10', 'log1p', 'negative', 'reciprocal', 'rint',
-              'sign', 'sin', 'sinh', 'sqrt', 'square', 'tan', 'tanh')
+              'arctanh', 'ceil', 'conjugate', 'cos', 'cosh', 'exp', 'expm1',
+              'fabs', 'floor', 'invert', 'isfinite', 'isinf', 'isnan', 'log',
+              'log10', 'log1p', 'logical_not', 'negative', 'reciprocal',
+              'rint', 'sign', 'sin', 'sinh', 'sqrt', 'square', 'tan', 'tanh',
+              'trunc')
 
 # numpy binary operations to wrap
 _binary_ops = ('add', 'arctan2', 'bitwise_and', 'bitwise_or', 'bitwise_xor',
-               'divide', 'floor_divide', 'fmod', 'hypot', 'left_shift', 'mod',
-               'multiply', 'power', 'remainder', 'right_shift', 'subtract',
-               'true_divide', 'less', 'less_equal', 'equal', 'not_equal',
-               'greater', 'greater_equal',)
+               'divide', 'floor_divide', 'fmax', 'fmin', 'fmod', 'hypot',
+               'left_shift', 'logical_and', 'logical_or', 'logical_xor',
+               'maximum', 'minimum', 'mod', 'multiply', 'power', 'remainder',
+               'right_shift', 'subtract', 'true_divide', 'less', 'less_equal',
+               'equal', 'not_equal', 'greater', 'greater_equal',)
 
 _add_operations(LocalArrayUnaryOperation, _unary_ops)
 _add_operations(LocalArrayBinaryOperation, _binary_ops)
+
+
+def local_ufunc(name):
+    """Return the LocalArray version of the numpy ufunc called `name`.
+
+    The ufuncs wrapped above are returned as is; any other numpy ufunc is
+    wrapped on first use and cached in this module's namespace.
+    """
+    names = globals()
+    fn_value = names.get(name)
+    if isinstance(fn_value, (LocalArrayUnaryOperation,
+                             LocalArrayBinaryOperation)):
+        return fn_value
+    ufunc = getattr(np, name, None)
+    if (not isinstance(ufunc, np.ufunc) or ufunc.nout != 1 or
+            ufunc.signature is not None):
+        raise TypeError("%r is not a supported numpy ufunc" % (name,))
+    if ufunc.nin == 1:
+        fn_value = LocalArrayUnaryOperation(ufunc)
+    elif ufunc.nin == 2:
+        fn_value = LocalArrayBinaryOperation(ufunc)
+    else:
+        raise TypeError("%r is not a supported numpy ufunc" % (name,))
+    names[name] = fn_value
+    return fn_value
@@ -21,6 +21,7 @@ allow more compact and efficient operations.
 from __future__ import division
 
 import operator
+import weakref
 from functools import reduce
 from numbers import Integral
 
@@ -48,11 +49,18 @@ class Distribution(object):
         """Create a Distribution from a `dim_data` structure."""
         self._maps = tuple(map_from_dim_dict(dim_dict) for dim_dict in dim_data)
         self.base_comm = construct.init_base_comm(comm)
-        self.comm = construct.init_comm(self.base_comm, self.grid_shape)
+        grid_coords = tuple(m.grid_rank for m in self._maps)
+        self.comm = construct.init_comm(self.base_comm, self.grid_shape,
+                                        grid_coords)
 
     @classmethod
-    def from_shape(cls, comm, shape, dist=None, grid_shape=None):
-        """Create a Distribution from a `shape` and optional arguments."""
+    def from_shape(cls, comm, shape, dist=None, grid_shape=None,
+                   optimize=None):
+        """Create a Distribution from a `shape` and optional arguments.
+
+        `optimize` selects a cost model for choosing `grid_shape` when it
+        isn't given; see `distarray.metadata_utils.make_grid_shape`.
+        """
         dist = {0: 'b'} if dist is None else dist
         ndim = len(shape)
         dist_tuple = normalize_dist(dist, ndim)
@@ -60,7 +68,8 @@ class Distribution(object):
         comm_size = base_comm.Get_size()
 
         if grid_shape is None:  # Make a new grid_shape if not provided.
-            grid_shape = make_grid_shape(shape, dist_tuple, comm_size)
+            grid_shape = make_grid_shape(shape, dist_tuple, comm_size,
+                                         optimize=optimize)
         grid_shape = normalize_grid_shape(grid_shape, shape,
                                           dist_tuple, comm_size)
 
@@ -128,7 +137,7 @@ class Distribution(object):
     @property
     def cart_coords(self):
         coords = tuple(m.grid_rank for m in self._maps)
-        assert coords == tuple(self.comm.Get_coords(self.comm_rank))
+        assert coords == tuple(self.comm.Get_coords(self.comm.Get_rank()))
         return coords
 
     @property
@@ -144,29 +153,74 @@ class Distribution(object):
     def rank_from_coords(self, coords):
         return self.comm.Get_cart_rank(coords)
 
+    @property
+    def global_indices(self):
+        """Return a tuple of the global indices held locally, one integer
+        array per dimension.
+        """
+        return tuple(m.global_indices for m in self._maps)
+
+    def local_from_global_ints(self, global_ind):
+        """Translate a tuple of `ndim` non-negative global integer indices
+        into local indices.
+
+        This is a fast path for element access: `global_ind` is not
+        sanitized, so it must already be a full-length tuple of in-bounds,
+        non-negative integers.  Raises IndexError if the element is not
+        local.
+        """
+        return tuple(m.local_from_global_index(idx)
+                     for (m, idx) in zip(self._maps, global_ind))
+
+    def local_from_global_arrays(self, global_ind):
+        """Translate a tuple of in-bounds global integer index arrays, one
+        per dimension, into local indices elementwise.
+
+        Returns a tuple of local index arrays and a tuple of boolean arrays
+        telling which entries are held locally; the local indices of the
+        other entries are meaningless.
+        """
+        translated = [m._local_from_global_array(np.asarray(idx, np.intp))
+                      for (m, idx) in zip(self._maps, global_ind)]
+        return (tuple(lidx for (lidx, _) in translated),
+                tuple(valid for (_, valid) in translated))
+
     def local_from_global(self, global_ind):
-        """ Given `global_ind` indices, translate into local indices."""
-        _, idxs = sanitize_indices(global_ind, self.ndim, self.global_shape)
+        """ Given `global_ind` indices, translate into local indices.
+
+        Each index may be an Integral, a slice, or an integer array; arrays
+        are translated elementwise and an array of local indices is
+        returned in their place.
+        """
+        if not any(isinstance(idx, np.ndarray) for idx in global_ind):
+            sanitize_indices(global_ind, self.ndim, self.global_shape)
         local_idxs = []
         for m, idx in zip(self._maps, global_ind):
             if isinstance(idx, Integral):
                 local_idxs.append(m.local_from_global_index(idx))
             elif isinstance(idx, slice):
                 local_idxs.append(m.local_from_global_slice(idx))
+            elif isinstance(idx, np.ndarray):
+                local_idxs.append(m.local_from_global(idx))
             else:
-                raise TypeError("Index must be Integral or slice.")
+                raise TypeError("Index must be Integral, slice or array.")
         return tuple(local_idxs)
 
     def global_from_local(self, local_ind):
-        """ Given `local_ind` indices, translate into global indices."""
+        """ Given `local_ind` indices, translate into global indices.
+
+        Each index may be an Integral, a slice, or an integer array.
+        """
         global_idxs = []
         for m, idx in zip(self._maps, local_ind):
             if isinstance(idx, Integral):
                 global_idxs.append(m.global_from_local_index(idx))
             elif isinstance(idx, slice):
                 global_idxs.append(m.global_from_local_slice(idx))
+            elif isinstance(idx, np.ndarray):
+                global_idxs.append(m.global_from_local(idx))
             else:
-                raise TypeError("Index must be Integral or slice.")
+                raise TypeError("Index must be Integral, slice or array.")
         return tuple(global_idxs)
 
     def local_flat_from_local(self, local_ind):
@@ -205,11 +259,28 @@ def map_from_dim_dict(dd):
                               grid_rank=grid_rank, start=start,
                               block_size=block_size)
     if dist_type == 'u':
-        return UnstructuredMap(global_size=size, grid_size=grid_size,
-                               grid_rank=grid_rank, indices=indices)
+        return _shared_unstructured_map(global_size=size, grid_size=grid_size,
+                                        grid_rank=grid_rank, indices=indices)
 
     raise ValueError("Unsupported dist_type of %r" % dist_type)
 
+# UnstructuredMaps are costly to build for long dimensions, so maps built from
+# equal dim dicts are shared while any Distribution still holds them.
+_unstructured_maps = weakref.WeakValueDictionary()
+
+
+def _shared_unstructured_map(global_size, grid_size, grid_rank, indices):
+    indices = np.asarray(indices)
+    key = (global_size, grid_size, grid_rank, indices.dtype.str,
+           len(indices), hash(indices.tobytes()))
+    umap = _unstructured_maps.get(key)
+    if umap is None or not np.array_equal(umap.indices, indices):
+        umap = UnstructuredMap(global_size=global_size, grid_size=grid_size,
+                               grid_rank=grid_rank, indices=indices)
+        _unstructured_maps[key] = umap
+    return umap
+
+
 def _accum(start, next):
     return tuple(s * next for s in start) + (next,)
 
@@ -219,8 +290,46 @@ def _get_strides(shape):
 
 class MapBase(object):
     """ Base class for all one dimensional Map classes.
+
+    Subclasses provide scalar `local_from_global_index` and
+    `global_from_local_index` methods, and `_global_indices` and
+    `_local_from_global_array` to support the vectorized methods below.
     """
-    pass
+
+    _global_indices_cache = None
+
+    @property
+    def global_indices(self):
+        """Return a read-only integer array of the global indices held
+        locally, in local order.  The array is computed once and cached.
+        """
+        if self._global_indices_cache is None:
+            global_indices = np.asarray(self._global_indices(), dtype=np.intp)
+            global_indices.setflags(write=False)
+            self._global_indices_cache = global_indices
+        return self._global_indices_cache
+
+    def global_from_local(self, lidx):
+        """Translate an integer array of local indices into global
+        indices.
+        """
+        lidx = np.asarray(lidx, dtype=np.intp)
+        if lidx.size and (lidx.min() < 0 or lidx.max() >= self.local_size):
+            raise IndexError("Local index out of bounds")
+        return self.global_indices[lidx]
+
+    def local_from_global(self, gidx):
+        """Translate an integer array of global indices into local
+        indices.
+
+        Raises IndexError if any of `gidx` is not held locally.
+        """
+        gidx = np.asarray(gidx, dtype=np.intp)
+        lidx, valid = self._local_from_global_array(gidx)
+        if not valid.all():
+            bad = gidx[np.logical_not(valid)].flat[0]
+            raise IndexError("Global index %s out of bounds" % bad)
+        return lidx
 
 
 class BlockMap(MapBase):
@@ -269,6 +378,13 @@ class BlockMap(MapBase):
         new_stop = stop + self.start
         return slice(new_start, new_stop)
 
+    def _global_indices(self):
+        return np.arange(self.start, self.stop)
+
+    def _local_from_global_array(self, gidx):
+        valid = (gidx >= self.start) & (gidx < self.stop)
+        return gidx - self.start, valid
+
     @property
     def dim_dict(self):
         return {'dist_type': self.dist,
@@ -325,6 +441,14 @@ class CyclicMap(MapBase):
             raise IndexError("Local index %s out of bounds" % lidx)
         return (lidx * self.grid_size) + self.start
 
+    def _global_indices(self):
+        return np.arange(self.start, self.global_size, self.grid_size)
+
+    def _local_from_global_array(self, gidx):
+        lidx, rem = np.divmod(gidx - self.start, self.grid_size)
+        valid = (rem == 0) & (lidx >= 0) & (lidx < self.local_size)
+        return lidx, valid
+
     @property
     def dim_dict(self):
         return {'dist_type': self.dist,
@@ -385,6 +509,20 @@ class BlockCyclicMap(MapBase):
         global_block = (local_block * self.grid_size) + self.start_block
         return global_block * self.block_size + offset
 
+    def _global_indices(self):
+        local_block, offset = np.divmod(np.arange(self.local_size),
+                                        self.block_size)
+        global_block = (local_block * self.grid_size) + self.start_block
+        return global_block * self.block_size + offset
+
+    def _local_from_global_array(self, gidx):
+        global_block, offset = np.divmod(gidx, self.block_size)
+        local_block, rem = np.divmod(global_block - self.start_block,
+                                     self.grid_size)
+        lidx = self.block_size * local_block + offset
+        valid = (rem == 0) & (lidx >= 0) & (lidx < self.local_size)
+        return lidx, valid
+
     @property
     def dim_dict(self):
         return {'dist_type': self.dist,
@@ -397,11 +535,7 @@ class BlockCyclicMap(MapBase):
 
     @property
     def global_iter(self):
-        _global_index = np.empty((self.local_size,), dtype=np.int32)
-        # FIXME: this is the slow way to do this...
-        for i in range(self.local_size):
-            _global_index[i] = self.global_from_local_index(i)
-        return iter(_global_index)
+        return iter(self.global_indices)
 
     @property
     def size(self):
@@ -429,21 +563,49 @@ class UnstructuredMap(MapBase):
         self.global_size = global_size
         self.grid_size = grid_size
         self.grid_rank = grid_rank
-        self.indices =  np.asarray(indices)
+        self.indices = np.array(indices)
+        self.indices.setflags(write=False)
         self.local_size = len(self.indices)
-        local_indices = range(self.local_size)
-        self._local_index = dict(zip(self.indices, local_indices))
+        self._offset = None
+        self._sorted = self._sorter = None
+        # Translate global to local indices with a constant offset when the
+        # indices are a contiguous increasing run, else by binary search in
+        # a sorted copy.
+        first = self.indices[0] if self.local_size else 0
+        if np.array_equal(self.indices,
+                          np.arange(first, first + self.local_size)):
+            self._offset = first
+        else:
+            self._sorter = np.argsort(self.indices, kind='mergesort')
+            self._sorted = self.indices[self._sorter]
 
     def local_from_global_index(self, gidx):
-        try:
-            lidx = self._local_index[gidx]
-        except KeyError:
+        if self._offset is not None:
+            lidx = gidx - self._offset
+            if lidx < 0 or lidx >= self.local_size:
+                raise IndexError("Global index %s out of bounds" % gidx)
+            return int(lidx)
+        lidx, valid = self._local_from_global_array(np.asarray(gidx))
+        if not valid:
             raise IndexError("Global index %s out of bounds" % gidx)
-        return lidx
+        return int(lidx)
 
     def global_from_local_index(self, lidx):
         return self.indices[lidx]
 
+    def _global_indices(self):
+        return self.indices
+
+    def _local_from_global_array(self, gidx):
+        if self._offset is not None:
+            lidx = gidx - self._offset
+            valid = (lidx >= 0) & (lidx < self.local_size)
+            return lidx, valid
+        pos = np.searchsorted(self._sorted, gidx)
+        pos = np.minimum(pos, self.local_size - 1)
+        valid = self._sorted[pos] == gidx
+        return self._sorter[pos], valid
+
     @property
     def dim_dict(self):
         return {'dist_type': self.dist,
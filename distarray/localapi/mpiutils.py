@@ -70,3 +70,61 @@ mpi_dtypes = {
 
 def mpi_type_for_ndarray(a):
     return mpi_dtypes[a.dtype]
+
+
+class SharedWindow(object):
+
+    """An MPI-3 shared memory window over the processes of one node.
+
+    Each process of `comm` that runs on the node contributes a segment of
+    `nbytes` bytes, which every other process on the node can address
+    directly (see `peer_buffer`).  `info` is gathered from all of them,
+    indexed by node rank, so that they can interpret each other's
+    segments.
+
+    Creating and freeing a window are collective over the node.  The window
+    is reference counted so that views on a segment can keep it alive; it
+    is freed when the last reference is released.
+    """
+
+    def __init__(self, comm, nbytes, itemsize, info=None):
+        self.comm = comm.Split_type(MPI.COMM_TYPE_SHARED)
+        self.win = MPI.Win.Allocate_shared(nbytes, itemsize, comm=self.comm)
+        # One passive-target epoch for the window's lifetime; `sync`
+        # makes the other processes' stores visible.
+        self.win.Lock_all(MPI.MODE_NOCHECK)
+        self.info = self.comm.allgather(info)
+        self.refcount = 1
+
+    @property
+    def rank(self):
+        return self.comm.Get_rank()
+
+    def node_rank(self, comm, rank):
+        """Translate `rank` of `comm` to a rank of this node, or None."""
+        group, node_group = comm.Get_group(), self.comm.Get_group()
+        try:
+            node_rank = MPI.Group.Translate_ranks(group, [rank],
+                                                  node_group)[0]
+        finally:
+            group.Free()
+            node_group.Free()
+        return None if node_rank == MPI.UNDEFINED else node_rank
+
+    def peer_buffer(self, node_rank):
+        """Return the segment of the process with rank `node_rank`."""
+        buf, _ = self.win.Shared_query(node_rank)
+        return buf
+
+    def sync(self):
+        self.win.Sync()
+
+    def acquire(self):
+        self.refcount += 1
+
+    def release(self):
+        self.refcount -= 1
+        if self.refcount == 0:
+            self.win.Unlock_all()
+            self.win.Free()
+            self.comm.Free()
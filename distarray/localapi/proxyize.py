@@ -24,8 +24,14 @@ class Proxy(object):
 
     def cleanup(self):
         namespace = import_module(self.module_name)
+        obj = getattr(namespace, self.name)
         delattr(namespace, self.name)
         self.name = self.module_name = self.type_str = None
+        # Every engine holding `obj` gets here, so collective resources
+        # (shared memory windows) can be freed.
+        free_shared = getattr(obj, 'free_shared', None)
+        if free_shared is not None:
+            free_shared()
 
 
 class Proxyize(object):
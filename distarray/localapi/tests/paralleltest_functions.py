@@ -5,6 +5,7 @@
 # ---------------------------------------------------------------------------
 
 import unittest
+import warnings
 
 import numpy as np
 from numpy.testing import assert_array_equal
@@ -57,6 +58,49 @@ class TestFunctions(ParallelTestCase):
         for global_inds, value in localarray.ndenumerate(a):
             self.assertEqual(sum(global_inds), value)
 
+    def test_fromfunction_vectorized(self):
+        """Is a vectorized fromfunction called with index arrays?"""
+        def f(i, j):
+            self.assertIsInstance(i, np.ndarray)
+            return 100 * i + j
+
+        d = Distribution.from_shape(comm=self.comm,
+                            shape=(16, 16), dist=('b', 'c'))
+        a = localarray.fromfunction(f, d, dtype='int64', vectorized=True)
+        self.assertEqual(a.dtype, np.dtype('int64'))
+        for (i, j), value in localarray.ndenumerate(a):
+            self.assertEqual(100 * i + j, value)
+
+    def test_fromfunction_vectorized_fallback(self):
+        """Does fromfunction fall back to scalar calls when it must?"""
+        def f(i, j):
+            return i if i > j else j
+
+        d = Distribution.from_shape(comm=self.comm,
+                            shape=(16, 16), dist=('c', 'b'))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            a = localarray.fromfunction(f, d, dtype='int64', vectorized=None)
+        self.assertTrue(any(issubclass(w.category, RuntimeWarning)
+                            for w in caught))
+        for (i, j), value in localarray.ndenumerate(a):
+            self.assertEqual(max(i, j), value)
+
+    def test_fromfunction_vectorized_errors(self):
+        """Are bad vectorized results and other errors reported?"""
+        d = Distribution.from_shape(comm=self.comm,
+                            shape=(16, 16), dist=('b', 'c'))
+        with self.assertRaises(ValueError):
+            localarray.fromfunction(lambda i, j: 7, d, vectorized=True)
+        with self.assertRaises(ValueError):
+            localarray.fromfunction(lambda i, j: (i + j).ravel(), d,
+                                    vectorized=True)
+
+        def f(i, j):
+            raise KeyError(i)
+        with self.assertRaises(KeyError):
+            localarray.fromfunction(f, d, vectorized=None)
+
     def test_fromndarray_like(self):
         """Can we build an array using fromndarray_like?"""
         d = Distribution.from_shape(comm=self.comm,
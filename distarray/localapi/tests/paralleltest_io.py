@@ -11,7 +11,10 @@ from numpy.testing import assert_allclose, assert_equal
 from distarray.testing import ParallelTestCase, import_or_skip, temp_filepath
 from distarray.localapi import LocalArray, ndenumerate
 from distarray.localapi import (save_dnpy, load_dnpy, save_hdf5, load_hdf5,
-                                load_npy)
+                                load_npy, save_npy, save_dnpy_collective,
+                                load_dnpy_collective, fromfunction)
+from distarray.localapi import checkpoint
+from distarray.localapi.localarray import _hyperslab_patterns
 from distarray.localapi.maps import Distribution
 
 
@@ -60,6 +63,141 @@ class TestDnpyFileIO(ParallelTestCase):
         self.assertTrue(isinstance(larr1, LocalArray))
         assert_allclose(self.larr0, larr1)
 
+    def test_unstructured_save_load(self):
+        indices = numpy.random.permutation(100000)
+        dim_data = ({'dist_type': 'u', 'size': 100000, 'proc_grid_rank': 0,
+                     'proc_grid_size': 1, 'indices': indices},)
+        d = Distribution(comm=self.comm, dim_data=dim_data)
+        larr0 = LocalArray(d, dtype=numpy.int32)
+        larr0.ndarray[:] = numpy.arange(100000)
+        save_dnpy(self.output_path, larr0)
+
+        with open(self.output_path, 'rb') as fp:
+            self.assertEqual(fp.read(8), b'\x93DARRY\x01\x01')
+        larr1 = load_dnpy(comm=self.comm, file=self.output_path,
+                          mmap_mode='r')
+        assert_equal(larr1.distribution.global_indices[0], indices)
+        assert_equal(larr1, larr0)
+
+    def test_compressed_save_load(self):
+        self.larr0.ndarray[:] = numpy.linspace(0, 1, 7)
+        save_dnpy(self.output_path, self.larr0, codec='zlib')
+        larr1 = load_dnpy(comm=self.comm, file=self.output_path)
+        assert_equal(larr1, self.larr0)
+        # compressed data is read even when asked to memory-map
+        larr2 = load_dnpy(comm=self.comm, file=self.output_path,
+                          mmap_mode='r')
+        assert_equal(larr2, self.larr0)
+
+    def test_compressed_unstructured(self):
+        dim_data = ({'dist_type': 'u', 'size': 5, 'proc_grid_rank': 0,
+                     'proc_grid_size': 1, 'indices': [3, 1, 4, 0, 2]},)
+        larr0 = LocalArray(Distribution(comm=self.comm, dim_data=dim_data))
+        larr0.ndarray[:] = numpy.arange(5.0)
+        save_dnpy(self.output_path, larr0, codec='zlib')
+        larr1 = load_dnpy(comm=self.comm, file=self.output_path)
+        assert_equal(larr1.distribution.global_indices[0], [3, 1, 4, 0, 2])
+        assert_equal(larr1, larr0)
+
+    def test_flat_file_load_mmap(self):
+        self.larr0.fill(3)
+        save_dnpy(self.output_path, self.larr0)
+        larr1 = load_dnpy(comm=self.comm, file=self.output_path,
+                          mmap_mode='r')
+        self.assertFalse(larr1.ndarray.flags.writeable)
+        assert_equal(larr1, self.larr0)
+
+    def test_flat_file_load_mmap_copy_on_write(self):
+        save_dnpy(self.output_path, self.larr0)
+        with open(self.output_path, 'rb') as fp:
+            larr1 = load_dnpy(comm=self.comm, file=fp, mmap_mode='c')
+        larr1.fill(5)
+        larr2 = load_dnpy(comm=self.comm, file=self.output_path)
+        assert_equal(larr2, self.larr0)
+
+
+class TestDnpyCollectiveFileIO(ParallelTestCase):
+
+    comm_size = 4
+
+    def setUp(self):
+        self.rank = self.comm.Get_rank()
+        if self.rank == 0:
+            self.output_path = temp_filepath(extension='.dnpy')
+        else:
+            self.output_path = None
+        self.output_path = self.comm.bcast(self.output_path, root=0)
+
+        self.expected = numpy.arange(60, dtype=numpy.int32).reshape(6, 10)
+        d = Distribution.from_shape(comm=self.comm, shape=(6, 10),
+                                    dist=('b', 'b'), grid_shape=(2, 2))
+        self.larr = fromfunction(lambda i, j: 10 * i + j, d, dtype=numpy.int32)
+        save_dnpy_collective(self.output_path, self.larr)
+
+    def tearDown(self):
+        self.comm.Barrier()
+        if self.rank == 0:
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+
+    def assert_loaded(self, dim_data):
+        la = load_dnpy_collective(self.comm, self.output_path, dim_data)
+        self.assertEqual(la.dtype, numpy.int32)
+        index = numpy.ix_(*la.distribution.global_indices)
+        assert_equal(la.ndarray, self.expected[index])
+
+    def test_same_distribution(self):
+        self.assert_loaded(self.larr.dim_data)
+
+    def test_other_distribution(self):
+        d = Distribution.from_shape(comm=self.comm, shape=(6, 10),
+                                    dist=('n', 'c'))
+        self.assert_loaded(d.dim_data)
+
+    def test_unstructured(self):
+        indices = [[9, 0, 5], [1, 4], [8, 2, 7], [3, 6]]
+        dim_data = ({'size': 6, 'dist_type': 'n'},
+                    {'size': 10, 'dist_type': 'u', 'proc_grid_rank': self.rank,
+                     'proc_grid_size': 4, 'indices': indices[self.rank]})
+        self.assert_loaded(dim_data)
+
+    def test_wrong_shape(self):
+        d = Distribution.from_shape(comm=self.comm, shape=(10, 6))
+        with self.assertRaises(ValueError):
+            load_dnpy_collective(self.comm, self.output_path, d.dim_data)
+
+
+class TestCheckpoint(ParallelTestCase):
+
+    comm_size = 2
+
+    def setUp(self):
+        d = Distribution.from_shape(comm=self.comm, shape=(10,))
+        self.larr = LocalArray(d)
+        self.larr.fill(1)
+        self.output_path = temp_filepath(extension='.dnpy')
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def test_snapshot(self):
+        checkpoint.start('job', [self.larr], [self.output_path])
+        self.larr.fill(2)
+        nbytes, seconds, error = checkpoint.wait('job')
+        self.assertIsNone(error)
+        self.assertEqual(nbytes, os.path.getsize(self.output_path))
+        self.assertGreaterEqual(seconds, 0)
+        larr1 = load_dnpy(comm=self.comm, file=self.output_path)
+        assert_equal(larr1.ndarray, 1)
+
+    def test_error(self):
+        filename = os.path.join(self.output_path, 'not_a_directory')
+        checkpoint.start('job', [self.larr], [filename])
+        nbytes, seconds, error = checkpoint.wait('job')
+        self.assertEqual(nbytes, 0)
+        self.assertIn('Error', error)
+
 
 bn_test_data = [
         ({'size': 2,
@@ -185,6 +323,62 @@ class TestNpyFileLoad(ParallelTestCase):
                       dim_data=dim_data_per_rank[self.rank])
         assert_equal(la, self.expected[:, expected_indices[self.rank]])
 
+    def test_load_bn_mmap(self):
+        la = load_npy(comm=self.comm, filename=self.output_path,
+                      dim_data=bn_test_data[self.rank], mmap_mode='r')
+        self.assertFalse(la.ndarray.flags.writeable)
+        assert_equal(la, self.expected[numpy.newaxis, self.rank])
+
+    def test_load_nc_mmap(self):
+        # not contiguous in the file: copied
+        la = load_npy(comm=self.comm, filename=self.output_path,
+                      dim_data=nc_test_data[self.rank], mmap_mode='r')
+        self.assertTrue(la.ndarray.flags.writeable)
+        assert_equal(la, self.expected[:, self.rank::2])
+
+
+class TestNpyFileSave(ParallelTestCase):
+
+    def setUp(self):
+        self.rank = self.comm.Get_rank()
+        if self.rank == 0:
+            self.output_path = temp_filepath(extension='.npy')
+        else:
+            self.output_path = None
+        self.output_path = self.comm.bcast(self.output_path, root=0)
+        self.expected = numpy.arange(77.0).reshape(7, 11)
+
+    def tearDown(self):
+        self.comm.Barrier()
+        if self.rank == 0:
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+
+    def check_saved(self, dim_data):
+        d = Distribution(comm=self.comm, dim_data=dim_data)
+        la = LocalArray(d)
+        la.ndarray[...] = self.expected[numpy.ix_(*d.global_indices)]
+        save_npy(self.output_path, la)
+        self.comm.Barrier()
+        assert_equal(numpy.load(self.output_path), self.expected)
+
+    def test_save_block(self):
+        d = Distribution.from_shape(comm=self.comm, shape=(7, 11),
+                                    dist=('b', 'b'))
+        self.check_saved(d.dim_data)
+
+    def test_save_cyclic(self):
+        d = Distribution.from_shape(comm=self.comm, shape=(7, 11),
+                                    dist=('c', 'n'))
+        self.check_saved(d.dim_data)
+
+    def test_save_unstructured(self):
+        indices = [[9, 0, 5], [1, 4], [8, 2, 7, 10], [3, 6]]
+        dim_data = ({'size': 7, 'dist_type': 'n'},
+                    {'size': 11, 'dist_type': 'u', 'proc_grid_rank': self.rank,
+                     'proc_grid_size': 4, 'indices': indices[self.rank]})
+        self.check_saved(dim_data)
+
 
 class TestHdf5FileSave(ParallelTestCase):
 
@@ -224,6 +418,31 @@ class TestHdf5FileSave(ParallelTestCase):
             for i, v in ndenumerate(la):
                 self.assertEqual(v, fp[self.key][i])
 
+    def check_saved(self, la):
+        with self.h5py.File(self.output_path, 'r', driver='mpio',
+                            comm=self.comm) as fp:
+            dset = fp[self.key][...]
+        index = numpy.ix_(*la.distribution.global_indices)
+        assert_equal(dset[index], la.ndarray)
+
+    def test_save_cyclic_2d(self):
+        d = Distribution.from_shape(comm=self.comm, shape=(11, 15),
+                                    dist=('c', 'c'))
+        la = LocalArray(d)
+        la.ndarray = numpy.random.random(la.local_shape)
+        save_hdf5(self.output_path, la, key=self.key, mode='w')
+        self.check_saved(la)
+
+    def test_save_unstructured(self):
+        indices = [[9, 0, 5], [1, 4], [8, 2, 7, 10], [3, 6]]
+        dim_data = ({'size': 3, 'dist_type': 'n'},
+                    {'size': 11, 'dist_type': 'u', 'proc_grid_rank': self.rank,
+                     'proc_grid_size': 4, 'indices': indices[self.rank]})
+        la = LocalArray(Distribution(comm=self.comm, dim_data=dim_data))
+        la.ndarray = numpy.random.random(la.local_shape)
+        save_hdf5(self.output_path, la, key=self.key, mode='w')
+        self.check_saved(la)
+
     def tearDown(self):
         # delete the test file
         if self.rank == 0:
@@ -231,6 +450,25 @@ class TestHdf5FileSave(ParallelTestCase):
                 os.remove(self.output_path)
 
 
+class TestHyperslabPatterns(ParallelTestCase):
+
+    comm_size = 1
+
+    def test_cyclic(self):
+        indices = numpy.arange(2, 20, 4)
+        self.assertEqual(_hyperslab_patterns(indices), [(2, 4, 5, 1)])
+
+    def test_block_cyclic(self):
+        indices = numpy.array([0, 1, 2, 8, 9, 10, 16, 17])
+        self.assertEqual(_hyperslab_patterns(indices),
+                         [(0, 8, 2, 3), (16, 2, 1, 2)])
+
+    def test_unstructured(self):
+        indices = numpy.array([0, 3, 4, 5, 9])
+        self.assertEqual(_hyperslab_patterns(indices),
+                         [(0, 1, 1, 1), (3, 3, 1, 3), (9, 1, 1, 1)])
+
+
 class TestHdf5FileLoad(ParallelTestCase):
 
     comm_size = 2
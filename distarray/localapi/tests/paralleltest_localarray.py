@@ -4,6 +4,9 @@
 #  Distributed under the terms of the BSD License.  See COPYING.rst.
 # ---------------------------------------------------------------------------
 
+import os
+import shutil
+import tempfile
 import unittest
 
 import numpy as np
@@ -12,6 +15,7 @@ from numpy.testing import assert_array_equal
 from distarray import utils
 from distarray.testing import (ParallelTestCase, assert_localarrays_allclose,
                                assert_localarrays_equal)
+from distarray.localapi import localarray
 from distarray.localapi.localarray import LocalArray, ndenumerate, ones
 from distarray.localapi.maps import Distribution
 from distarray.localapi.error import InvalidDimensionError, IncompatibleArrayError
@@ -332,6 +336,27 @@ class TestIndexing(ParallelTestCase):
             self.assertEqual(b.global_index[i], a.global_index[i])
             self.assertEqual(a.global_index[i], 0.0)
 
+    def test_unchecked_indexing(self):
+        """Does the unchecked fast path agree with checked indexing?"""
+        distribution = Distribution.from_shape(comm=self.comm,
+                                        shape=(16, 16, 2), dist=('c', 'b', 'n'))
+        a = LocalArray(distribution)
+        for i, value in ndenumerate(a):
+            a.global_index.unchecked_setitem(i, sum(i))
+        for i, value in ndenumerate(a):
+            self.assertEqual(a.global_index[i], sum(i))
+            self.assertEqual(a.global_index.unchecked_getitem(i), sum(i))
+
+    def test_unchecked_indexing_IndexError(self):
+        distribution = Distribution.from_shape(comm=self.comm,
+                                        shape=(16, 16), dist=('b', 'n'))
+        a = LocalArray(distribution)
+        row = (distribution[0].stop) % 16
+        self.assertRaises(IndexError, a.global_index.unchecked_getitem,
+                          (row, 0))
+        self.assertRaises(IndexError, a.global_index.unchecked_setitem,
+                          (row, 0), 1.0)
+
     def test_pack_unpack_index(self):
         distribution = Distribution.from_shape(comm=self.comm,
                                         shape=(16, 16, 2), dist=('c', 'b', 'n'))
@@ -379,6 +404,40 @@ class TestSlicing(ParallelTestCase):
                                              new_distribution=new_distribution)
             assert_array_equal(rvals, np.ones((2, 16)))
 
+class TestGlobalIntegerArrays(ParallelTestCase):
+
+    comm_size = 2
+
+    def setUp(self):
+        distribution = Distribution.from_shape(self.comm, (4, 6),
+                                               dist=('n', 'c'))
+        self.larr = LocalArray(distribution, dtype=int)
+        self.global_array = np.arange(24).reshape(4, 6)
+        self.larr.ndarray[...] = self.global_array[:, self.comm.Get_rank()::2]
+
+    def test_take_points(self):
+        indices = (np.array([0, 3, 2]), np.array([1, 2, 5]))
+        positions, values = localarray.take_global(self.larr, indices)
+        expected = np.array([1, 20, 17])
+        owned = indices[1] % 2 == self.comm.Get_rank()
+        assert_array_equal(positions, np.flatnonzero(owned))
+        assert_array_equal(values, expected[owned])
+
+    def test_take_outer(self):
+        indices = (np.array([3, 1]), np.arange(6))
+        positions, values = localarray.take_global(self.larr, indices,
+                                                   outer=True)
+        expected = self.global_array[[3, 1]]
+        assert_array_equal(values, expected[np.ix_(*positions)])
+
+    def test_put_points(self):
+        indices = (np.array([0, 3]), np.array([1, 2]))
+        localarray.put_global(self.larr, indices, np.array([-1, -2]))
+        self.global_array[indices] = [-1, -2]
+        assert_array_equal(self.larr.ndarray,
+                           self.global_array[:, self.comm.Get_rank()::2])
+
+
 class TestLocalArrayMethods(ParallelTestCase):
 
     ddpr = [
@@ -515,6 +574,78 @@ class TestNDEnumerate(ParallelTestCase):
             a.global_index[global_inds] = 0.0
 
 
+class TestSharedMemory(ParallelTestCase):
+
+    def setUp(self):
+        self.dist = Distribution.from_shape(comm=self.comm, shape=(16, 5),
+                                            grid_shape=(4, 1))
+        self.larr = localarray.zeros(self.dist, dtype='i', shared=True)
+        self.larr.fill(self.comm.Get_rank())
+
+    def tearDown(self):
+        self.larr.free_shared()
+
+    def test_is_shared(self):
+        self.assertTrue(self.larr.is_shared)
+        self.assertEqual(self.larr.dtype, np.dtype('i'))
+        self.assertFalse(LocalArray(self.dist).is_shared)
+
+    def test_node_gather(self):
+        self.comm.Barrier()
+        result = np.empty((16, 5), dtype='i')
+        pieces = localarray.node_gather(self.larr)
+        self.assertEqual(len(pieces), self.larr.shared_window.comm.Get_size())
+        for global_indices, ndarray in pieces:
+            result[np.ix_(*global_indices)] = ndarray
+        if len(pieces) == 4:
+            assert_array_equal(result, np.repeat(np.arange(4), 4)[:, None] *
+                               np.ones(5, dtype='i'))
+
+    def test_view_keeps_window(self):
+        view = self.larr.view(self.dist, dtype='i')
+        self.assertEqual(self.larr.shared_window.refcount, 2)
+        self.assertFalse(view.is_shared)
+        view.free_shared()
+        self.assertEqual(self.larr.shared_window.refcount, 1)
+
+    def test_free_shared(self):
+        larr = localarray.empty(self.dist, shared=True)
+        larr.free_shared()
+        self.assertFalse(larr.is_shared)
+        self.assertIsNone(larr.shared_window)
+
+    def test_node_gather_not_shared(self):
+        with self.assertRaises(ValueError):
+            localarray.node_gather(LocalArray(self.dist))
+
+
+class TestOutOfCore(ParallelTestCase):
+
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp()
+        self.dist = Distribution.from_shape(comm=self.comm, shape=(16, 5),
+                                            grid_shape=(4, 1))
+        self.larr = localarray.ones(self.dist, scratch=self.scratch)
+
+    def tearDown(self):
+        shutil.rmtree(self.scratch)
+
+    def test_storage(self):
+        self.assertTrue(self.larr.is_out_of_core)
+        self.assertIsInstance(self.larr.ndarray, np.memmap)
+        self.assertEqual(os.listdir(self.scratch), [])
+        self.assertFalse(LocalArray(self.dist).is_out_of_core)
+        zeros = localarray.zeros(self.dist, dtype='i', scratch=self.scratch)
+        assert_array_equal(zeros.ndarray, np.zeros((4, 5), dtype='i'))
+
+    def test_ufuncs_spill(self):
+        result = localarray.add(localarray.multiply(self.larr, 3), self.larr)
+        self.assertTrue(result.is_out_of_core)
+        self.assertIsInstance(result.ndarray, np.memmap)
+        assert_array_equal(result.ndarray, np.full((4, 5), 4.0))
+        self.assertTrue(localarray.empty_like(result).is_out_of_core)
+
+
 if __name__ == '__main__':
     try:
         unittest.main()
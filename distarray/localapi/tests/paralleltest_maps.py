@@ -43,6 +43,55 @@ class TestDistributionCreation(ParallelTestCase):
         self.assertTrue(len(distribution) == len(test_dim_data))
 
 
+class TestArrayIndexTranslation(ParallelTestCase):
+
+    comm_size = 4
+
+    def setUp(self):
+        self.distribution = Distribution.from_shape(comm=self.comm,
+                                                    shape=(7, 9),
+                                                    dist=('b', 'c'),
+                                                    grid_shape=(2, 2))
+
+    def test_global_indices(self):
+        rows, cols = self.distribution.global_indices
+        self.assertEqual((len(rows), len(cols)),
+                         self.distribution.local_shape)
+
+    def test_round_trip(self):
+        rows, cols = self.distribution.global_indices
+        local = self.distribution.local_from_global((rows, cols))
+        np.testing.assert_array_equal(local[0], np.arange(len(rows)))
+        np.testing.assert_array_equal(local[1], np.arange(len(cols)))
+        glb = self.distribution.global_from_local(local)
+        np.testing.assert_array_equal(glb[0], rows)
+        np.testing.assert_array_equal(glb[1], cols)
+
+    def test_mixed_indices(self):
+        rows, cols = self.distribution.global_indices
+        local = self.distribution.local_from_global((int(rows[0]), cols))
+        self.assertEqual(local[0], 0)
+        np.testing.assert_array_equal(local[1], np.arange(len(cols)))
+
+    def test_local_from_global_arrays(self):
+        rows, cols = self.distribution.global_indices
+        everything = (np.arange(7), np.arange(9))
+        local, valid = self.distribution.local_from_global_arrays(everything)
+        for (lidx, v, idx, owned) in zip(local, valid, everything,
+                                         (rows, cols)):
+            np.testing.assert_array_equal(v, np.in1d(idx, owned))
+            np.testing.assert_array_equal(lidx[v], np.arange(len(owned)))
+
+    def test_local_from_global_ints(self):
+        rows, cols = self.distribution.global_indices
+        self.assertEqual(self.distribution.local_from_global_ints(
+            (int(rows[-1]), int(cols[-1]))), (len(rows) - 1, len(cols) - 1))
+        other_col = (int(cols[0]) + 1) % 9
+        with self.assertRaises(IndexError):
+            self.distribution.local_from_global_ints((int(rows[0]),
+                                                      other_col))
+
+
 class TestFromShape(ParallelTestCase):
 
     """Is the __init__ method working properly?"""
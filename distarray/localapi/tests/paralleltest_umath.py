@@ -76,6 +76,70 @@ class TestBinaryUFunc(ParallelTestCase):
         c = LocalArray(d1, dtype='int32')
         self.assertRaises(IncompatibleArrayError, localarray.add, a, b, c)
 
+    def test_iadd(self):
+        """See if in-place operators write into the LocalArray."""
+        d = Distribution.from_shape(comm=self.comm, shape=(16, 16))
+        a = LocalArray(d, dtype='int32')
+        a.fill(1)
+        ndarray = a.ndarray
+        a += 2
+        a *= a
+        self.assertIs(a.ndarray, ndarray)
+        self.assertTrue(np.all(a.ndarray == 9))
+
+    def test_add_broadcast_operand(self):
+        """See if binary ufunc works for a LocalArray and an ndarray."""
+        d = Distribution.from_shape(comm=self.comm, shape=(16, 16),
+                                    dist=('b', 'c'))
+        a = LocalArray(d, dtype='int32')
+        a.fill(1)
+        row = np.arange(16)
+        b = localarray.broadcast_operand(row, a)
+        self.assertEqual(b.shape, (1, a.local_shape[1]))
+        c = localarray.add(a, b)
+        gcols = [a.global_from_local((0, j))[1]
+                 for j in range(a.local_shape[1])]
+        assert_array_equal(c.ndarray, 1 + np.tile(gcols, (a.local_shape[0], 1)))
+
+        self.assertRaises(IncompatibleArrayError,
+                          localarray.broadcast_operand, np.arange(5), a)
+
+    def test_gather_broadcast_operand(self):
+        """Does each rank receive just its section of a distributed row?"""
+        d = Distribution.from_shape(comm=self.comm, shape=(4, 12),
+                                    dist=('b', 'c'), grid_shape=(2, 2))
+        a = LocalArray(d, dtype='int32')
+        drow = Distribution.from_shape(comm=self.comm, shape=(12,))
+        row = LocalArray(drow, dtype='int32')
+        row.ndarray[:] = drow[0].global_indices * 10
+        b = localarray.gather_broadcast_operand(self.comm, row, a)
+        assert_array_equal(b, d[1].global_indices * 10)
+
+
+class TestLocalUfunc(ParallelTestCase):
+
+    def test_wrapped(self):
+        self.assertIs(localarray.local_ufunc('add'), localarray.add)
+
+    def test_not_wrapped(self):
+        d = Distribution.from_shape(comm=self.comm, shape=(16, 16))
+        a = localarray.ones(d)
+        copysign = localarray.local_ufunc('copysign')
+        self.assertIs(localarray.local_ufunc('copysign'), copysign)
+        assert_array_equal(copysign(a, -1).ndarray, -a.ndarray)
+
+    def test_not_a_ufunc(self):
+        self.assertRaises(TypeError, localarray.local_ufunc, 'sum')
+        self.assertRaises(TypeError, localarray.local_ufunc, 'modf')
+
+    def test_accumulate(self):
+        d = Distribution.from_shape(comm=self.comm, shape=(16, 4),
+                                    dist=('b', 'n'))
+        a = localarray.ones(d)
+        result = localarray.ufunc_accumulate('add', a, 0, None)
+        expected = np.arange(1, 17)[d[0].global_slice, np.newaxis]
+        assert_array_equal(result.ndarray, np.repeat(expected, 4, axis=1))
+
 
 def add_checkers(cls, ops, bad_ops):
     """Add a test method to `cls` for all `ops`
@@ -142,15 +206,18 @@ class TestLocalArrayBinaryOperations(ParallelTestCase):
 
 
 uops = (dc.absolute, dc.arccos, dc.arccosh, dc.arcsin, dc.arcsinh, dc.arctan,
-        dc.arctanh, dc.conjugate, dc.cos, dc.cosh, dc.exp, dc.expm1, dc.log,
-        dc.log10, dc.log1p, dc.negative, dc.reciprocal, dc.rint, dc.sign,
-        dc.sin, dc.sinh, dc.sqrt, dc.square, dc.tan, dc.tanh, dc.invert,)
-
-bops = (dc.add, dc.arctan2, dc.divide, dc.floor_divide, dc.fmod, dc.hypot,
-        dc.mod, dc.multiply, dc.power, dc.remainder, dc.subtract,
-        dc.true_divide, dc.less, dc.less_equal, dc.equal, dc.not_equal,
-        dc.greater, dc.greater_equal, dc.bitwise_and, dc.bitwise_or,
-        dc.bitwise_xor, dc.left_shift, dc.right_shift,)
+        dc.arctanh, dc.ceil, dc.conjugate, dc.cos, dc.cosh, dc.exp, dc.expm1,
+        dc.fabs, dc.floor, dc.isfinite, dc.isinf, dc.isnan, dc.log, dc.log10,
+        dc.log1p, dc.logical_not, dc.negative, dc.reciprocal, dc.rint,
+        dc.sign, dc.sin, dc.sinh, dc.sqrt, dc.square, dc.tan, dc.tanh,
+        dc.trunc, dc.invert,)
+
+bops = (dc.add, dc.arctan2, dc.divide, dc.floor_divide, dc.fmax, dc.fmin,
+        dc.fmod, dc.hypot, dc.logical_and, dc.logical_or, dc.logical_xor,
+        dc.maximum, dc.minimum, dc.mod, dc.multiply, dc.power, dc.remainder,
+        dc.subtract, dc.true_divide, dc.less, dc.less_equal, dc.equal,
+        dc.not_equal, dc.greater, dc.greater_equal, dc.bitwise_and,
+        dc.bitwise_or, dc.bitwise_xor, dc.left_shift, dc.right_shift,)
 
 
 # These operations don't work with our default data.
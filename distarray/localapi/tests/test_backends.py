@@ -0,0 +1,125 @@
+# encoding: utf-8
+# ---------------------------------------------------------------------------
+#  Copyright (C) 2008-2014, IPython Development Team and Enthought, Inc.
+#  Distributed under the terms of the BSD License.  See COPYING.rst.
+# ---------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+from distarray.localapi import backends
+
+
+class TestThreadedBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = backends.ThreadedBackend(nthreads=3, chunk_bytes=256)
+        self.a = np.random.random((100, 7))
+
+    def tearDown(self):
+        self.backend.close()
+
+    def test_chunks(self):
+        chunks = self.backend._chunks(self.a.shape, self.a.itemsize)
+        self.assertEqual(len(chunks), 25)
+        self.assertIsNone(self.backend._chunks((3, 2), 8))
+        self.assertIsNone(self.backend._chunks((), 8))
+
+    def test_ufunc_broadcast(self):
+        b = np.random.random(7)
+        assert_array_equal(self.backend.ufunc(np.add, (self.a, b)),
+                           self.a + b)
+        assert_array_equal(self.backend.ufunc(np.add, (self.a[:1], self.a)),
+                           self.a[:1] + self.a)
+        assert_array_equal(self.backend.ufunc(np.multiply, (2, self.a)),
+                           2 * self.a)
+
+    def test_ufunc_out(self):
+        out = np.empty_like(self.a)
+        self.backend.ufunc(np.sqrt, (self.a,), out=out)
+        assert_array_equal(out, np.sqrt(self.a))
+
+    def test_ufunc_two_outputs(self):
+        fractional, integral = self.backend.ufunc(np.modf, (self.a * 10,))
+        assert_array_equal(integral, np.modf(self.a * 10)[1])
+
+    def test_reduce(self):
+        for axes in ((0,), (1,), (0, 1)):
+            assert_allclose(self.backend.reduce(np.add, self.a, axes),
+                            self.a.sum(axis=axes))
+            assert_array_equal(self.backend.reduce(np.maximum, self.a, axes),
+                               self.a.max(axis=axes))
+
+    def test_reduce_dtype(self):
+        a = np.arange(700).astype(np.int8).reshape(100, 7)
+        result = self.backend.reduce(np.add, a, (0, 1), dtype=np.int64)
+        self.assertEqual(result, a.sum(dtype=np.int64))
+
+
+class TestStreamingBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp()
+        self.backend = backends.StreamingBackend(self.scratch, chunk_bytes=256)
+        self.a = backends.spill_memmap(self.scratch, (100, 7), float)
+        self.a[...] = np.random.random((100, 7))
+
+    def tearDown(self):
+        shutil.rmtree(self.scratch)
+
+    def test_spill_memmap(self):
+        self.assertIsInstance(self.a, np.memmap)
+        self.assertEqual(os.path.dirname(self.a.filename), self.scratch)
+        # the file is unlinked once mapped
+        self.assertEqual(os.listdir(self.scratch), [])
+        assert_array_equal(backends.spill_memmap(self.scratch, (3, 0), 'i'),
+                           np.zeros((3, 0), dtype='i'))
+
+    def test_release_pages(self):
+        expected = np.array(self.a)
+        backends.release_pages(self.a[10:])
+        assert_array_equal(self.a, expected)
+        backends.release_pages(expected)
+
+    def test_ufunc_spills(self):
+        b = np.random.random(7)
+        result = self.backend.ufunc(np.add, (self.a, b))
+        self.assertIsInstance(result, np.memmap)
+        self.assertEqual(os.path.dirname(result.filename), self.scratch)
+        assert_array_equal(result, np.asarray(self.a) + b)
+
+    def test_reduce(self):
+        for axes in ((0,), (1,), (0, 1)):
+            assert_allclose(self.backend.reduce(np.add, self.a, axes),
+                            np.asarray(self.a).sum(axis=axes))
+
+    def test_fill(self):
+        self.backend.fill(self.a, 3)
+        assert_array_equal(self.a, np.full((100, 7), 3.0))
+        self.assertEqual(self.backend.row_chunks((2, 2), 8), [Ellipsis])
+
+
+class TestSetBackend(unittest.TestCase):
+
+    def tearDown(self):
+        backends._backends.pop('key', None)
+        backends.activate(None)
+
+    def test_activate(self):
+        backends.set_backend('key', 'threaded', nthreads=2)
+        self.assertEqual(backends.get_backend().name, 'threaded')
+        backends.activate('other key')
+        self.assertEqual(backends.get_backend().name, 'numpy')
+        backends.activate('key')
+        self.assertEqual(backends.get_backend().nthreads, 2)
+        backends.set_backend('key', 'numpy')
+        self.assertEqual(backends.get_backend().name, 'numpy')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
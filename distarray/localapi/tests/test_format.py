@@ -8,6 +8,9 @@
 import unittest
 import six
 
+import numpy as np
+from numpy.testing import assert_array_equal
+
 from distarray.localapi import format as fmt
 
 
@@ -55,3 +58,149 @@ class TestReadMagic(unittest.TestCase):
 
         expected = (1, 1)
         self.assertEqual((major, minor), expected)
+
+
+class TestLocalArrayHeader(unittest.TestCase):
+
+    def round_trip(self, d, version=None):
+        fp = six.BytesIO()
+        version = fmt.write_localarray_header(fp, d, version=version)
+        fp.seek(0)
+        self.assertEqual(fmt.read_magic(fp), version)
+        result = fmt.read_localarray_header(fp, version)
+        self.assertEqual(len(fp.getvalue()) % 16, 0)
+        return version, result
+
+    def test_small_header(self):
+        d = {'__version__': '0.10.0', 'dim_data': ({'dist_type': 'n',
+                                                    'size': 3},)}
+        version, result = self.round_trip(d)
+        self.assertEqual(version, (1, 0))
+        self.assertEqual(result, ('0.10.0', d['dim_data']))
+
+    def test_large_header(self):
+        d = {'__version__': '0.10.0',
+             'dim_data': ({'dist_type': 'u', 'size': 20000,
+                           'indices': list(range(20000))},)}
+        version, result = self.round_trip(d)
+        self.assertEqual(version, (1, 1))
+        self.assertEqual(result, ('0.10.0', d['dim_data']))
+        with self.assertRaises(ValueError):
+            self.round_trip(d, version=(1, 0))
+
+
+class TestCompression(unittest.TestCase):
+
+    def round_trip(self, array, name):
+        fp = six.BytesIO()
+        codec = {'name': name, 'chunk_bytes': 1000}
+        fmt.write_compressed(fp, array, codec)
+        fp.seek(0)
+        return fmt.read_compressed(fp, codec)
+
+    def test_frames(self):
+        array = np.linspace(0, 1, 1001).reshape(7, 143)
+        for name in fmt.CODECS:
+            assert_array_equal(self.round_trip(array, name), array)
+
+    def test_fortran_order(self):
+        array = np.asfortranarray(np.arange(12.0).reshape(3, 4))
+        assert_array_equal(self.round_trip(array, 'zlib'), array)
+
+    def test_empty(self):
+        array = np.empty((0, 3), dtype=np.int16)
+        self.assertEqual(self.round_trip(array, 'zlib').shape, (0, 3))
+
+    def test_register_codec(self):
+        fmt.register_codec('identity', bytes, bytes)
+        try:
+            array = np.arange(300)
+            assert_array_equal(self.round_trip(array, 'identity'), array)
+        finally:
+            del fmt.CODECS['identity']
+
+    def test_unknown_codec(self):
+        fp = six.BytesIO()
+        fmt.write_compressed(fp, np.arange(3), {'name': 'zlib',
+                                                'chunk_bytes': 8})
+        fp.seek(0)
+        with self.assertRaises(ValueError):
+            fmt.read_compressed(fp, {'name': 'nope', 'chunk_bytes': 8})
+
+
+class TestGlobalHeader(unittest.TestCase):
+
+    def setUp(self):
+        self.dim_data = [
+            ({'dist_type': 'b', 'size': 5, 'proc_grid_rank': 0,
+              'proc_grid_size': 2, 'start': 0, 'stop': 3},
+             {'dist_type': 'n', 'size': 4}),
+            ({'dist_type': 'b', 'size': 5, 'proc_grid_rank': 1,
+              'proc_grid_size': 2, 'start': 3, 'stop': 5},
+             {'dist_type': 'n', 'size': 4}),
+            ]
+        self.header, self.offsets = fmt.global_header(
+            '0.10.0', np.int32, (5, 4), self.dim_data, [48, 32])
+
+    def test_round_trip(self):
+        fp = six.BytesIO(self.header)
+        d = fmt.read_global_header(fp)
+        self.assertEqual(d['shape'], (5, 4))
+        self.assertEqual(d['descr'], np.dtype(np.int32))
+        self.assertEqual([c['offset'] for c in d['chunks']], self.offsets)
+        self.assertEqual(d['chunks'][1]['dim_data'], self.dim_data[1])
+
+    def test_alignment(self):
+        self.assertEqual(len(self.header), self.offsets[0])
+        for offset in self.offsets:
+            self.assertEqual(offset % fmt.CHUNK_ALIGNMENT, 0)
+        self.assertEqual(self.offsets[1], self.offsets[0] + 64)
+
+    def test_index_arrays(self):
+        dim_data = [({'dist_type': 'u', 'size': 4, 'proc_grid_rank': 0,
+                      'proc_grid_size': 1, 'indices': np.array([2, 0, 1, 3])},)]
+        header, _ = fmt.global_header('0.10.0', float, (4,), dim_data, [32])
+        d = fmt.read_global_header(six.BytesIO(header))
+        self.assertEqual(d['chunks'][0]['dim_data'][0]['indices'],
+                         [2, 0, 1, 3])
+
+    def test_object_dtype(self):
+        with self.assertRaises(ValueError):
+            fmt.global_header('0.10.0', object, (5,), [], [])
+
+
+class TestChunkByteRanges(unittest.TestCase):
+
+    def test_block_byte_ranges(self):
+        starts, lengths = fmt.block_byte_ranges((3, 4), [[0, 2], [1, 2]],
+                                                100, 8)
+        assert_array_equal(starts, [108, 172])
+        assert_array_equal(lengths, [16, 16])
+
+    def test_merge_whole_rows(self):
+        starts, lengths = fmt.block_byte_ranges((3, 4), [[1, 2], range(4)],
+                                                0, 2)
+        assert_array_equal(starts, [8])
+        assert_array_equal(lengths, [16])
+
+    def test_no_elements(self):
+        starts, lengths = fmt.block_byte_ranges((3, 4), [[], [1, 2]], 0, 2)
+        self.assertEqual(len(starts), 0)
+        self.assertEqual(len(lengths), 0)
+
+    def test_chunk_byte_ranges(self):
+        header = {'descr': np.dtype(np.int16), 'shape': (6,),
+                  'chunks': ({'dim_data': ({'dist_type': 'b', 'size': 6,
+                                            'start': 0, 'stop': 3},),
+                              'offset': 64},
+                             {'dim_data': ({'dist_type': 'b', 'size': 6,
+                                            'start': 3, 'stop': 6},),
+                              'offset': 128})}
+        dim_data = ({'dist_type': 'c', 'size': 6, 'proc_grid_rank': 1,
+                     'proc_grid_size': 2, 'start': 1},)
+        starts, lengths, pieces = fmt.chunk_byte_ranges(header, dim_data)
+        # global indices 1, 3, 5: positions 1 of chunk 0, 0 and 2 of chunk 1
+        assert_array_equal(starts, [66, 128, 132])
+        assert_array_equal(lengths, [2, 2, 2])
+        self.assertEqual([shape for (shape, index) in pieces], [(1,), (2,)])
+        assert_array_equal(pieces[1][1][0], [1, 2])
@@ -5,6 +5,8 @@
 # ---------------------------------------------------------------------------
 
 import unittest
+import numpy as np
+from numpy.testing import assert_array_equal
 from distarray.externals.six.moves import range
 
 from distarray.localapi import maps
@@ -129,6 +131,98 @@ class TestBlockCyclicMap(unittest.TestCase):
         self.assertRaises(IndexError, self.m.global_from_local_index, li)
 
 
+class TestUnstructuredMap(unittest.TestCase):
+
+    def setUp(self):
+        dimdict = dict(dist_type='u', size=20, proc_grid_size=2,
+                       proc_grid_rank=0, indices=[13, 2, 7, 19])
+        self.m = maps.map_from_dim_dict(dimdict)
+
+    def test_local_from_global_index(self):
+        gis = (13, 2, 7, 19)
+        lis = [self.m.local_from_global_index(gi) for gi in gis]
+        expected = tuple(range(4))
+        self.assertSequenceEqual(lis, expected)
+
+    def test_local_from_global_index_IndexError(self):
+        for gi in (0, 3, 14, 20):
+            self.assertRaises(IndexError, self.m.local_from_global_index, gi)
+
+    def test_global_from_local_index(self):
+        gis = [self.m.global_from_local_index(li) for li in range(4)]
+        self.assertSequenceEqual(gis, (13, 2, 7, 19))
+
+    def test_contiguous(self):
+        dimdict = dict(dist_type='u', size=20, proc_grid_size=2,
+                       proc_grid_rank=1, indices=list(range(5, 12)))
+        m = maps.map_from_dim_dict(dimdict)
+        assert_array_equal(m.local_from_global(np.arange(5, 12)),
+                           np.arange(7))
+        self.assertRaises(IndexError, m.local_from_global_index, 4)
+        self.assertRaises(IndexError, m.local_from_global_index, 12)
+
+    def test_shared_map(self):
+        dimdict = dict(dist_type='u', size=20, proc_grid_size=2,
+                       proc_grid_rank=0, indices=np.array([13, 2, 7, 19]))
+        self.assertIs(maps.map_from_dim_dict(dimdict), self.m)
+        dimdict['indices'] = np.array([13, 2, 7, 18])
+        self.assertIsNot(maps.map_from_dim_dict(dimdict), self.m)
+
+
+class TestArrayTranslation(unittest.TestCase):
+
+    """Do the vectorized methods agree with the scalar ones?"""
+
+    dim_dicts = [dict(dist_type='n', size=20),
+                 dict(dist_type='b', size=39, start=16, stop=39),
+                 dict(dist_type='c', start=2, size=16, proc_grid_size=4,
+                      proc_grid_rank=2),
+                 dict(dist_type='c', start=2, size=16, proc_grid_size=4,
+                      proc_grid_rank=1, block_size=2),
+                 dict(dist_type='u', size=20, proc_grid_size=2,
+                      proc_grid_rank=0, indices=[13, 2, 7, 19])]
+
+    def test_global_indices(self):
+        for dd in self.dim_dicts:
+            m = maps.map_from_dim_dict(dd)
+            expected = [m.global_from_local_index(i)
+                        for i in range(m.local_size)]
+            assert_array_equal(m.global_indices, expected)
+            self.assertIs(m.global_indices, m.global_indices)
+
+    def test_global_indices_read_only(self):
+        m = maps.map_from_dim_dict(self.dim_dicts[1])
+        with self.assertRaises(ValueError):
+            m.global_indices[0] = 0
+
+    def test_block_cyclic_global_iter(self):
+        m = maps.map_from_dim_dict(self.dim_dicts[3])
+        self.assertSequenceEqual(list(m.global_iter), [2, 3, 10, 11])
+
+    def test_global_from_local(self):
+        for dd in self.dim_dicts:
+            m = maps.map_from_dim_dict(dd)
+            lis = np.arange(m.local_size)[::-1]
+            expected = [m.global_from_local_index(i) for i in lis]
+            assert_array_equal(m.global_from_local(lis), expected)
+
+    def test_local_from_global(self):
+        for dd in self.dim_dicts:
+            m = maps.map_from_dim_dict(dd)
+            gis = m.global_indices[::-1].reshape(-1, 1)
+            expected = [[m.local_from_global_index(g)] for g in gis.flat]
+            assert_array_equal(m.local_from_global(gis), expected)
+
+    def test_IndexError(self):
+        for dd in self.dim_dicts:
+            m = maps.map_from_dim_dict(dd)
+            self.assertRaises(IndexError, m.global_from_local,
+                              np.array([m.local_size]))
+            missing = np.setdiff1d(np.arange(-1, dd['size'] + 1),
+                                   m.global_indices)
+            self.assertRaises(IndexError, m.local_from_global, missing[:1])
+
+
 class TestMapEquivalences(unittest.TestCase):
 
     def test_compare_bcm_bm_local_index(self):
@@ -14,12 +14,16 @@ import operator
 from itertools import product
 from functools import reduce
 from numbers import Integral
-from collections import Sequence, Mapping
+from collections import Sequence, Mapping, OrderedDict
 
 import numpy
 
-from distarray import utils
-from distarray.externals.six import next
+try:
+    from math import gcd
+except ImportError:  # Python 2
+    from fractions import gcd
+
+from distarray.externals.six import next, string_types
 from distarray.externals.six.moves import map, zip
 
 
@@ -110,7 +114,75 @@ def normalize_grid_shape(grid_shape, shape, dist, comm_size):
     return grid_shape
 
 
-def make_grid_shape(shape, dist, comm_size):
+# LRU memo for `make_grid_shape`; distributions for reduction outputs and the
+# like ask for the same grid shapes over and over.
+_grid_shape_cache = OrderedDict()
+_GRID_SHAPE_CACHE_SIZE = 1024
+
+
+def _grid_shape_cache_key(shape, dist, comm_size, objective=None):
+    """Key `make_grid_shape` results by the ratios of the distributed
+    dimensions where that is safe.
+
+    The result depends only on those ratios unless some distributed
+    dimension is smaller than `comm_size`, in which case it may limit the
+    grid and the exact shape is used instead.  The communication costs of
+    `_communication_cost` scale uniformly with the shape, so the same holds
+    with an `objective`.
+    """
+    dist_sizes = [s for (s, d) in zip(shape, dist) if d != 'n']
+    if dist_sizes and min(dist_sizes) >= comm_size:
+        divisor = reduce(gcd, dist_sizes)
+        ratios = tuple(s // divisor if d != 'n' else None
+                       for (s, d) in zip(shape, dist))
+        return ('ratios', ratios, tuple(dist), comm_size, objective)
+    return ('shape', tuple(shape), tuple(dist), comm_size, objective)
+
+
+def _parse_optimize(optimize, ndim):
+    """Normalize the `optimize` argument of `make_grid_shape`.
+
+    Returns None, ``('halo',)`` or ``('reduce', axis)`` with a non-negative
+    `axis`.
+    """
+    if optimize is None:
+        return None
+    if optimize == 'halo':
+        return ('halo',)
+    prefix = 'reduce_axis='
+    if isinstance(optimize, string_types) and optimize.startswith(prefix):
+        try:
+            axis = int(optimize[len(prefix):])
+        except ValueError:
+            pass
+        else:
+            if -ndim <= axis < ndim:
+                return ('reduce', axis % ndim)
+    msg = ("optimize must be None, 'halo' or 'reduce_axis=<axis>' with an "
+           "axis of the array, not %r")
+    raise ValueError(msg % (optimize,))
+
+
+def _communication_cost(objective, shape, grid_shape):
+    """Estimate the number of elements communicated by all processes for
+    the workload described by `objective` (see `_parse_optimize`).
+
+    'halo' counts the elements in the faces between neighbouring local
+    blocks, once for each side, for a halo of depth one.  'reduce' counts
+    the partial results sent when reducing along the axis.  Multiply by
+    the itemsize for bytes.
+    """
+    size = reduce(operator.mul, shape, 1)
+    if objective[0] == 'halo':
+        return sum(2 * (g - 1) * (size // s)
+                   for (s, g) in zip(shape, grid_shape) if g > 1)
+    else:
+        axis = objective[1]
+        g = grid_shape[axis]
+        return (g - 1) * (size // shape[axis]) if g > 1 else 0
+
+
+def make_grid_shape(shape, dist, comm_size, optimize=None):
     """ Generate a `grid_shape` from `shape` tuple and `dist` tuple.
 
     Does not assume that `dim_data` has `proc_grid_size` set for each
@@ -126,6 +198,13 @@ def make_grid_shape(shape, dist, comm_size):
         dist_type character per dimension.
     comm_size : int
         Total number of processes to distribute.
+    optimize : str, optional
+        Choose the grid by the estimated communication volume of a
+        workload instead of by matching the shape's ratios: 'halo' for
+        stencil-like halo exchanges between neighbours, or
+        'reduce_axis=<axis>' for reductions along `axis`.  Ties, such as
+        between grids that don't distribute the reduction axis, are
+        broken by the ratio match.
 
     Returns
     -------
@@ -136,66 +215,290 @@ def make_grid_shape(shape, dist, comm_size):
     GridShapeError
         if not possible to distribute `comm_size` processes over number of
         dimensions.
+    ValueError
+        for an unknown `optimize`.
     """
     check_grid_shape_preconditions(shape, dist, comm_size)
+    objective = _parse_optimize(optimize, len(shape))
+    key = _grid_shape_cache_key(shape, dist, comm_size, objective)
+    try:
+        dist_grid_shape = _grid_shape_cache.pop(key)
+    except KeyError:
+        dist_grid_shape = _make_dist_grid_shape(shape, dist, comm_size,
+                                                objective)
+        if len(_grid_shape_cache) >= _GRID_SHAPE_CACHE_SIZE:
+            _grid_shape_cache.popitem(last=False)
+    _grid_shape_cache[key] = dist_grid_shape
+
+    # Create the grid_shape, all 1's for now.
+    grid_shape = [1] * len(shape)
+
+    # Fill grid_shape in the distdim slots using dist_grid_shape
+    it = iter(dist_grid_shape)
+    for distdim, d in enumerate(dist):
+        if d != 'n':
+            grid_shape[distdim] = next(it)
+
+    out_grid_shape = tuple(grid_shape)
+    check_grid_shape_postconditions(out_grid_shape, shape, dist, comm_size)
+    return out_grid_shape
+
+
+def _make_dist_grid_shape(shape, dist, comm_size, objective=None):
+    """Return the grid shape of the distributed dimensions of `shape`."""
     distdims = tuple(i for (i, v) in enumerate(dist) if v != 'n')
     ndistdim = len(distdims)
 
     if ndistdim == 0:
-        dist_grid_shape = ()
+        return ()
 
     elif ndistdim == 1:
         # Trivial case: all processes used for the one distributed dimension.
-        if comm_size >= shape[distdims[0]]:
-            dist_grid_shape = (shape[distdims[0]],)
-        else:
-            dist_grid_shape = (comm_size,)
+        return (min(comm_size, shape[distdims[0]]),)
 
     elif comm_size == 1:
         # Trivial case: only one process to distribute over!
-        dist_grid_shape = (1,) * ndistdim
+        return (1,) * ndistdim
 
     else:  # Main case: comm_size > 1, ndistdim > 1.
-        factors = utils.mult_partitions(comm_size, ndistdim)
-        if not factors:  # Can't factorize appropriately.
+        reduced_shape = [shape[i] for i in distdims]
+        if objective is None:
+            factors = _best_grid_factors(reduced_shape, comm_size)
+        else:
+            factors = _cheapest_grid_factors(shape, distdims, comm_size,
+                                             objective)
+        if factors is None:  # Can't factorize appropriately.
             raise GridShapeError("Cannot distribute array over processors.")
+        return factors
 
-        reduced_shape = [shape[i] for i in distdims]
 
-        # Reorder factors so they match the relative ordering in reduced_shape
-        factors = [utils.mirror_sort(f, reduced_shape) for f in factors]
+def _best_grid_factors(reduced_shape, comm_size):
+    """Find the factorization of `comm_size` over `reduced_shape` whose
+    pairwise ratios best match those of `reduced_shape`.
 
-        # Pick the "best" factoring from `factors` according to which matches
-        # the ratios among the dimensions in `shape`.
-        rs_ratio = _compute_grid_ratios(reduced_shape)
-        f_ratios = [_compute_grid_ratios(f) for f in factors]
-        distances = [rs_ratio - f_ratio for f_ratio in f_ratios]
-        norms = numpy.array([numpy.linalg.norm(d, 2) for d in distances])
-        index = norms.argmin()
-        # we now have the grid shape for the distributed dimensions.
-        dist_grid_shape = tuple(int(i) for i in factors[index])
+    Candidates are the multiplicative partitions of `comm_size` (see
+    `utils.mult_partitions`) with factors assigned in the relative order of
+    `reduced_shape`, the smallest factor going to the smallest dimension.
+    The partitions are searched depth-first in increasing order, and a
+    branch is pruned as soon as the ratio mismatch among the dimensions
+    assigned so far is no better than the best complete candidate, or a
+    factor exceeds the length of its dimension.  Among equally good
+    candidates the first in partition order wins.
 
-    # Create the grid_shape, all 1's for now.
+    Returns None if there is no usable factorization.
+    """
+    ndim = len(reduced_shape)
+    # Visit dimensions smallest first; `sorted` is stable, so ties keep
+    # their original order.
+    order = sorted(range(ndim), key=lambda i: reduced_shape[i])
+    bounds = [reduced_shape[i] if reduced_shape[i] > 0 else comm_size
+              for i in order]
+    shape = [float(s) for s in reduced_shape]
+    # With a zero-length dimension (other than the first) some ratio is
+    # infinite and every candidate scores the same.
+    degenerate = not all(shape[1:])
+    best = [float('inf'), None]
+    factors = [None] * ndim
+
+    def mismatch(i, j):
+        """Squared ratio mismatch of the pair of dimensions i < j."""
+        if degenerate:
+            return 0.0
+        return (factors[i] / factors[j] - shape[i] / shape[j]) ** 2
+
+    def pair_mismatch(k):
+        """Mismatch added by assigning the `k`th visited dimension."""
+        i = order[k]
+        return sum(mismatch(min(i, j), max(i, j)) for j in order[:k])
+
+    def search(k, remaining, dmin, partial):
+        if k == ndim - 1:
+            if not (dmin <= remaining <= bounds[k]):
+                return
+            factors[order[k]] = float(remaining)
+            # Sum the full score in a fixed pair order so that ties resolve
+            # independently of the search order.
+            score = sum(mismatch(i, j) for (i, j) in
+                        product(range(ndim), range(ndim)) if i < j)
+            if score < best[0]:
+                best[0] = score
+                best[1] = tuple(int(f) for f in factors)
+            return
+        d = dmin
+        while d ** (ndim - k) <= remaining and d <= bounds[k]:
+            if remaining % d == 0:
+                factors[order[k]] = float(d)
+                score = partial + pair_mismatch(k)
+                if score < best[0]:
+                    search(k + 1, remaining // d, d, score)
+            d += 1
+
+    search(0, comm_size, 1, 0.0)
+    return best[1]
+
+
+def _ordered_factorizations(n, bounds):
+    """Yield the tuples of positive integers, one per entry of `bounds` and
+    each at most that bound, whose product is `n`.
+    """
+    if len(bounds) == 1:
+        if n <= bounds[0]:
+            yield (n,)
+        return
+    for d in range(1, min(n, bounds[0]) + 1):
+        if n % d == 0:
+            for rest in _ordered_factorizations(n // d, bounds[1:]):
+                yield (d,) + rest
+
+
+def _cheapest_grid_factors(shape, distdims, comm_size, objective):
+    """Find the factorization of `comm_size` over the dimensions `distdims`
+    of `shape` with the lowest `_communication_cost`.
+
+    Unlike `_best_grid_factors`, every assignment of factors to dimensions
+    is a candidate.  Ties go to the best ratio match, then to the first in
+    lexicographic order.
+
+    Returns None if there is no usable factorization.
+    """
+    reduced_shape = [shape[i] for i in distdims]
+    bounds = [s if s > 0 else comm_size for s in reduced_shape]
+    degenerate = not all(reduced_shape)
     grid_shape = [1] * len(shape)
+    best_key, best = None, None
+    for factors in _ordered_factorizations(comm_size, bounds):
+        for i, f in zip(distdims, factors):
+            grid_shape[i] = f
+        cost = _communication_cost(objective, shape, grid_shape)
+        if degenerate:
+            mismatch = 0.0
+        else:
+            mismatch = sum((factors[i] / factors[j] -
+                            reduced_shape[i] / reduced_shape[j]) ** 2
+                           for i in range(len(factors))
+                           for j in range(i + 1, len(factors)))
+        key = (cost, mismatch)
+        if best_key is None or key < best_key:
+            best_key, best = key, factors
+    return best
 
-    # Fill grid_shape in the distdim slots using dist_grid_shape
-    it = iter(dist_grid_shape)
-    for distdim in distdims:
-        grid_shape[distdim] = next(it)
 
-    out_grid_shape = tuple(grid_shape)
-    check_grid_shape_postconditions(out_grid_shape, shape, dist, comm_size)
-    return out_grid_shape
+def node_rank_from_coords(grid_shape, node_ids, shape=None):
+    """Place ranks on a process grid so that ranks sharing a node are
+    neighbours.
 
+    Parameters
+    ----------
+    grid_shape : tuple of int
+    node_ids : sequence
+        The node of each rank, e.g. from `Context.node_ids`.  Any hashable
+        labels will do.
+    shape : tuple of int, optional
+        Shape of the distributed array, used to weigh the faces between
+        local blocks.  Default: `grid_shape`.
 
-def _compute_grid_ratios(shape):
-    shape = tuple(map(float, shape))
-    n = len(shape)
-    ratios = []
-    for (i, j) in product(range(n), range(n)):
-        if i < j:
-            ratios.append(shape[i] / shape[j])
-    return numpy.array(ratios)
+    Returns
+    -------
+    ndarray of int with shape `grid_shape`
+        The rank at each grid coordinate.
+
+    When every node has the same number of ranks, each node gets a block
+    of the grid whose shape minimizes the halo traffic between nodes (see
+    `_communication_cost`); a reduction along any axis then also combines
+    node-local partial results first.  Otherwise the ranks are grouped by
+    node and laid out in row-major order.
+    """
+    grid_shape = tuple(grid_shape)
+    if len(node_ids) != reduce(operator.mul, grid_shape, 1):
+        msg = "Got %d node ids for a process grid of shape %r."
+        raise ValueError(msg % (len(node_ids), grid_shape))
+
+    nodes = OrderedDict()
+    for rank, node in enumerate(node_ids):
+        nodes.setdefault(node, []).append(rank)
+    grouped = [rank for ranks in nodes.values() for rank in ranks]
+    counts = set(len(ranks) for ranks in nodes.values())
+
+    block = None
+    if len(nodes) > 1 and len(counts) == 1:
+        block = _node_block_shape(grid_shape, counts.pop(), shape)
+    if block is None:
+        return numpy.array(grouped, dtype=int).reshape(grid_shape)
+
+    nblocks = tuple(g // b for (g, b) in zip(grid_shape, block))
+    ranks_per_node = reduce(operator.mul, block, 1)
+    rank_from_coords = numpy.empty(grid_shape, dtype=int)
+    for coords in numpy.ndindex(*grid_shape):
+        outer = tuple(c // b for (c, b) in zip(coords, block))
+        inner = tuple(c % b for (c, b) in zip(coords, block))
+        position = (numpy.ravel_multi_index(outer, nblocks) * ranks_per_node +
+                    numpy.ravel_multi_index(inner, block))
+        rank_from_coords[coords] = grouped[position]
+    return rank_from_coords
+
+
+def _node_block_shape(grid_shape, ranks_per_node, shape=None):
+    """Find the shape of the block of `grid_shape` given to each node.
+
+    The block must tile the grid.  Returns None if no block does.
+    """
+    if shape is None or not all(shape):
+        shape = grid_shape
+    best_cost, best = None, None
+    for block in _ordered_factorizations(ranks_per_node, grid_shape):
+        if any(g % b for (g, b) in zip(grid_shape, block)):
+            continue
+        nblocks = tuple(g // b for (g, b) in zip(grid_shape, block))
+        cost = _communication_cost(('halo',), shape, nblocks)
+        if best is None or cost < best_cost:
+            best_cost, best = cost, block
+    return best
+
+
+def chunk_aligned_bounds(shape, chunks, comm_size):
+    """Split an array stored in chunks into blocks of whole chunks.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the array.
+    chunks : tuple of int
+        Shape of its chunks, e.g. an HDF5 dataset's ``chunks``.
+    comm_size : int
+        The most processes to use.
+
+    Returns
+    -------
+    bounds : tuple of lists of int
+        The block ``bounds`` of each dimension, on chunk boundaries, for
+        `Distribution.from_global_dim_data`.  The number of processes used,
+        the product of the number of blocks in each dimension, is the
+        largest up to `comm_size` that gives every process at least one
+        chunk.  Of the grids using that many processes, the one with the
+        fewest chunks on the busiest process wins, then the one with the
+        least halo traffic (see `_communication_cost`).
+    """
+    if len(shape) != len(chunks):
+        msg = "Got chunks %r for an array of shape %r."
+        raise ValueError(msg % (chunks, shape))
+    if not shape:
+        return ()
+    nchunks = tuple(max(1, -(-s // c)) for (s, c) in zip(shape, chunks))
+    best = None
+    for nprocs in range(comm_size, 0, -1):
+        for grid_shape in _ordered_factorizations(nprocs, nchunks):
+            busiest = reduce(operator.mul,
+                             (-(-n // g) for (n, g) in zip(nchunks, grid_shape)),
+                             1)
+            key = (busiest, _communication_cost(('halo',), nchunks,
+                                                grid_shape))
+            if best is None or key < best[0]:
+                best = (key, grid_shape)
+        if best is not None:
+            break
+    grid_shape = best[1]
+    return tuple([min(k * n // g * c, s) for k in range(g + 1)]
+                 for (s, c, n, g) in zip(shape, chunks, nchunks, grid_shape))
 
 
 def normalize_dist(dist, ndim):
@@ -431,6 +734,104 @@ def sanitize_indices(indices, ndim=None, shape=None):
     return (rtype, sanitized)
 
 
+def _is_array_index(index):
+    return isinstance(index, (list, numpy.ndarray))
+
+
+def _positivify_array(index, size):
+    """Check that an integer index array is within bounds and return a
+    positive version.
+    """
+    index = numpy.asarray(index)
+    if index.size == 0:
+        return index.astype(int)
+    if index.dtype.kind not in 'iu':
+        raise IndexError("Arrays used as indices must be of integer type.")
+    index = numpy.where(index < 0, index + size, index)
+    if ((index < 0) | (index >= size)).any():
+        raise IndexError("Index out of bounds.")
+    return index
+
+
+def sanitize_fancy_indices(indices, shape):
+    """Classify and sanitize integer-array `indices`.
+
+    * A single integer array (or list), possibly combined with slices, is
+      classified as 'outer': each dimension is selected independently.  The
+      sanitized indices hold the index array, with its shape, for its
+      dimension and an `arange` of the selected indices for each of the
+      others, so the shape of the selection is the concatenation of their
+      shapes.
+    * A tuple of integer arrays and Integrals, one per dimension, selects
+      single elements and is classified as 'points'.  The sanitized indices
+      are broadcast against each other.
+    * Missing trailing indices and an Ellipsis stand for full slices.
+    * Negative indices are made positive.
+
+    Raises
+    ------
+    IndexError
+        for out-of-bounds indices, non-integer arrays, too many indices, or
+        combinations NumPy would handle but we don't (several index arrays
+        or Integrals together with slices)
+
+    Returns
+    -------
+    2-tuple of (str, n-tuple of integer arrays), or None if `indices` is not
+    an integer-array index.
+    """
+    if not isinstance(indices, tuple):
+        indices = (indices,)
+    if not any(_is_array_index(i) for i in indices):
+        return None
+
+    if any(i is Ellipsis for i in indices):
+        pos = [i is Ellipsis for i in indices].index(True)
+        fill = (slice(None),) * (len(shape) - len(indices) + 1)
+        indices = indices[:pos] + fill + indices[pos + 1:]
+    if len(indices) > len(shape):
+        raise IndexError("Too many indices for array.")
+    indices += (slice(None),) * (len(shape) - len(indices))
+
+    if not any(isinstance(i, slice) for i in indices):
+        arrays = numpy.broadcast_arrays(*[numpy.asarray(i) for i in indices])
+        sanitized = tuple(_positivify_array(a, size)
+                          for (a, size) in zip(arrays, shape))
+        return ('points', sanitized)
+
+    if (sum(_is_array_index(i) for i in indices) != 1 or
+            not all(_is_array_index(i) or isinstance(i, slice)
+                    for i in indices)):
+        msg = ("Slices can only be combined with a single integer-array "
+               "index and no integer indices.")
+        raise IndexError(msg)
+    sanitized = tuple(_positivify_array(i, size) if _is_array_index(i)
+                      else numpy.arange(*i.indices(size))
+                      for (i, size) in zip(indices, shape))
+    return ('outer', sanitized)
+
+
+def broadcast_shape(*shapes):
+    """Return the shape that `shapes` broadcast to under NumPy's rules.
+
+    Raises
+    ------
+    ValueError
+        If the shapes can't be broadcast together.
+    """
+    ndim = max(len(shape) for shape in shapes)
+    padded = [(1,) * (ndim - len(shape)) + tuple(shape) for shape in shapes]
+    result = []
+    for sizes in zip(*padded):
+        not_one = set(size for size in sizes if size != 1)
+        if len(not_one) > 1:
+            msg = "operands could not be broadcast together with shapes %s"
+            raise ValueError(msg % ' '.join(str(tuple(shape))
+                                            for shape in shapes))
+        result.append(not_one.pop() if not_one else 1)
+    return tuple(result)
+
+
 def normalize_reduction_axes(axes, ndim):
     if axes is None:
         axes = tuple(range(ndim))
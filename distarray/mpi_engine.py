@@ -12,7 +12,7 @@ from importlib import import_module
 import types
 
 from distarray.metadata_utils import arg_kwarg_proxy_converter
-from distarray.localapi import LocalArray
+from distarray.localapi import LocalArray, backends
 from distarray.localapi.proxyize import Proxy
 
 from distarray.mpionly_utils import (initial_comm_setup,
@@ -97,6 +97,7 @@ class Engine(object):
         new_func = types.FunctionType(func_data[0], new_func_globals,
                                       func_data[1], func_data[2], func_data[3])
 
+        backends.activate(context_key)
         res = new_func(*args, **kwargs)
         if autoproxyize and isinstance(res, LocalArray):
             res = module.proxyize(res)
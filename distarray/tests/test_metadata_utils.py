@@ -17,6 +17,140 @@ class TestMakeGridShape(unittest.TestCase):
         grid_shape = metadata_utils.make_grid_shape((20, 20), ('b', 'b'), 12)
         self.assertEqual(grid_shape, (3, 4))
 
+    def test_make_grid_shape_ratio_cache(self):
+        """Are shapes with the same ratios served from one cache entry?"""
+        metadata_utils._grid_shape_cache.clear()
+        dist = ('b', 'b', 'b')
+        grid_shape = metadata_utils.make_grid_shape((64, 32, 16), dist, 8)
+        self.assertEqual(grid_shape, (4, 2, 1))
+        grid_shape = metadata_utils.make_grid_shape((128, 64, 32), dist, 8)
+        self.assertEqual(grid_shape, (4, 2, 1))
+        self.assertEqual(len(metadata_utils._grid_shape_cache), 1)
+
+    def test_make_grid_shape_small_dims_not_shared(self):
+        """Dimensions smaller than comm_size are keyed exactly."""
+        metadata_utils._grid_shape_cache.clear()
+        grid_shape = metadata_utils.make_grid_shape((2, 100), ('b', 'b'), 8)
+        self.assertEqual(grid_shape, (1, 8))
+        grid_shape = metadata_utils.make_grid_shape((4, 200), ('b', 'b'), 8)
+        self.assertEqual(grid_shape, (1, 8))
+        self.assertEqual(len(metadata_utils._grid_shape_cache), 2)
+
+    def test_make_grid_shape_ratio_and_exact_keys_distinct(self):
+        metadata_utils._grid_shape_cache.clear()
+        grid_shape = metadata_utils.make_grid_shape((4,), ('b',), 4)
+        self.assertEqual(grid_shape, (4,))
+        grid_shape = metadata_utils.make_grid_shape((1,), ('b',), 4)
+        self.assertEqual(grid_shape, (1,))
+
+    def test_make_grid_shape_fits_shape(self):
+        """Candidates with more processes than elements are skipped."""
+        grid_shape = metadata_utils.make_grid_shape((3, 3), ('b', 'b'), 9)
+        self.assertEqual(grid_shape, (3, 3))
+        # The best ratio match, (1, 8), would leave a process without
+        # any rows of a (2, 7) array.
+        grid_shape = metadata_utils.make_grid_shape((2, 7), ('b', 'b'), 8)
+        self.assertEqual(grid_shape, (2, 4))
+
+    def test_make_grid_shape_many_processes(self):
+        shape = (1000, 200, 50, 7)
+        grid_shape = metadata_utils.make_grid_shape(shape, ('b',) * 4,
+                                                    720720)
+        self.assertEqual(grid_shape, (286, 63, 20, 2))
+
+    def test_make_grid_shape_reduce_axis(self):
+        """Is the reduction axis left undistributed when possible?"""
+        dist = ('b', 'b')
+        for optimize, expected in (('reduce_axis=1', (4, 1)),
+                                   ('reduce_axis=-2', (1, 4))):
+            grid_shape = metadata_utils.make_grid_shape((100, 100), dist, 4,
+                                                        optimize=optimize)
+            self.assertEqual(grid_shape, expected)
+        self.assertEqual(metadata_utils.make_grid_shape((100, 100), dist, 4),
+                         (2, 2))
+
+    def test_make_grid_shape_halo(self):
+        """Does 'halo' beat the ratio match on halo volume?"""
+        shape, dist = (3, 8, 50), ('b', 'b', 'b')
+        self.assertEqual(metadata_utils.make_grid_shape(shape, dist, 6),
+                         (1, 2, 3))
+        grid_shape = metadata_utils.make_grid_shape(shape, dist, 6,
+                                                    optimize='halo')
+        self.assertEqual(grid_shape, (1, 1, 6))
+        halo = ('halo',)
+        self.assertLess(
+            metadata_utils._communication_cost(halo, shape, (1, 1, 6)),
+            metadata_utils._communication_cost(halo, shape, (1, 2, 3)))
+
+    def test_make_grid_shape_bad_optimize(self):
+        for optimize in ('volume', 'reduce_axis=2', 'reduce_axis=x'):
+            with self.assertRaises(ValueError):
+                metadata_utils.make_grid_shape((10, 10), ('b', 'b'), 4,
+                                               optimize=optimize)
+
+
+class TestNodeRankFromCoords(unittest.TestCase):
+
+    def test_blocks_per_node(self):
+        """Does each node get a 2x2 block of a 4x4 grid?"""
+        node_ids = [rank % 4 for rank in range(16)]
+        rank_from_coords = metadata_utils.node_rank_from_coords((4, 4),
+                                                                node_ids)
+        self.assertEqual(sorted(rank_from_coords.flat), list(range(16)))
+        for i in (0, 2):
+            for j in (0, 2):
+                block = rank_from_coords[i:i+2, j:j+2]
+                self.assertEqual(len(set(r % 4 for r in block.flat)), 1)
+
+    def test_block_shape_follows_array_shape(self):
+        """Are the node blocks cut across the long axis?"""
+        node_ids = [rank // 2 for rank in range(8)]
+        rank_from_coords = metadata_utils.node_rank_from_coords(
+            (2, 4), node_ids, shape=(10, 1000))
+        self.assertEqual(rank_from_coords.tolist(),
+                         [[0, 2, 4, 6], [1, 3, 5, 7]])
+
+    def test_unequal_nodes(self):
+        rank_from_coords = metadata_utils.node_rank_from_coords(
+            (2, 3), [0, 1, 0, 1, 0, 0])
+        self.assertEqual(rank_from_coords.tolist(), [[0, 2, 4], [5, 1, 3]])
+
+    def test_single_node(self):
+        rank_from_coords = metadata_utils.node_rank_from_coords((2, 2),
+                                                                [0] * 4)
+        self.assertEqual(rank_from_coords.tolist(), [[0, 1], [2, 3]])
+
+    def test_wrong_number_of_node_ids(self):
+        with self.assertRaises(ValueError):
+            metadata_utils.node_rank_from_coords((2, 2), [0, 0, 1])
+
+
+class TestChunkAlignedBounds(unittest.TestCase):
+
+    def test_busiest_process(self):
+        """Is the grid chosen for the fewest chunks per process?"""
+        bounds = metadata_utils.chunk_aligned_bounds((100, 60), (10, 20), 4)
+        self.assertEqual(bounds, ([0, 20, 50, 70, 100], [0, 60]))
+
+    def test_halo(self):
+        bounds = metadata_utils.chunk_aligned_bounds((8, 8), (2, 2), 4)
+        self.assertEqual(bounds, ([0, 4, 8], [0, 4, 8]))
+
+    def test_partial_chunk(self):
+        bounds = metadata_utils.chunk_aligned_bounds((7,), (2,), 4)
+        self.assertEqual(bounds, ([0, 2, 4, 6, 7],))
+
+    def test_fewer_chunks_than_processes(self):
+        bounds = metadata_utils.chunk_aligned_bounds((5, 30), (10, 10), 4)
+        self.assertEqual(bounds, ([0, 5], [0, 10, 20, 30]))
+
+    def test_zero_dimensional(self):
+        self.assertEqual(metadata_utils.chunk_aligned_bounds((), (), 4), ())
+
+    def test_wrong_chunks(self):
+        with self.assertRaises(ValueError):
+            metadata_utils.chunk_aligned_bounds((5, 30), (10,), 4)
+
 
 class TestPositivify(unittest.TestCase):
 
@@ -276,5 +410,59 @@ class TestGridSizes(DefaultContextTestCase):
         self.assertEqual(shapes, [(20,), (22,)])
 
 
+class TestSanitizeFancyIndices(unittest.TestCase):
+
+    def test_not_fancy(self):
+        self.assertIsNone(metadata_utils.sanitize_fancy_indices((1, 2),
+                                                                (5, 5)))
+        self.assertIsNone(metadata_utils.sanitize_fancy_indices(slice(2),
+                                                                (5, 5)))
+
+    def test_outer(self):
+        tag, sanitized = metadata_utils.sanitize_fancy_indices([1, -1],
+                                                               (5, 3))
+        self.assertEqual(tag, 'outer')
+        self.assertEqual(sanitized[0].tolist(), [1, 4])
+        self.assertEqual(sanitized[1].tolist(), [0, 1, 2])
+
+    def test_outer_with_slices(self):
+        tag, sanitized = metadata_utils.sanitize_fancy_indices(
+            (slice(None, None, 2), [[2], [0]]), (5, 3))
+        self.assertEqual(tag, 'outer')
+        self.assertEqual(sanitized[0].tolist(), [0, 2, 4])
+        self.assertEqual(sanitized[1].tolist(), [[2], [0]])
+
+    def test_outer_ellipsis(self):
+        tag, sanitized = metadata_utils.sanitize_fancy_indices(
+            (Ellipsis, [1]), (2, 3, 4))
+        self.assertEqual(tag, 'outer')
+        self.assertEqual([s.tolist() for s in sanitized],
+                         [[0, 1], [0, 1, 2], [1]])
+
+    def test_unsupported_mix(self):
+        with self.assertRaises(IndexError):
+            metadata_utils.sanitize_fancy_indices(([1], slice(None), 0),
+                                                  (5, 3, 2))
+
+    def test_points(self):
+        tag, sanitized = metadata_utils.sanitize_fancy_indices(([1, 2], -1),
+                                                               (5, 3))
+        self.assertEqual(tag, 'points')
+        self.assertEqual(sanitized[0].tolist(), [1, 2])
+        self.assertEqual(sanitized[1].tolist(), [2, 2])
+
+    def test_out_of_bounds(self):
+        with self.assertRaises(IndexError):
+            metadata_utils.sanitize_fancy_indices([5], (5, 3))
+
+    def test_wrong_length(self):
+        with self.assertRaises(IndexError):
+            metadata_utils.sanitize_fancy_indices(([1], [2]), (5, 3, 2))
+
+    def test_not_integer(self):
+        with self.assertRaises(IndexError):
+            metadata_utils.sanitize_fancy_indices([1.5], (5,))
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
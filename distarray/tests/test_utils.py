@@ -32,6 +32,18 @@ class TestMultPartitions(unittest.TestCase):
                                                         (2, 2, 2, 2)])
         self.assertEqual(utils.mult_partitions(6, 3), [(1, 1, 6), (1, 2, 3)])
 
+    def test_mult_partitions_integer(self):
+        """Are the factors exact integers, even for large n?"""
+        n = 2 ** 20 * 3
+        partitions = utils.mult_partitions(n, 2)
+        self.assertEqual(len(partitions), 21)
+        for p in partitions:
+            self.assertEqual(p[0] * p[1], n)
+            self.assertTrue(all(isinstance(f, int) for f in p))
+
+    def test_mult_partitions_size_one(self):
+        self.assertEqual(utils.mult_partitions(12, 1), [(12,)])
+
 
 class TestSliceIntersection(unittest.TestCase):
 
@@ -9,7 +9,6 @@ Utilities.
 
 from functools import reduce
 from importlib import import_module
-from math import sqrt
 import random
 import uuid
 
@@ -50,30 +49,6 @@ def multi_for(iterables):
                 yield (item,) + rest_tuple
 
 
-def divisors_minmax(n, dmin, dmax):
-    """Find the divisors of n in the interval (dmin,dmax]."""
-    i = dmin + 1
-    while i <= dmax:
-        if n % i == 0:
-            yield i
-        i += 1
-
-
-def list_or_tuple(seq):
-    """ Is the object either a list or a tuple? """
-    return isinstance(seq, (list, tuple))
-
-
-def flatten(seq, to_expand=list_or_tuple):
-    """Flatten a nested sequence."""
-    for item in seq:
-        if to_expand(item):
-            for subitem in flatten(item, to_expand):
-                yield subitem
-        else:
-            yield item
-
-
 def mult_partitions(n, s):
     """Compute the multiplicative partitions of n of size s
 
@@ -82,36 +57,38 @@ def mult_partitions(n, s):
     >>> mult_partitions(52,2)
     [(2, 26), (4, 13)]
     """
-    return [tuple(flatten(p)) for p in mult_partitions_recurs(n, s)]
+    return list(_mult_partitions(n, s))
 
 
-def mult_partitions_recurs(n, s, pd=0):
-    if s == 1:
-        return [n]
-    divs = divisors_minmax(n, pd, int(sqrt(n)))
-    fs = []
-    for d in divs:
-        fs.extend([(d, f) for f in mult_partitions_recurs(n / d, s - 1, pd)])
-        pd = d
-    return fs
+# Memo for `_mult_partitions`, keyed by its arguments.
+_mult_partitions_cache = {}
 
 
-def mirror_sort(seq, ref_seq):
-    """Sort `seq` into the order that `ref_seq` is in.
+def _mult_partitions(n, s, dmin=1):
+    """Return the nondecreasing multiplicative partitions of n of size s
+    whose factors are all at least `dmin`, as a tuple of tuples.
 
-    >>> mirror_sort(range(5),[1,5,2,4,3])
-    [0, 4, 1, 3, 2]
+    The smallest of s nondecreasing factors can't exceed the s-th root of n,
+    which bounds the search at each level.
     """
-    if not len(seq) == len(ref_seq):
-        raise ValueError("Sequences must have the same length")
-
-    shift = list(zip(range(len(ref_seq)), ref_seq))
-    shift.sort(key=lambda x: x[1])
-    shift = [s[0] for s in shift]
-    newseq = len(ref_seq) * [0]
-    for s_index in range(len(shift)):
-        newseq[shift[s_index]] = seq[s_index]
-    return newseq
+    key = (n, s, dmin)
+    try:
+        return _mult_partitions_cache[key]
+    except KeyError:
+        pass
+    if s == 1:
+        partitions = ((n,),) if n >= dmin else ()
+    else:
+        partitions = []
+        d = dmin
+        while d ** s <= n:
+            if n % d == 0:
+                partitions.extend((d,) + p for p in
+                                  _mult_partitions(n // d, s - 1, d))
+            d += 1
+        partitions = tuple(partitions)
+    _mult_partitions_cache[key] = partitions
+    return partitions
 
 
 def _raise_nie():
@@ -0,0 +1,92 @@
+# encoding: utf-8
+# ---------------------------------------------------------------------------
+#  Copyright (C) 2008-2014, IPython Development Team and Enthought, Inc.
+#  Distributed under the terms of the BSD License.  See COPYING.rst.
+# ---------------------------------------------------------------------------
+
+"""
+Compare the write throughput and file size of uncompressed and compressed
+``.dnpy`` files.
+
+Saves a smooth float32 volume, like the one of the seismic_volume example,
+with each codec, and reports the time to save and to load it, the
+throughput in uncompressed MB/s, and the total size of the files.  The
+engines must share the filesystem holding --prefix.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os.path
+import tempfile
+from contextlib import closing
+from timeit import default_timer as clock
+
+from distarray.globalapi import Context
+
+
+def seismic_like(i, j, k):
+    """A gently dipping horizon: a Gaussian peak in depth, and a step."""
+    import numpy
+    depth = 0.3 * k.shape[-1] + 0.1 * i + 0.05 * j
+    peak = numpy.exp(-((k - depth) / 8.0) ** 2)
+    return 1.0 + 0.001 * k + peak + 0.5 * (k > depth)
+
+
+def file_size(context, da, prefix):
+    """Total size of the files saved by ``context.save_dnpy(prefix, da)``."""
+
+    def size(local_arr, prefix):
+        import os.path
+        return os.path.getsize("%s_%s.dnpy" % (prefix, local_arr.comm_rank))
+
+    return sum(context.apply(size, (da.key, prefix), targets=da.targets))
+
+
+def cleanup(context, da, prefix):
+
+    def remove(local_arr, prefix):
+        import os
+        os.remove("%s_%s.dnpy" % (prefix, local_arr.comm_rank))
+
+    context.apply(remove, (da.key, prefix), targets=da.targets)
+
+
+def main(shape, prefix, codecs):
+    with closing(Context()) as context:
+        volume = context.fromfunction(seismic_like, shape,
+                                      dist=('b', 'b', 'n'), dtype='float32',
+                                      vectorized=True)
+        nbytes = volume.nbytes
+        print("shape {}, {} engines, {:.1f} MB".format(
+            shape, len(context.targets), nbytes / 1e6))
+        for codec in codecs:
+            start = clock()
+            context.save_dnpy(prefix, volume,
+                              codec=None if codec == 'none' else codec)
+            save = clock() - start
+            size = file_size(context, volume, prefix)
+            start = clock()
+            context.load_dnpy(prefix)
+            load = clock() - start
+            cleanup(context, volume, prefix)
+            print("{:>5}: save {:.3f}s ({:7.1f} MB/s)  load {:.3f}s  "
+                  "size {:8.2f} MB ({:.1%})".format(
+                      codec, save, nbytes / save / 1e6, load, size / 1e6,
+                      size / nbytes))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("shape", metavar="N", type=int, nargs=3,
+                        help="shape of the volume")
+    parser.add_argument("--prefix",
+                        default=os.path.join(tempfile.gettempdir(),
+                                             "benchmark_compression"),
+                        help="file name prefix for the .dnpy files")
+    parser.add_argument("--codec", action='append',
+                        help="codec to try, or 'none' (default: none, zlib "
+                             "and lzma)")
+    args = parser.parse_args()
+    main(tuple(args.shape), args.prefix,
+         args.codec or ['none', 'zlib', 'lzma'])
@@ -0,0 +1,109 @@
+# encoding: utf-8
+# ---------------------------------------------------------------------------
+#  Copyright (C) 2008-2014, IPython Development Team and Enthought, Inc.
+#  Distributed under the terms of the BSD License.  See COPYING.rst.
+# ---------------------------------------------------------------------------
+
+"""
+Compare the intra-node and inter-node traffic of row-major and node-aware
+rank placement on a block-distributed process grid.
+
+Counts the bytes sent for one halo exchange of depth one and for a
+reduction along each axis (every non-root process sends its partial result
+to the root).  Node membership is simulated with --ranks-per-node, or taken
+from the engines of a running Context with --context.
+"""
+
+from __future__ import print_function
+
+import numpy
+
+from distarray.metadata_utils import (make_grid_shape, node_rank_from_coords,
+                                      _start_stop_block)
+
+
+def block_extents(shape, grid_shape):
+    """The local extents along each axis, indexed by grid coordinate."""
+    return [[stop - start for (start, stop) in
+             (_start_stop_block(size, g, r) for r in range(g))]
+            for (size, g) in zip(shape, grid_shape)]
+
+
+def traffic(shape, grid_shape, rank_from_coords, node_ids, itemsize=8):
+    """Return {workload: (intra-node bytes, inter-node bytes)}."""
+    extents = block_extents(shape, grid_shape)
+    ndim = len(shape)
+    result = {}
+
+    def add(workload, rank0, rank1, nbytes):
+        intra, inter = result.get(workload, (0, 0))
+        if node_ids[rank0] == node_ids[rank1]:
+            intra += nbytes
+        else:
+            inter += nbytes
+        result[workload] = (intra, inter)
+
+    for coords in numpy.ndindex(*grid_shape):
+        rank = rank_from_coords[coords]
+        local = [extents[i][c] for (i, c) in enumerate(coords)]
+        for axis in range(ndim):
+            face = itemsize * int(numpy.prod(local[:axis] + local[axis+1:]))
+            # halo: send a face to the next block along `axis`, and back
+            if coords[axis] + 1 < grid_shape[axis]:
+                neighbour = list(coords)
+                neighbour[axis] += 1
+                other = rank_from_coords[tuple(neighbour)]
+                add('halo', rank, other, 2 * face)
+            # reduction along `axis`: send the partial result to the root
+            if coords[axis] > 0:
+                root = list(coords)
+                root[axis] = 0
+                add('reduce axis %d' % axis, rank,
+                    rank_from_coords[tuple(root)], face)
+    return result
+
+
+def report(title, shape, grid_shape, rank_from_coords, node_ids):
+    print(title)
+    print(rank_from_coords)
+    for workload, (intra, inter) in sorted(traffic(shape, grid_shape,
+                                                   rank_from_coords,
+                                                   node_ids).items()):
+        print("  {:<14} intra-node {:>12,d} B   inter-node {:>12,d} B".format(
+            workload, intra, inter))
+
+
+def main(shape, nprocs, ranks_per_node, use_context):
+    if use_context:
+        from distarray.globalapi import Context
+        context = Context()
+        node_ids = context.node_ids()
+        nprocs = len(node_ids)
+    else:
+        node_ids = [rank // ranks_per_node for rank in range(nprocs)]
+
+    dist = ('b',) * len(shape)
+    grid_shape = make_grid_shape(shape, dist, nprocs)
+    print("shape {}, grid {}, nodes {}".format(shape, grid_shape,
+                                               len(set(node_ids))))
+    row_major = numpy.arange(nprocs).reshape(grid_shape)
+    report("row-major placement", shape, grid_shape, row_major, node_ids)
+    node = node_rank_from_coords(grid_shape, node_ids, shape)
+    report("node placement", shape, grid_shape, node, node_ids)
+
+
+if __name__ == '__main__':
+    import argparse
+    formatter = argparse.RawDescriptionHelpFormatter
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=formatter)
+    parser.add_argument("shape", metavar="N", type=int, nargs='+',
+                        help="shape of the distributed array")
+    parser.add_argument("--nprocs", type=int, default=16,
+                        help="number of processes (default: 16)")
+    parser.add_argument("--ranks-per-node", type=int, default=4,
+                        help="processes per simulated node (default: 4)")
+    parser.add_argument("--context", action="store_true",
+                        help="use the engines of a running Context")
+    args = parser.parse_args()
+    main(tuple(args.shape), args.nprocs, args.ranks_per_node, args.context)
@@ -0,0 +1,68 @@
+# encoding: utf-8
+# ---------------------------------------------------------------------------
+#  Copyright (C) 2008-2014, IPython Development Team and Enthought, Inc.
+#  Distributed under the terms of the BSD License.  See COPYING.rst.
+# ---------------------------------------------------------------------------
+
+"""
+Compare one engine per core with fewer engines running several threads.
+
+With N engines running, each configuration uses N // k engines, with the
+'threaded' backend and k threads per engine (k = 1 is the plain 'numpy'
+backend on all N engines), and times an elementwise expression and a sum
+over a block-distributed array.  Start as many engines as there are cores.
+"""
+
+from __future__ import print_function
+
+import argparse
+from contextlib import closing
+from timeit import default_timer as clock
+
+from distarray.globalapi import Context, Distribution, sqrt
+
+
+def bench(context, shape, repeat):
+    distribution = Distribution(context, shape)
+    a = context.ones(distribution)
+    b = context.ones(distribution)
+    times = {}
+    for name, func in (('a * b + a', lambda: a * b + a),
+                       ('sqrt(a) * 2', lambda: sqrt(a) * 2),
+                       ('a.sum()', lambda: a.sum())):
+        best = None
+        for _ in range(repeat):
+            start = clock()
+            func()
+            elapsed = clock() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times[name] = best
+    return times
+
+
+def main(shape, repeat):
+    with closing(Context()) as context:
+        nengines = len(context.targets)
+
+    print("shape {}, {} engines".format(shape, nengines))
+    threads = 1
+    while threads <= nengines:
+        targets = list(range(nengines // threads))
+        with closing(Context(targets=targets)) as context:
+            if threads > 1:
+                context.set_backend('threaded', nthreads=threads)
+            times = bench(context, shape, repeat)
+        label = "{:2d} engines x {:2d} threads".format(len(targets), threads)
+        print(label, "  ".join("{}: {:.4f}s".format(name, t)
+                               for (name, t) in sorted(times.items())))
+        threads *= 2
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("shape", metavar="N", type=int, nargs='+',
+                        help="shape of the distributed array")
+    parser.add_argument("-r", "--repeat", type=int, default=5,
+                        help="number of timings to take the best of")
+    args = parser.parse_args()
+    main(tuple(args.shape), args.repeat)